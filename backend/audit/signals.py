@@ -12,19 +12,32 @@ def _get_request():
     except Exception:
         return None
 
-def _write_log(action, instance, message=""):
-    req = _get_request()
-    AuditLog.objects.create(
+def _entry(action, instance, req, message="", model=None, user=None):
+    if user is None and req and getattr(req, "user", None) and req.user.is_authenticated:
+        user = req.user
+    return AuditLog(
         action=action,
-        model=f"{instance._meta.app_label}.{instance._meta.model_name}",
-        object_id=str(instance.pk),
-        user=getattr(req, "user", None) if req and getattr(req, "user", None) and req.user.is_authenticated else None,
+        model=model or f"{instance._meta.app_label}.{instance._meta.model_name}",
+        object_id=str(instance.pk) if instance is not None else "",
+        user=user,
         ip=req.META.get("REMOTE_ADDR") if req else None,
         method=req.method if req else "",
         path=req.path if req else "",
         message=message[:255],
     )
 
+def _write_log(action, instance, message=""):
+    _entry(action, instance, _get_request(), message).save()
+
+def write_bulk_log(action, instances, message=""):
+    """Аудит для bulk_create/bulk_update (сигналы не срабатывают) — одной вставкой."""
+    req = _get_request()
+    AuditLog.objects.bulk_create([_entry(action, obj, req, message) for obj in instances])
+
+def write_summary_log(action, model, message, user=None):
+    """Одна запись на пачку (импорт): сводка вместо строки на каждый объект."""
+    _entry(action, None, _get_request(), message, model=model, user=user).save()
+
 @receiver(post_save, sender=Property)
 def log_property_save(sender, instance, created, **kwargs):
     _write_log("created" if created else "updated", instance)
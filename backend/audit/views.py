@@ -3,7 +3,9 @@ from rest_framework.viewsets import ReadOnlyModelViewSet
 from rest_framework.permissions import IsAdminUser
 from .models import AuditLog
 from .serializers import AuditLogSerializer
+from core.db_routing import use_replica
 
+@use_replica
 class AuditLogViewSet(ReadOnlyModelViewSet):
     queryset = AuditLog.objects.all()
     serializer_class = AuditLogSerializer
@@ -13,4 +13,33 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from asgiref.sync import sync_to_async  # noqa: E402
+
+from core.db_pool import close_pools, open_pools  # noqa: E402
+from realtime.asgi import websocket_changes  # noqa: E402  (после настройки Django)
+from realtime.listener import broadcaster  # noqa: E402
+
+
+async def lifespan(receive, send):
+    # пулы соединений — на весь процесс: открываем при старте, закрываем при остановке
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await sync_to_async(open_pools)()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            broadcaster.close()
+            await sync_to_async(close_pools)()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    # HTTP (в т.ч. SSE /api/v1/changes/) — Django, WebSocket /ws/changes/ — realtime
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] == "websocket":
+        return await websocket_changes(scope, receive, send)
+    return await django_application(scope, receive, send)
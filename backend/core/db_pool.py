@@ -0,0 +1,65 @@
+# core/db_pool.py
+"""
+Пул соединений PostgreSQL (psycopg 3 + psycopg_pool, OPTIONS["pool"] в settings.py).
+Пул — один на процесс и алиас (Django держит его на уровне класса), его делят все
+потоки: и WSGI-воркер, и sync-view под ASGI (sync_to_async), и async-код через
+sync_to_async. Под ASGI core/asgi.py открывает пулы на lifespan.startup и закрывает
+на lifespan.shutdown; под WSGI пул открывается при первом запросе.
+"""
+import math
+import time
+
+import psycopg
+from django.db import connections
+
+PING_TIMEOUT = 2.0  # сек; проба балансировщика не должна висеть DB_POOL_TIMEOUT на каждый алиас
+
+
+def pools():
+    """{алиас: ConnectionPool} — только для алиасов с пулом."""
+    return {alias: connections[alias].pool for alias in connections if connections[alias].pool}
+
+
+def open_pools(wait=False):
+    # wait=False: min_size соединений добирается в фоне, старт не блокируется недоступной БД
+    for pool in pools().values():
+        pool.open(wait=wait)
+
+
+def close_pools():
+    for alias in list(pools()):
+        connections[alias].close_pool()
+
+
+def pool_stats():
+    """Метрики по алиасам: psycopg_pool get_stats() (размер, свободные, ожидание) или настройки без пула."""
+    stats = {}
+    for alias in connections:
+        pool = connections[alias].pool
+        if pool:
+            stats[alias] = {"pooled": True, **pool.get_stats()}
+        else:
+            stats[alias] = {"pooled": False, "conn_max_age": connections[alias].settings_dict["CONN_MAX_AGE"]}
+    return stats
+
+
+def ping(alias, timeout=PING_TIMEOUT):
+    """
+    (ok, мс, ошибка) — SELECT 1 не дольше timeout сек: соединение из пула с коротким
+    ожиданием (а не DB_POOL_TIMEOUT Django), без пула — отдельное с connect_timeout.
+    """
+    started = time.perf_counter()
+    try:
+        pool = connections[alias].pool
+        if pool:
+            pool.open(wait=False)
+            with pool.connection(timeout=timeout) as conn:
+                conn.execute("SELECT 1")
+        else:
+            params = connections[alias].get_connection_params()
+            params.pop("cursor_factory", None)
+            with psycopg.connect(**params, connect_timeout=max(1, math.ceil(timeout))) as conn:
+                conn.execute("SELECT 1")
+    except Exception as e:  # любая ошибка (в т.ч. таймаут пула) = алиас недоступен
+        return False, round((time.perf_counter() - started) * 1000, 2), str(e).strip()
+    return True, round((time.perf_counter() - started) * 1000, 2), None
@@ -0,0 +1,167 @@
+# core/db_routing.py
+"""
+Чтение с реплик. Запись — всегда в default; на реплику уходят только чтения
+из безопасных запросов (GET/HEAD/OPTIONS) к view, помеченным @use_replica
+(каталог, аудит, отчёты). Всё остальное — default, как и раньше.
+
+Read-your-writes: после своего пишущего запроса пользователь на REPLICA_PIN_SECONDS
+закрепляется за primary (ключ в кэше по user id — при нескольких воркерах нужен
+общий кэш, см. CACHES; без него вне DEBUG check падает с properties.E001). Внутри запроса после первой записи и в транзакции чтения
+тоже идут в default. Принудительно на primary: @use_primary (view, ViewSet или
+его action) или with primary(): ... в коде.
+
+Реплики задаются в settings.py: DB_REPLICAS="host[:port][/name],..." → алиасы
+replica1, replica2, ... Для локальной проверки хватит двух баз на одном сервере.
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+REPLICA_PIN_SECONDS = getattr(settings, "REPLICA_PIN_SECONDS", 15)
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+_PIN_KEY = "db:pin:{}"
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith("replica")]
+
+
+class _Route:
+    __slots__ = ("replica", "wrote")
+
+    def __init__(self):
+        self.replica = None  # алиас реплики, если этому запросу можно читать с неё
+        self.wrote = False
+
+
+_route = contextvars.ContextVar("db_route", default=None)
+
+
+@contextmanager
+def primary():
+    """Чтения внутри блока — с default (например, курсоры дельта-синхронизации)."""
+    token = _route.set(None)
+    try:
+        yield
+    finally:
+        _route.reset(token)
+
+
+def use_replica(view):
+    """Безопасные запросы к этому view (классу, ViewSet или action) читают с реплики."""
+    view.db_replica_reads = True
+    return view
+
+
+def use_primary(view):
+    """Этот view (или action ViewSet) всегда читает с primary."""
+    view.db_replica_reads = False
+    return view
+
+
+def pin_user(user_id):
+    cache.set(_PIN_KEY.format(user_id), 1, REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    return user_id is not None and cache.get(_PIN_KEY.format(user_id)) is not None
+
+
+def _user_id(request):
+    """id пользователя без запроса в БД: из JWT (API) или из уже загруженной сессии (админка)."""
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    if header:
+        jwt = JWTAuthentication()
+        try:
+            raw = jwt.get_raw_token(header.encode())
+            return jwt.get_validated_token(raw)[jwt_settings.USER_ID_CLAIM] if raw else None
+        except (AuthenticationFailed, InvalidToken, TokenError, KeyError):
+            return None
+    user = getattr(request, "user", None)
+    return user.pk if user is not None and user.is_authenticated else None
+
+
+def _replica_reads(view_func, method):
+    """Пометка action (ViewSet) → класса → функции view; None — не помечен."""
+    cls = getattr(view_func, "cls", None)
+    action = getattr(view_func, "actions", {}).get(method.lower())
+    for target in (getattr(cls, action, None) if action else None, cls, view_func):
+        flag = getattr(target, "db_replica_reads", None)
+        if flag is not None:
+            return flag
+    return None
+
+
+def _routed(chunks, route):
+    chunks = iter(chunks)
+    while True:
+        token = _route.set(route)
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            return
+        finally:
+            _route.reset(token)
+        yield chunk
+
+
+class ReplicaRoutingMiddleware:
+    """Решает по view и пользователю, можно ли запросу читать с реплики; после записи — закрепляет."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        route = _Route()
+        token = _route.set(route)
+        try:
+            response = self.get_response(request)
+        finally:
+            _route.reset(token)
+        if request.method not in SAFE_METHODS and response.status_code < 500:
+            user_id = getattr(getattr(request, "user", None), "pk", None) or _user_id(request)
+            if user_id is not None:
+                pin_user(user_id)
+        if route.replica and response.streaming and not response.is_async:
+            # выгрузки читают БД уже после выхода из view — маршрут нужен и там
+            response.streaming_content = _routed(response.streaming_content, route)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        route = _route.get()
+        replicas = replica_aliases()
+        if route is None or not replicas or request.method not in SAFE_METHODS:
+            return None
+        if _replica_reads(view_func, request.method) and not is_pinned(_user_id(request)):
+            route.replica = random.choice(replicas)
+        return None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        route = _route.get()
+        if route is None or route.replica is None or route.wrote:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None  # внутри транзакции читаем то же, что пишем
+        return route.replica
+
+    def db_for_write(self, model, **hints):
+        route = _route.get()
+        if route is not None:
+            route.wrote = True  # дальше в этом запросе — только primary
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # реплики — копии default
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
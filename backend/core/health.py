@@ -0,0 +1,27 @@
+# core/health.py
+from django.db import connections
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from .db_pool import ping, pool_stats
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+@throttle_classes([])  # балансировщик опрашивает часто
+def health(request):
+    """
+    GET /api/v1/health/ — для балансировщика: 200, если default отвечает, иначе 503.
+    Всем — только ok/ms по алиасам; staff дополнительно видит текст ошибки (в нём
+    хост, порт, пользователь БД) и метрики пулов ("pools") — по процессу, который ответил.
+    """
+    staff = request.user.is_staff
+    databases = {}
+    for alias in connections:
+        ok, ms, error = ping(alias)
+        databases[alias] = {"ok": ok, "ms": ms, **({"error": error} if error and staff else {})}
+    data = {"status": "ok" if databases["default"]["ok"] else "unavailable", "databases": databases}
+    if staff:
+        data["pools"] = pool_stats()
+    return Response(data, status=200 if databases["default"]["ok"] else 503)
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 
+import importlib.util
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -43,6 +44,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     "rest_framework",
     "corsheaders",
     "django_filters",
@@ -51,6 +53,7 @@ INSTALLED_APPS = [
     "deals",
     "audit",
     'showings',
+    'realtime',
 ]
 
 MIDDLEWARE = [
@@ -60,6 +63,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.db_routing.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'audit.middleware.RequestMiddleware', 
@@ -101,6 +105,50 @@ DATABASES = {
         "PASSWORD": os.getenv("DB_PASSWORD"),
         "HOST": os.getenv("DB_HOST"),
         "PORT": os.getenv("DB_PORT", "5432"),
+        # пул: check_connection при выдаче соединения; без пула — проверка перед переиспользованием
+        "CONN_HEALTH_CHECKS": True,
+    }
+}
+
+# Пул соединений (psycopg 3 + psycopg_pool, core/db_pool.py): запрос берёт готовое
+# соединение и возвращает его, а не подключается к PostgreSQL заново. DB_POOL=0
+# (например, за pgbouncer) — постоянные соединения на поток с CONN_MAX_AGE.
+if os.getenv("DB_POOL", "1") == "1" and importlib.util.find_spec("psycopg_pool"):
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+            "max_lifetime": float(os.getenv("DB_POOL_MAX_LIFETIME", "1800")),  # сек; старые соединения пересоздаются
+            "max_idle": float(os.getenv("DB_POOL_MAX_IDLE", "300")),           # лишние сверх min_size закрываются
+            "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),              # ожидание свободного соединения
+        },
+    }
+else:
+    DATABASES["default"]["CONN_MAX_AGE"] = int(os.getenv("DB_CONN_MAX_AGE", "60"))
+
+# Реплики для чтения (core/db_routing.py): DB_REPLICAS="host[:port][/name],..." →
+# replica1, replica2, ...; остальные параметры — как у default.
+for _i, _spec in enumerate(filter(None, (s.strip() for s in os.getenv("DB_REPLICAS", "").split(","))), 1):
+    _address, _, _name = _spec.partition("/")
+    _host, _, _port = _address.partition(":")
+    DATABASES[f"replica{_i}"] = {
+        **DATABASES["default"],
+        "HOST": _host or DATABASES["default"]["HOST"],
+        "PORT": _port or DATABASES["default"]["PORT"],
+        "NAME": _name or DATABASES["default"]["NAME"],
+        "TEST": {"MIRROR": "default"},  # в тестах реплика — та же база
+    }
+
+DATABASE_ROUTERS = ["core.db_routing.ReplicaRouter"]
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "15"))  # read-your-writes после записи
+
+
+# Cache (фасеты, сводки каталога). Для нескольких воркеров — общий бэкенд, напр.
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache CACHE_LOCATION=redis://127.0.0.1:6379/1
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "homy"),
     }
 }
 
@@ -155,6 +203,10 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 20,
     "DEFAULT_FILTER_BACKENDS": [
@@ -0,0 +1,159 @@
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import OperationalError, connections
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from audit.threadlocal import set_current_request
+from properties.models import Property
+from properties.views import PropertyViewSet
+from users.models import User
+
+from .db_pool import ping
+from .db_routing import ReplicaRouter, ReplicaRoutingMiddleware, _Route, _route, is_pinned, primary
+
+
+def make_user(email="realtor@example.kg", **kwargs):
+    return User.objects.create(email=email, username=email.split("@")[0], **kwargs)
+
+
+def make_property(realtor, **kwargs):
+    data = dict(
+        title="Квартира", price=100_000, area=50, rooms=2, address="ул. Киевская 1",
+        district="Центр", deal_type="sale", status="active", realtor=realtor,
+    )
+    data.update(kwargs)
+    return Property.objects.create(**data)
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = ReplicaRouter()
+        patcher = mock.patch("core.db_routing.replica_aliases", return_value=["replica1"])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def call(self, view, method="GET", user=None, response=HttpResponse):
+        """Прогон запроса через middleware → (реплика, выбранная для view, ответ)."""
+        request = RequestFactory().generic(method, "/")
+        request.user = user or AnonymousUser()
+        seen = []
+
+        def get_response(req):
+            middleware.process_view(req, view, (), {})
+            seen.append(_route.get().replica)
+            return response()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        response = middleware(request)
+        return seen[0], response
+
+    def with_route(self, replica):
+        route = _Route()
+        route.replica = replica
+        token = _route.set(route)
+        self.addCleanup(_route.reset, token)
+        return route
+
+    def test_marked_views_read_from_replica(self):
+        self.assertEqual(self.call(PropertyViewSet.as_view({"get": "list"}))[0], "replica1")
+        # @use_primary на action сильнее @use_replica на ViewSet
+        self.assertIsNone(self.call(PropertyViewSet.as_view({"get": "upload_chunk"}))[0])
+        self.assertIsNone(self.call(lambda request: None)[0])
+        self.assertIsNone(self.call(PropertyViewSet.as_view({"post": "create"}), method="POST")[0])
+
+    def test_pinned_after_write(self):
+        user = User(pk=7)
+        self.assertFalse(is_pinned(user.pk))
+        self.call(PropertyViewSet.as_view({"post": "create"}), method="POST", user=user)
+        self.assertTrue(is_pinned(user.pk))
+        self.assertIsNone(self.call(PropertyViewSet.as_view({"get": "list"}), user=user)[0])
+        self.assertEqual(self.call(PropertyViewSet.as_view({"get": "list"}), user=User(pk=8))[0], "replica1")
+
+    def test_router(self):
+        self.with_route("replica1")
+        self.assertEqual(self.router.db_for_read(Property), "replica1")
+        with primary():
+            self.assertIsNone(self.router.db_for_read(Property))
+        self.assertEqual(self.router.db_for_write(Property), "default")
+        # после записи в этом запросе — только primary
+        self.assertIsNone(self.router.db_for_read(Property))
+        self.assertFalse(self.router.allow_migrate("replica1", "properties"))
+
+    def test_streaming_keeps_route(self):
+        def body():
+            yield str(_route.get() and _route.get().replica)
+
+        _, response = self.call(
+            PropertyViewSet.as_view({"get": "list"}), response=lambda: StreamingHttpResponse(body()),
+        )
+        self.assertEqual(b"".join(response.streaming_content), b"replica1")
+
+
+class ReplicaPinTests(TestCase):
+    def setUp(self):
+        set_current_request(None)  # запрос прошлого теста остаётся в thread-local аудита
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_write_through_api_pins_user(self):
+        prop = make_property(self.user)
+        response = self.client.patch(
+            f"/api/v1/properties/{prop.pk}/", {"price": 5, "address": prop.address, "district": prop.district}, format="json",
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertTrue(is_pinned(self.user.pk))
+        # в транзакции чтения идут туда же, куда запись
+        route = _Route()
+        route.replica = "replica1"
+        token = _route.set(route)
+        try:
+            self.assertIsNone(ReplicaRouter().db_for_read(Property))
+        finally:
+            _route.reset(token)
+
+
+class HealthTests(TestCase):
+    url = "/api/v1/health/"
+
+    def setUp(self):
+        set_current_request(None)
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_anonymous_sees_only_status(self):
+        response = APIClient().get(self.url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["status"], "ok")
+        self.assertEqual(set(data["databases"]["default"]), {"ok", "ms"})
+        self.assertNotIn("pools", data)
+
+    def test_staff_sees_pools_and_errors(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.assertIn("default", self.client.get(self.url).json()["pools"])
+
+        with mock.patch("core.health.ping", return_value=(False, 2000.0, "connection to server at db:5432 failed")):
+            response = self.client.get(self.url)
+            anonymous = APIClient().get(self.url)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["status"], "unavailable")
+        self.assertEqual(response.json()["databases"]["default"]["error"], "connection to server at db:5432 failed")
+        self.assertEqual(anonymous.status_code, 503)
+        self.assertNotIn("error", anonymous.json()["databases"]["default"])
+
+    def test_ping(self):
+        ok, ms, error = ping("default")
+        self.assertEqual((ok, error), (True, None))
+        self.assertGreaterEqual(ms, 0)
+        # без пула — отдельное соединение с connect_timeout
+        no_pool = mock.patch.object(type(connections["default"]), "pool", new_callable=mock.PropertyMock, return_value=None)
+        with no_pool, mock.patch("core.db_pool.psycopg.connect", side_effect=OperationalError("timeout expired")):
+            self.assertEqual(ping("default")[::2], (False, "timeout expired"))
@@ -8,7 +8,9 @@ from rest_framework.routers import DefaultRouter
 from properties.views import PropertyViewSet
 from deals.views import DealViewSet
 from audit.views import AuditLogViewSet  # read-only, admin only
-from properties.views import PropertyViewSet, FavoriteViewSet  # <— добавь классы
+from realtime.views import changes
+from core.health import health
+from properties.views import PropertyViewSet, FavoriteViewSet, SavedSearchViewSet  # <— добавь классы
 
 
 router = DefaultRouter()
@@ -16,6 +18,7 @@ router.register(r"properties", PropertyViewSet, basename="property")
 router.register(r"deals", DealViewSet, basename="deal")
 router.register(r"audit", AuditLogViewSet, basename="audit")  # /api/v1/audit/ (GET list/retrieve), IsAdminUser
 router.register(r"favorites", FavoriteViewSet, basename="favorite")          # <— добавь
+router.register(r"saved-searches", SavedSearchViewSet, basename="saved-search")
 
 
 urlpatterns = [
@@ -28,6 +31,8 @@ urlpatterns = [
     # Все viewsets — через единый router
     path("api/v1/", include(router.urls)),
     path('api/v1/showings/', include('showings.urls')),
+    path("api/v1/changes/", changes, name="changes"),  # SSE-поток изменений (ASGI)
+    path("api/v1/health/", health, name="health"),     # БД + метрики пула (staff)
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deals', '0002_initial'),
+        ('properties', '0015_property_updated_at_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='deal',
+            index=models.Index(fields=['updated_at', 'id'], name='deals_deal_updated_efa996_idx'),
+        ),
+    ]
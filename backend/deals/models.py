@@ -25,5 +25,7 @@ class Deal(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    class Meta: ordering = ["-created_at"]
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["updated_at", "id"])]  # ?updated_since=
     def __str__(self): return f"Deal #{self.pk} · {self.property} · {self.stage}"
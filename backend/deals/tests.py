@@ -1,3 +1,58 @@
+import csv
+import zipfile
+from io import BytesIO, StringIO
+
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from audit.threadlocal import set_current_request
+from properties.models import Property
+from users.models import User
+
+from .models import Deal
+
+EXPORT_URL = "/api/v1/deals/export/"
+
+
+def make_user(email, **kwargs):
+    return User.objects.create(email=email, username=email.split("@")[0], **kwargs)
+
+
+class DealExportTests(TestCase):
+    def setUp(self):
+        set_current_request(None)
+        self.realtor = make_user("realtor@example.kg")
+        self.other = make_user("other@example.kg")
+        prop = Property.objects.create(
+            title="Квартира", price=100_000, area=50, rooms=2, address="ул. Киевская 1",
+            district="Центр", deal_type="sale", realtor=self.realtor,
+        )
+        self.mine = Deal.objects.create(property=prop, client_name="Азамат", client_phone="+996 555 000 111", created_by=self.realtor)
+        self.assigned = Deal.objects.create(
+            property=prop, client_name="-2+3+cmd|' /C calc'!A0", client_phone="0", created_by=self.other, assigned_to=self.realtor,
+        )
+        Deal.objects.create(property=prop, client_name="Чужой", client_phone="0", created_by=self.other)
+
+    def download(self, user, **params):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(EXPORT_URL, params)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    def test_realtor_exports_only_own_deals(self):
+        rows = list(csv.reader(StringIO(self.download(self.realtor).decode("utf-8-sig"))))
+        self.assertEqual(rows[0][:3], ["ID", "Этап", "Объект"])
+        by_id = {int(r[0]): r for r in rows[1:]}
+        self.assertEqual(set(by_id), {self.mine.pk, self.assigned.pk})
+        self.assertEqual(by_id[self.mine.pk][1], "Лид")
+        self.assertEqual(by_id[self.mine.pk][6], "+996 555 000 111")
+        self.assertEqual(by_id[self.assigned.pk][5], "'-2+3+cmd|' /C calc'!A0")  # DDE — не формула
+        self.assertEqual(by_id[self.assigned.pk][9], self.realtor.username)
 
-# Create your tests here.
+    def test_manager_exports_all_as_xlsx(self):
+        manager = make_user("manager@example.kg", role=User.Role.MANAGER)
+        with zipfile.ZipFile(BytesIO(self.download(manager, **{"as": "xlsx"}))) as zf:
+            sheet = zf.read("xl/worksheets/sheet1.xml").decode()
+        self.assertEqual(sheet.count("<row>"), 4)
+        self.assertIn("Чужой", sheet)
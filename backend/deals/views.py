@@ -1,9 +1,30 @@
 from django.shortcuts import render
 from rest_framework import viewsets, permissions
+from rest_framework.decorators import action
 from django_filters import rest_framework as filters
-from . import models
+from django.db.models import Q
 from .models import Deal
 from .serializers import DealSerializer
+from realtime.sync import DeltaSyncMixin
+from core.db_routing import use_replica
+from core.export import export_format, stream_export
+
+EXPORT_COLUMNS = [
+    ("ID", "id"),
+    ("Этап", "stage", dict(Deal.Stage.choices).get),
+    ("Объект", "property_id"),
+    ("Объект: заголовок", "property__title"),
+    ("Объект: адрес", "property__address"),
+    ("Клиент", "client_name"),
+    ("Телефон клиента", "client_phone"),
+    ("Предложенная цена", "price_offer"),
+    ("Создал", "created_by__username"),
+    ("Ответственный", "assigned_to__username"),
+    ("Плановая дата", "planned_date"),
+    ("Закрыта", "closed_at"),
+    ("Создана", "created_at"),
+    ("Обновлена", "updated_at"),
+]
 
 
 class DealFilter(filters.FilterSet):
@@ -16,8 +37,9 @@ class DealFilter(filters.FilterSet):
         model = Deal
         fields = ["stage","property","created_by","assigned_to"]
 
-class DealViewSet(viewsets.ModelViewSet):
+class DealViewSet(DeltaSyncMixin, viewsets.ModelViewSet):
     serializer_class = DealSerializer
+    sync_model = "deal"  # ?updated_since=
     permission_classes = [permissions.IsAuthenticated]
     filterset_class = DealFilter
     search_fields = ["client_name","client_phone","comment","property__title"]
@@ -30,7 +52,15 @@ class DealViewSet(viewsets.ModelViewSet):
         if role in ("admin","manager"):
             return qs
         # realtor — только свои
-        return qs.filter(models.Q(created_by=u) | models.Q(assigned_to=u)).distinct()
+        return qs.filter(Q(created_by=u) | Q(assigned_to=u)).distinct()
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
+
+    @action(detail=False, methods=["get"])
+    @use_replica
+    def export(self, request):
+        """GET /api/v1/deals/export/?as=csv|xlsx&<фильтры списка> — вся воронка потоком."""
+        return stream_export(
+            self.filter_queryset(self.get_queryset()), EXPORT_COLUMNS, export_format(request), "deals",
+        )
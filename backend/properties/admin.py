@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Property, PropertyImage
+from .models import DuplicateCandidate, Property, PropertyImage
 
 class PropertyImageInline(admin.TabularInline):
     model = PropertyImage
@@ -18,4 +18,11 @@ class PropertyAdmin(admin.ModelAdmin):
 
 @admin.register(PropertyImage)
 class PropertyImageAdmin(admin.ModelAdmin):
-    list_display = ("id", "property", "created_at")
\ No newline at end of file
+    list_display = ("id", "property", "created_at")
+
+
+@admin.register(DuplicateCandidate)
+class DuplicateCandidateAdmin(admin.ModelAdmin):
+    list_display = ("id", "property", "duplicate", "score", "reasons", "created_at")
+    raw_id_fields = ("property", "duplicate")
+    ordering = ("-score",)
@@ -0,0 +1,142 @@
+# properties/bulk.py
+"""
+Пакетные операции над объектами: создание, частичное изменение, смена статуса.
+Все элементы валидируются вместе (ошибки — списком по позициям), права владельца
+проверяются одним запросом, запись — bulk_create/bulk_update в одной транзакции.
+Сигналы post_save при этом не срабатывают, поэтому аудит и версия каталога — здесь.
+"""
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+
+from audit.signals import write_bulk_log
+from realtime.events import property_event, publish
+
+from .caching import bump_catalog_version
+from .duplicates import fill_keys
+from .stats import apply_changes, snapshot
+from .saved_searches import schedule_match
+from .models import Property
+from .permissions import IsOwnerOrReadOnly
+
+BULK_MAX_ITEMS = 500
+
+
+class BulkStatusSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=BULK_MAX_ITEMS,
+    )
+    status = serializers.ChoiceField(choices=Property.Status.choices)
+
+
+def _items(data):
+    items = data.get("items") if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        raise ValidationError({"items": "Ожидается непустой список."})
+    if len(items) > BULK_MAX_ITEMS:
+        raise ValidationError({"items": f"Не больше {BULK_MAX_ITEMS} элементов за запрос."})
+    return items
+
+
+def load_owned(user, ids):
+    """
+    Объекты по id одним запросом (с блокировкой строк) + проверка IsOwnerOrReadOnly
+    для всей пачки: 404 со списком отсутствующих, 403 со списком чужих.
+    """
+    objs = {
+        obj.pk: obj
+        for obj in Property.objects.select_for_update().defer("search_vector").filter(pk__in=ids)
+    }
+    missing = sorted(set(ids) - set(objs))
+    if missing:
+        raise NotFound({"detail": "Объекты не найдены.", "ids": missing})
+    if not user.is_staff:
+        foreign = sorted(pk for pk, obj in objs.items() if obj.realtor_id != user.pk)
+        if foreign:
+            raise PermissionDenied({"detail": IsOwnerOrReadOnly.message, "ids": foreign})
+    return [objs[pk] for pk in ids]
+
+
+def _written(action, objs, message, before=None, was_active=()):
+    """То, что при save() делают сигналы: аудит, статистика цен, версия каталога, события."""
+    write_bulk_log(action, objs, message)
+    apply_changes(zip(before or [None] * len(objs), [snapshot(obj) for obj in objs]))
+    bump_catalog_version()
+    publish(*[property_event(obj, action, obj.pk in was_active) for obj in objs])
+
+
+def bulk_create(serializer_class, data, user, context):
+    ser = serializer_class(data=_items(data), many=True, context=context)
+    ser.is_valid(raise_exception=True)
+    objs = [fill_keys(Property(realtor=user, **attrs)) for attrs in ser.validated_data]
+    with transaction.atomic():
+        Property.objects.bulk_create(objs)
+        _written("created", objs, "bulk")
+        schedule_match(objs)
+    return objs
+
+
+def bulk_patch(serializer_class, data, user, context):
+    """items: [{"id": N, <поля>}, ...] — частичное обновление, как PATCH по каждому."""
+    items = _items(data)
+    ids = []
+    for item in items:
+        pk = item.get("id") if isinstance(item, dict) else None
+        if not isinstance(pk, int) or isinstance(pk, bool):
+            raise ValidationError({"items": "У каждого элемента нужен целый id."})
+        ids.append(pk)
+    if len(set(ids)) != len(ids):
+        raise ValidationError({"items": "id не должны повторяться."})
+
+    with transaction.atomic():
+        objs = load_owned(user, ids)
+        before = [snapshot(obj) for obj in objs]
+        was_active = {obj.pk for obj in objs if obj.status == Property.Status.ACTIVE}
+        errors, changes, fields = [], [], set()
+        for obj, item in zip(objs, items):
+            ser = serializer_class(obj, data=item, partial=True, context=context)
+            if ser.is_valid():
+                errors.append({})
+                changes.append(ser.validated_data)
+                fields.update(ser.validated_data)
+            else:
+                errors.append(ser.errors)
+        if any(errors):
+            raise ValidationError(errors)
+
+        now = timezone.now()
+        for obj, attrs in zip(objs, changes):
+            for name, value in attrs.items():
+                setattr(obj, name, value)
+            obj.updated_at = now  # auto_now в bulk_update не выставляется
+            fill_keys(obj)
+        if {"phone", "address"} & fields:
+            fields |= {"phone_key", "address_key"}
+        if fields:
+            Property.objects.bulk_update(objs, [*fields, "updated_at"])
+            _written("updated", objs, "bulk", before, was_active)
+            schedule_match([obj for obj in objs if obj.pk not in was_active])
+    return objs
+
+
+def bulk_set_status(data, user):
+    """Смена статуса пачке объектов; уже стоящие в нужном статусе не трогаем."""
+    ser = BulkStatusSerializer(data=data)
+    ser.is_valid(raise_exception=True)
+    ids, new_status = list(dict.fromkeys(ser.validated_data["ids"])), ser.validated_data["status"]
+
+    with transaction.atomic():
+        objs = load_owned(user, ids)
+        changed = [obj for obj in objs if obj.status != new_status]
+        before = [snapshot(obj) for obj in changed]
+        was_active = {obj.pk for obj in changed if obj.status == Property.Status.ACTIVE}
+        unchanged = [obj.pk for obj in objs if obj.status == new_status]
+        now = timezone.now()
+        for obj in changed:
+            obj.status, obj.updated_at = new_status, now
+        if changed:
+            Property.objects.bulk_update(changed, ["status", "updated_at"])
+            _written("updated", changed, f"bulk status → {new_status}", before, was_active)
+            schedule_match(changed)
+    return changed, unchanged
@@ -0,0 +1,78 @@
+# properties/caching.py
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+from core.db_routing import primary
+
+CATALOG_VERSION_KEY = "properties:catalog:version"
+CACHE_TTL = 300  # сек; основная инвалидация — через версию каталога
+
+
+def shared_cache():
+    """Кэш общий для всех процессов (Redis, Memcached, БД, файлы), а не LocMem воркера."""
+    return not isinstance(caches["default"], LocMemCache)
+
+
+def catalog_cache_enabled():
+    # версия каталога в LocMem у каждого воркера своя: bump в одном процессе другие
+    # не увидят и отдадут старое до CACHE_TTL — вне DEBUG такой кэш не используем
+    return settings.DEBUG or shared_cache()
+
+
+def catalog_version():
+    """Версия каталога: увеличивается при любом изменении Property (см. signals.py)."""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, 1, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY, 1)
+    return version
+
+
+def bump_catalog_version():
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, 1, timeout=None)
+
+
+def cached(name, signature, compute):
+    """
+    compute() через кэш под ключом properties:<name>:<версия каталога>:<signature>.
+    Без общего кэша (см. catalog_cache_enabled) — просто compute().
+    Кэшируемое считается на primary: версию уже подняла запись в primary, а отставшая
+    реплика положила бы под новый ключ старые данные на весь CACHE_TTL.
+    """
+    if not catalog_cache_enabled():
+        return compute()
+    key = f"properties:{name}:{catalog_version()}:{signature}"
+    data = cache.get(key)
+    if data is None:
+        with primary():
+            data = compute()
+        cache.set(key, data, CACHE_TTL)
+    return data
+
+
+def filter_signature(request, ignore=()):
+    """
+    Нормализованная подпись фильтров запроса: параметры сортируются, пустые
+    и не влияющие на выборку (пагинация/сортировка) отбрасываются.
+    Учитывает то, что get_queryset делает по пользователю (mine / staff).
+    """
+    skip = {"page", "page_size", "ordering", "cursor", "pagination", *ignore}
+    items = sorted(
+        (k, v)
+        for k in request.query_params
+        if k not in skip
+        for v in sorted(request.query_params.getlist(k))
+        if v != ""
+    )
+    user = request.user
+    scope = f"u{user.pk}" if request.query_params.get("mine") in {"1", "true", "True"} else (
+        "staff" if user.is_staff else "all"
+    )
+    raw = f"{scope}|" + "&".join(f"{k}={v}" for k, v in items)
+    return hashlib.sha1(raw.encode()).hexdigest()
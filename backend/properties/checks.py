@@ -0,0 +1,33 @@
+# properties/checks.py
+from django.conf import settings
+from django.core import checks
+
+from core.db_routing import replica_aliases
+
+from .caching import shared_cache
+
+
+@checks.register(checks.Tags.caches)
+def catalog_cache_check(app_configs, **kwargs):
+    if settings.DEBUG or shared_cache():
+        return []
+    return [checks.Warning(
+        "Кэш по умолчанию — LocMemCache: версия каталога у каждого воркера своя, "
+        "поэтому кэш фасетов, сводок, карты и статистики вне DEBUG отключён.",
+        hint="Задайте общий бэкенд: CACHE_BACKEND=django.core.cache.backends.redis.RedisCache.",
+        id="properties.W001",
+    )]
+
+
+@checks.register(checks.Tags.database, checks.Tags.caches)
+def replica_pin_check(app_configs, **kwargs):
+    # read-your-writes (core.db_routing.pin_user) хранит закрепление в кэше: в LocMem его
+    # видит только воркер, принявший запись, — остальные читают свежую запись с реплики
+    if settings.DEBUG or not replica_aliases() or shared_cache():
+        return []
+    return [checks.Error(
+        "DB_REPLICAS задан, а кэш по умолчанию — LocMemCache: закрепление за primary "
+        "после записи не видно другим воркерам.",
+        hint="Задайте общий бэкенд: CACHE_BACKEND=django.core.cache.backends.redis.RedisCache.",
+        id="properties.E001",
+    )]
@@ -0,0 +1,68 @@
+# properties/conditional.py
+"""
+Валидаторы для условных GET (If-None-Match / If-Modified-Since → 304) каталога.
+Считаются дешёвыми запросами, без сериализации: деталь — updated_at + id фото,
+список — MAX(updated_at)/COUNT(*) по уже отфильтрованной выборке.
+"""
+import hashlib
+
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .models import Favorite
+
+
+def _etag(*parts):
+    raw = "|".join(str(p) for p in parts)
+    return '"%s"' % hashlib.sha1(raw.encode()).hexdigest()
+
+
+def detail_validators(queryset, pk):
+    """(etag, updated_at) для одного объекта или None, если его нет в выборке."""
+    # favorited нет, если is_favorite не запрошен (?fields=) — тогда он и не влияет на ответ
+    fav = ["favorited"] if "favorited" in queryset.query.annotations else []
+    try:
+        row = (
+            queryset.filter(pk=pk).order_by()
+            .values("pk", "updated_at", *fav)
+            .annotate(image_ids=ArrayAgg("images__id", ordering="images__id", default=[]))
+            .first()
+        )
+    except (TypeError, ValueError, ValidationError):
+        return None  # /properties/abc/ — как и get_object_or_404 DRF, это 404
+    if row is None:
+        return None
+    return _etag("d", row["pk"], row["updated_at"].isoformat(), row.get("favorited"), row["image_ids"]), row["updated_at"]
+
+
+def list_validators(queryset, request):
+    """(etag, max updated_at) для страницы списка: фильтры/страница берутся из query string."""
+    agg = queryset.order_by().aggregate(last=Max("updated_at"), n=Count("id"))
+    # is_favorite в ответе зависит от пользователя — учитываем его избранное
+    fav = Favorite.objects.filter(user=request.user).aggregate(last=Max("created_at"), n=Count("id"))
+    etag = _etag(
+        "l", request.get_full_path(), agg["last"], agg["n"],
+        request.user.pk, fav["last"], fav["n"],
+    )
+    return etag, agg["last"]
+
+
+def not_modified(request, etag, last_modified=None):
+    """
+    HttpResponseNotModified, если клиентская копия актуальна, иначе None.
+    Для списка last_modified не передаём: MAX(updated_at) не видит удалений — только ETag.
+    """
+    ts = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request._request, etag=etag, last_modified=ts)
+
+
+def set_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    # ответ зависит от пользователя; браузер должен перепроверять каждый раз
+    response["Cache-Control"] = "private, no-cache"
+    return response
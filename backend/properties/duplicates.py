@@ -0,0 +1,126 @@
+# properties/duplicates.py
+"""
+Поиск дублей объектов (один и тот же объект, заведённый разными риелторами).
+Блокирующие ключи хранятся в Property и индексируются:
+    phone_key   — последние 9 цифр телефона (+996 501 271 007 == 0501271007)
+    address_key — «улица дом»: первый буквенный и первый числовой токен адреса
+                  без «ул.», «д.», «кв.» и т.п. («Киевская ул., д. 12, кв. 5» → «киевская 12»)
+Кандидаты — только объекты с тем же ключом (индекс, а не обход каталога);
+внутри блока пара оценивается по совпадению телефона, полного адреса (доля общих
+токенов) и rooms/area/floor.
+"""
+import re
+from decimal import Decimal
+
+from django.db.models import Q
+
+PHONE_KEY_DIGITS = 9
+ADDRESS_STOP_WORDS = {
+    "г", "город", "ул", "улица", "пр", "пр-т", "проспект", "пер", "переулок", "бул", "бульвар",
+    "мкр", "мкрн", "микрорайон", "ж", "м", "жм", "д", "дом", "кв", "квартира", "корп", "корпус",
+}
+_TOKEN_RE = re.compile(r"[0-9a-zа-яё]+(?:-[0-9a-zа-яё]+)*")
+
+LIKELY_SCORE = 0.6
+MAX_CANDIDATES = 50  # строк на блок при проверке одного объекта
+WEIGHTS = {"phone": 0.4, "address": 0.3, "rooms": 0.1, "area": 0.1, "floor": 0.1}
+
+
+def phone_key(phone):
+    digits = re.sub(r"\D", "", phone or "")
+    return digits[-PHONE_KEY_DIGITS:] if len(digits) >= PHONE_KEY_DIGITS else ""
+
+
+def _tokens(address):
+    tokens = _TOKEN_RE.findall((address or "").lower().replace("ё", "е"))
+    return [t for t in tokens if t not in ADDRESS_STOP_WORDS]
+
+
+def address_tokens(address):
+    return set(_tokens(address))
+
+
+def address_key(address):
+    """
+    Грубый ключ блока: улица + номер дома. Квартира, корпус, порядок слов и
+    сокращения на него не влияют — такие варианты одного адреса сравнивает score_pair.
+    Без улицы (микрорайоны: «7 мкр, д. 15») — два первых числа; без номера дома — "".
+    """
+    tokens = _tokens(address)
+    words = [t for t in tokens if not any(c.isdigit() for c in t)]
+    numbers = [t for t in tokens if any(c.isdigit() for c in t)]
+    if words and numbers:
+        return f"{words[0]} {numbers[0]}"[:255]
+    if len(numbers) >= 2:
+        return f"{numbers[0]} {numbers[1]}"[:255]
+    return ""
+
+
+def fill_keys(prop):
+    """Проставить ключи перед записью (pre_save и пакетные пути, где save() не вызывается)."""
+    prop.phone_key = phone_key(prop.phone)
+    prop.address_key = address_key(prop.address)
+    return prop
+
+
+def _area_close(a, b, tolerance=Decimal("0.03")):
+    if not a or not b:
+        return False
+    a, b = Decimal(a), Decimal(b)
+    return abs(a - b) <= max(a, b) * tolerance
+
+
+def _get(obj, name):
+    return obj[name] if isinstance(obj, dict) else getattr(obj, name)
+
+
+def score_pair(a, b):
+    """(оценка 0..1, причины) для двух объектов (модели или словари с теми же полями)."""
+    reasons = []
+    if _get(a, "phone_key") and _get(a, "phone_key") == _get(b, "phone_key"):
+        reasons.append("phone")
+    ta, tb = address_tokens(_get(a, "address")), address_tokens(_get(b, "address"))
+    address = len(ta & tb) / len(ta | tb) if ta and tb else 0.0
+    if address >= 0.5:
+        reasons.append("address")
+    if _get(a, "rooms") == _get(b, "rooms"):
+        reasons.append("rooms")
+    if _area_close(_get(a, "area"), _get(b, "area")):
+        reasons.append("area")
+    if _get(a, "floor") is not None and _get(a, "floor") == _get(b, "floor"):
+        reasons.append("floor")
+    score = sum(WEIGHTS[r] for r in reasons if r != "address") + WEIGHTS["address"] * address
+    return round(score, 3), reasons
+
+
+SCORE_FIELDS = ("id", "phone_key", "address_key", "address", "rooms", "area", "floor")
+
+
+def find_duplicates(prop, limit=5, min_score=LIKELY_SCORE):
+    """
+    Вероятные дубли одного объекта: два индексных поиска по ключам (BitmapOr),
+    не больше MAX_CANDIDATES строк, оценка в Python. [{"id", "score", "reasons"}, ...]
+    """
+    from .models import Property
+
+    if not prop.phone_key and not prop.address_key:
+        fill_keys(prop)
+    block = Q()
+    if prop.phone_key:
+        block |= Q(phone_key=prop.phone_key)
+    if prop.address_key:
+        block |= Q(address_key=prop.address_key)
+    if not block:
+        return []
+    rows = (
+        Property.objects.filter(block).exclude(pk=prop.pk)
+        .exclude(status=Property.Status.ARCHIVED)
+        .order_by("-id").values(*SCORE_FIELDS)[:MAX_CANDIDATES]
+    )
+    found = []
+    for row in rows:
+        score, reasons = score_pair(prop, row)
+        if score >= min_score:
+            found.append({"id": row["id"], "score": score, "reasons": reasons})
+    found.sort(key=lambda d: (-d["score"], -d["id"]))
+    return found[:limit]
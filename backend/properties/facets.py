@@ -0,0 +1,53 @@
+# properties/facets.py
+from django.db import connections
+
+FACET_FIELDS = ["district", "rooms", "deal_type", "kind", "condition"]
+
+# границы ценовых корзин: [0, 1 000), [1 000, 10 000), ..., [500 000, ∞)
+PRICE_BUCKETS = [0, 1_000, 10_000, 50_000, 100_000, 200_000, 500_000]
+
+
+def compute_facets(queryset):
+    """
+    Все счётчики фильтров одним проходом: GROUP BY GROUPING SETS по уже
+    отфильтрованной выборке каталога. Возвращает
+    {"total": N, "district": [{"value": ..., "count": ...}], ..., "price": [{"min", "max", "count"}]}.
+    """
+    inner = queryset.order_by().values("price", *FACET_FIELDS)
+    inner_sql, params = inner.query.sql_with_params()
+
+    cols = FACET_FIELDS + ["price_bucket"]
+    sets = ", ".join(f"({c})" for c in cols)
+    sql = (
+        f"SELECT {', '.join(cols)}, GROUPING({', '.join(cols)}) AS g, COUNT(*) "
+        f"FROM (SELECT {', '.join(FACET_FIELDS)}, "
+        f"width_bucket(price, %s::numeric[]) AS price_bucket FROM ({inner_sql}) AS f) AS t "
+        f"GROUP BY GROUPING SETS ({sets}, ())"
+    )
+
+    result = {"total": 0, **{c: [] for c in FACET_FIELDS}, "price": []}
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, [PRICE_BUCKETS, *params])
+        rows = cursor.fetchall()
+
+    n = len(cols)
+    full_mask = (1 << n) - 1
+    for row in rows:
+        values, grouping, count = row[:n], row[n], row[n + 1]
+        if grouping == full_mask:
+            result["total"] = count
+            continue
+        # в GROUPING() бит 0 — у колонки, по которой группировали; старший бит — первая колонка
+        idx = next(i for i in range(n) if not grouping & (1 << (n - 1 - i)))
+        col, value = cols[idx], values[idx]
+        if col == "price_bucket":
+            lo = PRICE_BUCKETS[value - 1] if value else None
+            hi = PRICE_BUCKETS[value] if value < len(PRICE_BUCKETS) else None
+            result["price"].append({"min": lo, "max": hi, "count": count})
+        else:
+            result[col].append({"value": value, "count": count})
+
+    for col in FACET_FIELDS:
+        result[col].sort(key=lambda x: (-x["count"], str(x["value"])))
+    result["price"].sort(key=lambda x: -1 if x["min"] is None else x["min"])
+    return result
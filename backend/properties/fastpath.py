@@ -0,0 +1,135 @@
+# properties/fastpath.py
+"""
+Быстрый путь чтения списка каталога: строки берутся из .values(), без создания моделей
+и без get_attribute/ReturnDict машинерии DRF. Форматирование колонок делают те же
+field.to_representation, что и у сериализатора, поэтому ответ совпадает с обычным
+(порядок ключей, строки Decimal/дат, абсолютные URL фото).
+"""
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
+from django.utils.encoding import iri_to_uri
+from rest_framework import serializers
+
+from .models import Property, PropertyImage
+
+
+class Unsupported(Exception):
+    """Поле, которое быстрый путь не умеет — view откатывается на обычный сериализатор."""
+
+
+class FastPropertyRows:
+    def __init__(self, serializer, request, image_variant=None):
+        self.request = request
+        self.image_variant = image_variant
+        self.host = request.build_absolute_uri("/")[:-1] if request else ""
+        self.columns = {"id"}
+        self.plan = []  # (имя, вид, ключ в values, функция форматирования)
+        for name, field in serializer.fields.items():
+            self.plan.append(self._plan_field(name, field))
+        self.needs_images = any(kind in ("images", "cover") for _, kind, _, _ in self.plan)
+        if self.needs_images:
+            image_fields = serializer.fields["images"].child.fields if "images" in serializer.fields else None
+            self.image_created_at = (
+                image_fields["created_at"] if image_fields else serializers.DateTimeField()
+            ).to_representation
+
+    def _plan_field(self, name, field):
+        if name == "is_favorite":
+            self.columns.add("favorited")
+            return name, "favorite", "favorited", None
+        if name == "cover_url":
+            return name, "cover", None, None
+        if name == "images":
+            return name, "images", None, None
+        if isinstance(field, serializers.SerializerMethodField):
+            raise Unsupported(name)
+
+        source = field.source
+        if source.startswith("get_") and source.endswith("_display"):
+            model_field = source[4:-len("_display")]
+            labels = dict(Property._meta.get_field(model_field).flatchoices)
+            self.columns.add(model_field)
+            return name, "display", model_field, labels
+        if isinstance(field, serializers.RelatedField):
+            self.columns.add(source)  # values("realtor") → realtor_id
+            return name, "raw", source, None
+        if "." in source:
+            key = source.replace(".", "__")
+            self.columns.add(key)
+            return name, "field", key, field.to_representation
+        self.columns.add(source)
+        return name, "field", source, field.to_representation
+
+    # --- фото ---
+    def _abs(self, rel):
+        return iri_to_uri(self.host + rel) if self.request and rel else rel
+
+    def _variant_rel(self, variants, variant, ext="webp"):
+        path = (variants or {}).get(variant, {}).get(ext)
+        return default_storage.url(path) if path else None
+
+    def _display_rel(self, img, variant):
+        # как PropertyImage.display_url: без готового варианта — исходник
+        return self._variant_rel(img["variants"], variant) or (
+            PropertyImage._meta.get_field("image").storage.url(img["image"]) if img["image"] else None
+        )
+
+    def _image_repr(self, img):
+        variants = img["variants"] or {}
+        return {
+            "id": img["id"],
+            "url": self._abs(self._display_rel(img, self.image_variant or "full")),
+            "width": img["width"],
+            "height": img["height"],
+            "variants": {
+                name: {ext: self._abs(self._variant_rel(variants, name, ext)) for ext in ("webp", "jpeg")}
+                for name in variants
+            },
+            "created_at": self.image_created_at(img["created_at"]) if img["created_at"] else None,
+        }
+
+    def _images_by_property(self, ids):
+        grouped = defaultdict(list)
+        if not ids:
+            return grouped
+        rows = (
+            PropertyImage.objects.filter(property_id__in=ids).order_by("id")
+            .values("id", "property_id", "image", "width", "height", "variants", "created_at")
+        )
+        for img in rows:
+            grouped[img["property_id"]].append(img)
+        return grouped
+
+    def _cover(self, images):
+        if not images:
+            return None
+        return self._abs(self._display_rel(images[0], self.image_variant or "card"))
+
+    # --- строки ---
+    def prepare(self, queryset):
+        """Тот же queryset, но отдающий словари только с нужными колонками."""
+        return queryset.prefetch_related(None).select_related(None).values(*self.columns)
+
+    def build(self, rows):
+        images = self._images_by_property([r["id"] for r in rows]) if self.needs_images else None
+        out = []
+        for row in rows:
+            item = {}
+            for name, kind, key, fmt in self.plan:
+                if kind == "field":
+                    value = row[key]
+                    item[name] = None if value is None else fmt(value)
+                elif kind == "raw":
+                    item[name] = row[key]
+                elif kind == "display":
+                    value = row[key]
+                    item[name] = fmt.get(value, value)
+                elif kind == "favorite":
+                    item[name] = bool(row[key])
+                elif kind == "cover":
+                    item[name] = self._cover(images.get(row["id"]))
+                else:  # images
+                    item[name] = [self._image_repr(img) for img in images.get(row["id"], [])]
+            out.append(item)
+        return out
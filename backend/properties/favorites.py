@@ -0,0 +1,69 @@
+# properties/favorites.py
+"""
+Избранное одним SQL-выражением: переключение и пакетная синхронизация без
+get/get_or_create/delete по очереди. Двойное нажатие не падает на unique_together —
+конфликт вставки гасит ON CONFLICT DO NOTHING.
+"""
+from django.db import connection
+
+from .models import Favorite, Property
+
+FAV = Favorite._meta.db_table
+PROP = Property._meta.db_table
+
+TOGGLE_SQL = f"""
+WITH del AS (
+    DELETE FROM {FAV} WHERE user_id = %(user)s AND property_id = %(prop)s RETURNING id
+), ins AS (
+    INSERT INTO {FAV} (user_id, property_id, created_at)
+    SELECT %(user)s, p.id, now() FROM {PROP} p
+    WHERE p.id = %(prop)s AND NOT EXISTS (SELECT 1 FROM del)
+    ON CONFLICT (user_id, property_id) DO NOTHING
+    RETURNING id
+)
+SELECT EXISTS (SELECT 1 FROM del), EXISTS (SELECT 1 FROM ins),
+       EXISTS (SELECT 1 FROM {PROP} WHERE id = %(prop)s)
+"""
+
+SYNC_SQL = f"""
+WITH del AS (
+    DELETE FROM {FAV} WHERE user_id = %(user)s AND property_id = ANY(%(remove)s::bigint[])
+    RETURNING property_id
+), ins AS (
+    INSERT INTO {FAV} (user_id, property_id, created_at)
+    SELECT %(user)s, p.id, now() FROM {PROP} p WHERE p.id = ANY(%(add)s::bigint[])
+    ON CONFLICT (user_id, property_id) DO NOTHING
+    RETURNING property_id
+)
+SELECT 'removed', array_agg(property_id) FROM del
+UNION ALL SELECT 'added', array_agg(property_id) FROM ins
+UNION ALL SELECT 'existing', array_agg(id) FROM {PROP} WHERE id = ANY(%(add)s::bigint[])
+"""
+
+
+def toggle_favorite(user, property_id):
+    """
+    True/False — состояние после переключения, None — объекта нет.
+    Если параллельный запрос успел добавить ту же пару, вставка ничего не делает,
+    а ответ — «в избранном» (именно это и лежит в БД).
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(TOGGLE_SQL, {"user": user.pk, "prop": property_id})
+        deleted, inserted, exists = cursor.fetchone()
+    if deleted:
+        return False
+    if inserted:
+        return True
+    return True if exists else None
+
+
+def sync_favorites(user, add=(), remove=()):
+    """Добавить/убрать пачку объектов одним запросом. {"added", "removed", "missing"}."""
+    with connection.cursor() as cursor:
+        cursor.execute(SYNC_SQL, {"user": user.pk, "add": list(add), "remove": list(remove)})
+        result = {kind: ids or [] for kind, ids in cursor.fetchall()}
+    return {
+        "added": sorted(result["added"]),
+        "removed": sorted(result["removed"]),
+        "missing": sorted(set(add) - set(result["existing"])),
+    }
@@ -0,0 +1,46 @@
+# properties/fieldsets.py
+"""
+Разреженные наборы полей: ?fields=id,title,price / ?omit=description,images.
+Сериализатор убирает лишние поля, а view по оставшимся сужает SQL (.only()) и
+пропускает ненужные prefetch/аннотации.
+"""
+
+# поля сериализатора, которые читают другие колонки (или не колонки вовсе)
+FIELD_COLUMNS = {
+    "realtor_name": ["realtor__username"],
+    "status_display": ["status"],
+    "deal_type_display": ["deal_type"],
+    "images": [],
+    "cover_url": [],
+    "is_favorite": [],
+}
+# нужны всегда: первичный ключ и поля сортировки/курсора
+ALWAYS_COLUMNS = {"id", "created_at", "price", "area", "rooms"}
+
+
+def _split(value):
+    return {f.strip() for f in (value or "").split(",") if f.strip()}
+
+
+def parse_fieldset(request):
+    """(fields | None, omit) из query string; None — «все поля»."""
+    params = request.query_params
+    return _split(params.get("fields")) or None, _split(params.get("omit"))
+
+
+def only_columns(field_names):
+    cols = set(ALWAYS_COLUMNS)
+    for name in field_names:
+        cols.update(FIELD_COLUMNS.get(name, [name]))
+    return cols
+
+
+class SparseFieldsMixin:
+    """Оставляет только поля из context["fields"] и убирает context["omit"]."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields, omit = self.context.get("fields"), self.context.get("omit") or set()
+        for name in list(self.fields):
+            if (fields is not None and name not in fields) or name in omit:
+                self.fields.pop(name)
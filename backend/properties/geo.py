@@ -0,0 +1,123 @@
+# properties/geo.py
+"""
+Карта каталога: выборка по окну (bbox) через GiST-индекс по point(longitude, latitude)
+и серверная кластеризация по сетке — GROUP BY ячейке прямо в SQL, так что на мелком
+масштабе приходит несколько сотен кластеров, а не каждая строка.
+"""
+import math
+
+from django.db.models import Avg, BooleanField, Count, F, FloatField, Func, Max, Min
+from django.db.models.functions import Floor
+from rest_framework.exceptions import ValidationError
+
+MIN_ZOOM, MAX_ZOOM = 0, 20
+TILE_CELLS = 4  # ячеек сетки на тайл 256px: кластер ≈ 64px на экране
+MAX_GRID_CELLS = 4096  # ячеек на окно: экран 4K — ≈ 60×34 ячеек по 64px, остальное — запас
+
+
+class GeoPoint(Func):
+    """point(longitude, latitude) — то же выражение, что и в индексе property_geo_gist."""
+    function = "point"
+    output_field = FloatField()  # тип точки Django не знает; значение наружу не отдаём
+
+    def __init__(self, lng="longitude", lat="latitude", **extra):
+        super().__init__(F(lng), F(lat), **extra)
+
+
+class InBox(Func):
+    """point <@ box(point(west, south), point(east, north)) — идёт в GiST-индекс."""
+    template = "(%(expressions)s)"
+    arg_joiner = " <@ "
+    output_field = BooleanField()
+
+    def __init__(self, point, west, south, east, north):
+        box = Func(
+            Func(west, south, function="point", output_field=FloatField()),
+            Func(east, north, function="point", output_field=FloatField()),
+            function="box", output_field=FloatField(),
+        )
+        super().__init__(point, box)
+
+
+def _float(value, name, lo, hi):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValidationError({name: "Ожидается число."})
+    if not lo <= value <= hi:
+        raise ValidationError({name: f"Допустимо от {lo} до {hi}."})
+    return value
+
+
+def parse_viewport(params):
+    """?bbox=west,south,east,north&zoom=Z → (west, south, east, north), zoom."""
+    parts = (params.get("bbox") or "").split(",")
+    if len(parts) != 4:
+        raise ValidationError({"bbox": "Формат: west,south,east,north."})
+    west, east = (_float(parts[i], "bbox", -180, 180) for i in (0, 2))
+    south, north = (_float(parts[i], "bbox", -90, 90) for i in (1, 3))
+    if west > east or south > north:
+        raise ValidationError({"bbox": "west ≤ east и south ≤ north."})
+    zoom = int(_float(params.get("zoom"), "zoom", MIN_ZOOM, MAX_ZOOM))
+    return (west, south, east, north), zoom
+
+
+def in_viewport(queryset, bbox):
+    return queryset.filter(
+        InBox(GeoPoint(), *bbox), latitude__isnull=False, longitude__isnull=False,
+    )
+
+
+def cell_size(zoom):
+    """Размер ячейки сетки в градусах: тайл на уровне zoom покрывает 360 / 2^zoom."""
+    return 360.0 / (2 ** zoom) / TILE_CELLS
+
+
+def grid_cells(bbox, zoom):
+    """Сколько ячеек сетки уровня zoom задевает окно."""
+    west, south, east, north = bbox
+    cell = cell_size(zoom)
+    return (
+        (math.floor(east / cell) - math.floor(west / cell) + 1)
+        * (math.floor(north / cell) - math.floor(south / cell) + 1)
+    )
+
+
+def grid_zoom(bbox, zoom):
+    """
+    Масштаб сетки для окна: zoom клиента, но не мельче MAX_GRID_CELLS ячеек — иначе
+    окно на весь мир при zoom 20 даёт по кластеру на объект, то есть весь каталог без пагинации.
+    """
+    while zoom > MIN_ZOOM and grid_cells(bbox, zoom) > MAX_GRID_CELLS:
+        zoom -= 1
+    return zoom
+
+
+def cluster_markers(queryset, zoom):
+    """
+    Кластеры по выборке, уже ограниченной окном (in_viewport / фильтр bbox). Сетка
+    привязана к (0, 0), поэтому при сдвиге карты ячейки не «прыгают».
+    Кластер из одного объекта отдаётся с его id.
+    """
+    cell = cell_size(zoom)
+    rows = (
+        queryset.order_by()
+        .annotate(cx=Floor(F("longitude") / cell), cy=Floor(F("latitude") / cell))
+        .values("cx", "cy")
+        .annotate(
+            count=Count("id"), lat=Avg("latitude"), lng=Avg("longitude"),
+            first_id=Min("id"), price_min=Min("price"), price_max=Max("price"),
+        )
+    )
+    clusters = []
+    for row in rows:
+        clusters.append({
+            "lat": round(row["lat"], 6),
+            "lng": round(row["lng"], 6),
+            "count": row["count"],
+            "id": row["first_id"] if row["count"] == 1 else None,
+            "price_min": row["price_min"],
+            "price_max": row["price_max"],
+        })
+    clusters.sort(key=lambda c: -c["count"])
+    return {"zoom": zoom, "cell": cell, "total": sum(c["count"] for c in clusters), "clusters": clusters}
@@ -0,0 +1,114 @@
+# properties/images.py
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# производные изображения: имя → максимальная сторона, px
+VARIANTS = {
+    "thumb": 320,
+    "card": 800,
+    "full": 1920,
+}
+FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+# фоновая очередь: превью строятся после коммита, вне запроса
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, "IMAGE_VARIANTS_WORKERS", 2),
+    thread_name_prefix="image-variants",
+)
+
+
+def variant_name(original_name, variant, ext):
+    folder, filename = os.path.split(original_name)
+    stem = os.path.splitext(filename)[0]
+    return f"{folder}/variants/{stem}_{variant}.{ext}"
+
+
+def render_variants(fileobj):
+    """
+    Открывает исходник, поворачивает по EXIF-ориентации и рендерит все варианты
+    без метаданных (EXIF/GPS не переносятся). Возвращает (width, height, {variant: {ext: bytes}}, sizes).
+    """
+    with Image.open(fileobj) as src:
+        img = ImageOps.exif_transpose(src)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        width, height = img.size
+        rendered, sizes = {}, {}
+        for variant, max_side in VARIANTS.items():
+            copy = img.copy()
+            copy.thumbnail((max_side, max_side), Image.LANCZOS)
+            sizes[variant] = copy.size
+            rendered[variant] = {}
+            for ext, (fmt, options) in FORMATS.items():
+                buf = BytesIO()
+                copy.save(buf, fmt, **options)
+                rendered[variant][ext] = buf.getvalue()
+    return width, height, rendered, sizes
+
+
+def build_variants(image, force=False):
+    """Строит варианты для PropertyImage и сохраняет пути/размеры (без post_save)."""
+    from .models import Property, PropertyImage
+
+    # то же содержимое (тот же blob) уже обработано для другого объекта — переиспользуем
+    done = (
+        PropertyImage.objects.filter(image=image.image.name).exclude(pk=image.pk)
+        .exclude(variants={}).values("width", "height", "variants").first()
+    )
+    if done and not force:
+        width, height, variants = done["width"], done["height"], done["variants"]
+        PropertyImage.objects.filter(pk=image.pk).update(width=width, height=height, variants=variants)
+        Property.touch(image.property_id)
+        image.width, image.height, image.variants = width, height, variants
+        return variants
+
+    with image.image.storage.open(image.image.name, "rb") as fh:
+        width, height, rendered, sizes = render_variants(fh)
+
+    variants = {}
+    for variant, files in rendered.items():
+        w, h = sizes[variant]
+        variants[variant] = {"width": w, "height": h}
+        for ext, data in files.items():
+            name = variant_name(image.image.name, variant, ext)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            variants[variant][ext] = default_storage.save(name, ContentFile(data))
+
+    PropertyImage.objects.filter(pk=image.pk).update(width=width, height=height, variants=variants)
+    Property.touch(image.property_id)
+    image.width, image.height, image.variants = width, height, variants
+    return variants
+
+
+def _process(image_id):
+    from .models import PropertyImage
+
+    close_old_connections()
+    try:
+        image = PropertyImage.objects.filter(pk=image_id).first()
+        if image is not None:
+            build_variants(image)
+    except Exception:
+        # битый файл/не изображение — оставляем оригинал, превью можно перестроить командой
+        logger.exception("Failed to build variants for PropertyImage<%s>", image_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_variants(image_id):
+    """Поставить построение вариантов в фоновую очередь после коммита транзакции."""
+    transaction.on_commit(lambda: _executor.submit(_process, image_id))
@@ -0,0 +1,376 @@
+# properties/importer.py
+"""
+Массовый импорт объектов из CSV / JSON (массив или JSON Lines) — для выгрузок
+из других CRM и таблиц. Поток читается пачками по IMPORT_BATCH_SIZE строк:
+
+1. проверка пачки по колонкам: поля — to_internal_value полей PropertySerializer,
+   затем правила PropertySerializer.validate (NON_NEGATIVE_FIELDS и т.д.) сразу
+   для всех строк; строки с ошибками в отчёт, остальные — дальше;
+2. COPY валидных строк во временную таблицу (ON COMMIT DROP);
+3. INSERT ... SELECT ... ON CONFLICT (external_source, external_id) DO UPDATE —
+   строка с уже известным external_id обновляет объект (только свой, staff — любой);
+4. то, что при save() делают сигналы: ключи дублей, статистика цен, версия
+   каталога, события, сохранённые поиски; аудит — одна сводная запись на пачку.
+
+Каждая пачка — своя транзакция: сбой БД в одной пачке не откатывает предыдущие.
+"""
+import csv
+import io
+import itertools
+import json
+import logging
+import re
+
+from django.db import DataError, DatabaseError, IntegrityError, connection, transaction
+from rest_framework import serializers
+
+from audit.signals import write_summary_log
+from realtime.events import property_event, publish
+
+from .caching import bump_catalog_version
+from .duplicates import fill_keys
+from .models import Property
+from .saved_searches import schedule_match
+from .serializers import (
+    COORDS_TOGETHER, NON_NEGATIVE_FIELDS, REQUIRED_TEXT_FIELDS, STRING_LIST_FIELDS,
+    PropertySerializer, is_string_list,
+)
+from .stats import apply_changes, snapshot
+
+IMPORT_BATCH_SIZE = 1000
+IMPORT_MAX_ERRORS = 1000  # в отчёте; счётчик failed — полный
+IMPORT_FORMATS = ("csv", "json")
+DEFAULT_SOURCE = "import"
+DB_ROW_ERROR = "Строка не прошла ограничения базы данных."
+DB_BATCH_ERROR = "Пачка не записана из-за ошибки базы данных, повторите импорт."
+
+EXTERNAL_ID_MAX = Property._meta.get_field("external_id").max_length
+SOURCE_MAX = Property._meta.get_field("external_source").max_length
+# пишутся COPY помимо полей сериализатора
+SYSTEM_COLUMNS = ("id", "realtor", "external_source", "external_id", "phone_key", "address_key")
+
+logger = logging.getLogger(__name__)
+
+
+class ImportFormatError(ValueError):
+    """Файл не читается как CSV/JSON целиком (а не отдельная строка)."""
+
+
+def import_fields():
+    """Записываемые поля PropertySerializer: имя → поле DRF."""
+    return {name: f for name, f in PropertySerializer().fields.items() if not f.read_only}
+
+
+# --- чтение ---------------------------------------------------------------
+
+def _csv_rows(stream):
+    header = stream.readline()
+    if not header.strip():
+        return
+    # Excel в русской локали сохраняет CSV через ";"
+    delimiter = max((",", ";", "\t"), key=header.count)
+    reader = csv.DictReader(itertools.chain([header], stream), delimiter=delimiter)
+    reader.fieldnames = [name.strip() for name in reader.fieldnames]
+    for row in reader:
+        yield reader.line_num, {k: v for k, v in row.items() if k is not None}
+
+
+_SEPARATORS = re.compile(r"[\s,]*")
+
+
+def _json_rows(stream, chunk_size=1 << 16):
+    """
+    Массив объектов или JSON Lines, без чтения файла целиком: объекты
+    декодируются из буфера по одному (raw_decode), буфер дочитывается по мере надобности.
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, number, array, eof = "", 0, 0, None, False
+    while True:
+        pos = _SEPARATORS.match(buf, pos).end()
+        if pos < len(buf):
+            if array is None:
+                array = buf[pos] == "["
+                pos += array
+                continue
+            if array and buf[pos] == "]":
+                return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise ImportFormatError(f"JSON: {e.msg} (объект {number + 1})")
+            else:
+                number += 1
+                pos = end
+                yield number, obj
+                continue
+        elif eof:
+            if array:
+                raise ImportFormatError("JSON: массив не закрыт")
+            return
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buf, pos = buf[pos:] + chunk, 0
+
+
+def read_rows(stream, fmt):
+    """(номер строки/объекта, dict) из текстового потока."""
+    if fmt not in IMPORT_FORMATS:
+        raise ImportFormatError(f"Формат: {', '.join(IMPORT_FORMATS)}")
+    try:
+        yield from (_csv_rows(stream) if fmt == "csv" else _json_rows(stream))
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise ImportFormatError(str(e))
+
+
+def text_stream(binary):
+    return io.TextIOWrapper(binary, encoding="utf-8-sig", newline="")
+
+
+# --- проверка пачки ---------------------------------------------------------
+
+def _from_csv(field, value):
+    """Ячейка CSV — всегда строка: пустая → null (где можно), списки — через запятую."""
+    value = value.strip() if isinstance(value, str) else value
+    if value in ("", None):
+        return None if field.allow_null else ""
+    if field.field_name in STRING_LIST_FIELDS:
+        return [v.strip() for v in value.split(",") if v.strip()]
+    return value
+
+
+def validate_batch(rows, fields, csv_input=False):
+    """
+    rows: [(номер, dict)]. Проверка идёт по колонкам, не по строкам: поле за полем
+    для всей пачки, затем правила PropertySerializer.validate — тоже для всей пачки.
+    → ([(номер, attrs, external_id)], [{"row", "errors"}])
+    """
+    attrs = [{} for _ in rows]
+    errors = [{} for _ in rows]
+
+    for name, field in fields.items():
+        for i, (_, raw) in enumerate(rows):
+            if not isinstance(raw, dict):
+                errors[i].setdefault("non_field_errors", ["Ожидается объект."])
+                continue
+            if name not in raw:
+                if field.required:
+                    errors[i][name] = [field.error_messages["required"]]
+                continue
+            value = _from_csv(field, raw[name]) if csv_input else raw[name]
+            try:
+                attrs[i][name] = field.run_validation(value)
+            except serializers.ValidationError as e:
+                errors[i][name] = e.detail
+
+    for name in NON_NEGATIVE_FIELDS:
+        for a, err in zip(attrs, errors):
+            if a.get(name) is not None and a[name] < 0:
+                err.setdefault(name, ["Must be ≥ 0"])
+    for name in REQUIRED_TEXT_FIELDS:
+        for a, err in zip(attrs, errors):
+            if name in a and not a[name]:
+                err.setdefault(name, ["Required"])
+    for a, err in zip(attrs, errors):
+        if (a.get("latitude") is None) != (a.get("longitude") is None):
+            err.setdefault("latitude", [COORDS_TOGETHER])
+    for name in STRING_LIST_FIELDS:
+        for a, err in zip(attrs, errors):
+            if a.get(name) is not None and not is_string_list(a[name]):
+                err.setdefault(name, ["Must be a list of strings"])
+
+    # external_id: строка, уникальна внутри пачки (ON CONFLICT не обновит строку дважды)
+    external, seen = [], set()
+    for (_, raw), err in zip(rows, errors):
+        ext = str(raw.get("external_id") or "").strip() if isinstance(raw, dict) else ""
+        if len(ext) > EXTERNAL_ID_MAX:
+            err["external_id"] = [f"Не длиннее {EXTERNAL_ID_MAX} символов."]
+        elif ext and ext in seen:
+            err["external_id"] = ["Повторяется в файле."]
+        seen.add(ext)
+        external.append(ext)
+
+    valid = [(number, a, ext) for (number, _), a, ext, err in zip(rows, attrs, external, errors) if not err]
+    failed = [{"row": number, "errors": err} for (number, _), err in zip(rows, errors) if err]
+    return valid, failed
+
+
+# --- запись -----------------------------------------------------------------
+
+def _copy_value(value):
+    if value is None:
+        return r"\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (list, dict)):
+        value = json.dumps(value, ensure_ascii=False)
+    return (
+        str(value).replace("\\", "\\\\").replace("\t", "\\t")
+        .replace("\n", "\\n").replace("\r", "\\r")
+    )
+
+
+def _copy(cursor, table, columns, rows):
+    """COPY FROM STDIN (текстовый формат) через psycopg 3 cursor.copy()."""
+    data = "".join("\t".join(map(_copy_value, row)) + "\n" for row in rows)
+    with cursor.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+        copy.write(data)
+
+
+class _Writer:
+    """Запись пачки: временная таблица → upsert в properties_property."""
+
+    def __init__(self, fields, user, source):
+        self.user, self.source = user, source
+        self.names = [*fields, *SYSTEM_COLUMNS]
+        self.model_fields = [Property._meta.get_field(n) for n in self.names]
+        self.columns = [f.column for f in self.model_fields]
+        self.defaults = {f.name: f.get_default() for f in self.model_fields}
+        table = Property._meta.db_table
+        cols = ", ".join(self.columns)
+        updated = ", ".join(
+            f"{c} = EXCLUDED.{c}" for c in self.columns if c not in ("id", "realtor_id", "external_source", "external_id")
+        )
+        owner = "" if user.is_staff else f" WHERE {table}.realtor_id = EXCLUDED.realtor_id"
+        self.stage_sql = (
+            f"CREATE TEMP TABLE IF NOT EXISTS property_import_stage ON COMMIT DROP AS "
+            f"SELECT {cols} FROM {table} WITH NO DATA"
+        )  # IF NOT EXISTS/TRUNCATE — на случай внешней транзакции вокруг всего импорта
+        self.upsert_sql = (
+            f"INSERT INTO {table} ({cols}, created_at, updated_at) "
+            f"SELECT {cols}, now(), now() FROM property_import_stage "
+            f"ON CONFLICT (external_source, external_id) WHERE external_id <> '' "
+            f"DO UPDATE SET {updated}, updated_at = now(){owner} "
+            f"RETURNING id, external_id, (xmax = 0)"
+        )
+        self.sequence_sql = f"SELECT nextval(pg_get_serial_sequence('{table}', 'id')) FROM generate_series(1, %s)"
+
+    def write(self, valid):
+        """→ (созданные, обновлённые, [{"row", "errors"}])"""
+        keys = [ext for _, _, ext in valid if ext]
+        existing = {
+            obj.external_id: obj
+            for obj in Property.objects.select_for_update().defer("search_vector")
+            .filter(external_source=self.source, external_id__in=keys)
+        } if keys else {}
+
+        failed, objs, rows, numbers = [], [], [], []
+        for number, attrs, ext in valid:
+            current = existing.get(ext) if ext else None
+            if current is not None and not self.user.is_staff and current.realtor_id != self.user.pk:
+                failed.append({"row": number, "errors": {"external_id": ["Объект принадлежит другому риелтору."]}})
+                continue
+            obj = Property(**{
+                name: (getattr(current, name) if current is not None else default)
+                for name, default in self.defaults.items() if name not in ("id", "realtor")
+            })
+            for name, value in attrs.items():
+                setattr(obj, name, value)
+            obj.realtor_id = current.realtor_id if current is not None else self.user.pk
+            obj.external_source, obj.external_id = self.source, ext
+            fill_keys(obj)
+            objs.append((obj, current))
+            numbers.append(number)
+
+        if not objs:
+            return [], [], failed
+        with connection.cursor() as cursor:
+            cursor.execute(self.sequence_sql, [len(objs)])
+            for (obj, _), (pk,) in zip(objs, cursor.fetchall()):
+                obj.pk = pk
+            for obj, _ in objs:
+                rows.append([
+                    obj.realtor_id if name == "realtor" else getattr(obj, name) for name in self.names
+                ])
+            cursor.execute(self.stage_sql)
+            cursor.execute("TRUNCATE property_import_stage")
+            _copy(cursor.cursor, "property_import_stage", self.columns, rows)
+            cursor.execute(self.upsert_sql)
+            returned = cursor.fetchall()
+        # при конфликте RETURNING отдаёт id существующей строки, а не заготовленный obj.pk —
+        # строки с external_id сопоставляем по нему (в пачке он уникален)
+        by_pk = {pk: inserted for pk, _, inserted in returned}
+        by_ext = {ext: (pk, inserted) for pk, ext, inserted in returned if ext}
+
+        created, updated, before, was_active = [], [], [], set()
+        for number, (obj, current) in zip(numbers, objs):
+            hit = by_ext.get(obj.external_id) if obj.external_id else (
+                (obj.pk, by_pk[obj.pk]) if obj.pk in by_pk else None
+            )
+            if hit is None:
+                # между проверкой и вставкой объект с этим ключом завёл другой риелтор
+                failed.append({"row": number, "errors": {"external_id": ["Объект с этим external_id создан параллельно, повторите строку."]}})
+                continue
+            obj.pk, inserted = hit
+            if inserted:
+                created.append(obj)
+                before.append(None)
+            else:
+                updated.append(obj)
+                # current нет — объект завели параллельно: прежних значений не знаем,
+                # статистику цен поправит recompute_price_stats
+                before.append(snapshot(current) if current is not None else None)
+                if current is not None and current.status == Property.Status.ACTIVE:
+                    was_active.add(obj.pk)
+
+        written_objs = created + updated
+        apply_changes(zip(before, [snapshot(obj) for obj in written_objs]))
+        bump_catalog_version()
+        publish(*[property_event(obj, "created", False) for obj in created],
+                *[property_event(obj, "updated", obj.pk in was_active) for obj in updated])
+        schedule_match([obj for obj in written_objs if obj.pk not in was_active])
+        return created, updated, failed
+
+
+def import_properties(stream, fmt, user, source=DEFAULT_SOURCE, batch_size=IMPORT_BATCH_SIZE, dry_run=False):
+    """
+    stream — текстовый поток (см. text_stream). Объекты заводятся от имени user.
+    → {"rows", "created", "updated", "failed", "batches", "errors": [{"row", "errors"}],
+       "errors_truncated", "ignored_columns", "dry_run"}
+    """
+    source = (source or DEFAULT_SOURCE)[:SOURCE_MAX]
+    fields = import_fields()
+    known = set(fields) | {"external_id"}
+    writer = None if dry_run else _Writer(fields, user, source)
+    report = {
+        "rows": 0, "created": 0, "updated": 0, "failed": 0, "batches": 0,
+        "errors": [], "errors_truncated": False, "ignored_columns": set(), "dry_run": dry_run,
+    }
+
+    def fail(items):
+        report["failed"] += len(items)
+        room = IMPORT_MAX_ERRORS - len(report["errors"])
+        report["errors"].extend(items[:max(room, 0)])
+        report["errors_truncated"] |= len(items) > room
+
+    rows = read_rows(stream, fmt)
+    while batch := list(itertools.islice(rows, batch_size)):
+        report["rows"] += len(batch)
+        report["batches"] += 1
+        for _, raw in batch:
+            if isinstance(raw, dict):
+                report["ignored_columns"].update(set(raw) - known)
+        valid, failed = validate_batch(batch, fields, csv_input=fmt == "csv")
+        if writer is not None and valid:
+            try:
+                with transaction.atomic():
+                    created, updated, rejected = writer.write(valid)
+                    failed += rejected
+                    write_summary_log(
+                        "imported", "properties.property",
+                        f"import {source} #{report['batches']}: строк {len(batch)}, создано {len(created)}, "
+                        f"обновлено {len(updated)}, ошибок {len(failed)}",
+                        user=user,
+                    )
+            except DatabaseError as e:
+                # текст PostgreSQL (ограничения, колонки) — в лог, в отчёт — общее сообщение
+                logger.exception("Import %s batch #%s failed", source, report["batches"])
+                message = DB_ROW_ERROR if isinstance(e, (IntegrityError, DataError)) else DB_BATCH_ERROR
+                failed += [{"row": number, "errors": {"non_field_errors": [message]}} for number, _, _ in valid]
+            else:
+                report["created"] += len(created)
+                report["updated"] += len(updated)
+        fail(sorted(failed, key=lambda item: item["row"]))
+
+    report["ignored_columns"] = sorted(report["ignored_columns"])
+    return report
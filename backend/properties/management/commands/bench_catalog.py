@@ -0,0 +1,64 @@
+# properties/management/commands/bench_catalog.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import BooleanField, Prefetch, Value
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.renderers import ORJSONRenderer
+from properties.fastpath import FastPropertyRows
+from properties.models import Property, PropertyImage
+from properties.serializers import PropertySerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает сериализацию страницы каталога: ModelSerializer + json "
+        "против .values() (FastPropertyRows) + orjson на текущих данных БД."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500, help="Размер «страницы»")
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **opts):
+        request = Request(APIRequestFactory().get("/api/v1/properties/"))
+        ctx = {"request": request, "image_variant": "thumb"}
+        base = (
+            Property.objects.order_by("-created_at").defer("search_vector")
+            .annotate(favorited=Value(False, output_field=BooleanField()))
+        )
+        n = base.count()
+        if not n:
+            self.stderr.write("В базе нет объектов — нечего мерить.")
+            return
+        rows = min(opts["rows"], n)
+
+        def slow():
+            qs = base.select_related("realtor").prefetch_related(
+                Prefetch("images", queryset=PropertyImage.objects.order_by("id"))
+            )[:rows]
+            data = PropertySerializer(qs, many=True, context=ctx).data
+            return JSONRenderer().render(data)
+
+        def fast():
+            fast_rows = FastPropertyRows(PropertySerializer(context=ctx), request, image_variant="thumb")
+            data = fast_rows.build(list(fast_rows.prepare(base)[:rows]))
+            return ORJSONRenderer().render(data)
+
+        results = {}
+        for name, fn in (("serializer+json", slow), ("values+orjson", fast)):
+            fn()  # прогрев
+            best = float("inf")
+            for _ in range(opts["repeat"]):
+                started = time.perf_counter()
+                body = fn()
+                best = min(best, time.perf_counter() - started)
+            results[name] = (best, body)
+            self.stdout.write(f"{name:16} {best * 1000:8.1f} ms  ({len(body)} B, {rows} rows)")
+
+        same = results["serializer+json"][1] == results["values+orjson"][1]
+        speedup = results["serializer+json"][0] / results["values+orjson"][0]
+        self.stdout.write(self.style.SUCCESS(f"Ускорение: x{speedup:.1f}; ответы совпадают: {same}"))
@@ -0,0 +1,34 @@
+# properties/management/commands/build_image_variants.py
+from django.core.management.base import BaseCommand
+
+from properties.images import build_variants
+from properties.models import PropertyImage
+
+
+class Command(BaseCommand):
+    help = (
+        "Строит превью (thumb/card/full, WebP+JPEG, без EXIF) для фото объектов. "
+        "По умолчанию — только для тех, у кого их ещё нет (догоняет фоновую очередь)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Перестроить варианты для всех фото")
+        parser.add_argument("--property", type=int, help="Только фото указанного объекта")
+        parser.add_argument("--batch-size", type=int, default=200)
+
+    def handle(self, *args, **opts):
+        qs = PropertyImage.objects.order_by("id")
+        if not opts["all"]:
+            qs = qs.filter(variants={})
+        if opts["property"]:
+            qs = qs.filter(property_id=opts["property"])
+
+        done = failed = 0
+        for img in qs.iterator(chunk_size=opts["batch_size"]):
+            try:
+                build_variants(img, force=opts["all"])
+                done += 1
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"PropertyImage<{img.pk}>: {exc}")
+        self.stdout.write(self.style.SUCCESS(f"Готово: {done}, ошибок: {failed}"))
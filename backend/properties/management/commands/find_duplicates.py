@@ -0,0 +1,65 @@
+# properties/management/commands/find_duplicates.py
+from itertools import combinations, groupby
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from properties.duplicates import LIKELY_SCORE, SCORE_FIELDS, score_pair
+from properties.models import DuplicateCandidate, Property
+
+BLOCK_KEYS = ("phone_key", "address_key")
+
+
+class Command(BaseCommand):
+    help = (
+        "Пакетный поиск дублей: объекты группируются по блокирующим ключам "
+        "(телефон, нормализованный адрес), пары оцениваются только внутри блока. "
+        "Результат — таблица DuplicateCandidate."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--min-score", type=float, default=LIKELY_SCORE)
+        parser.add_argument("--max-block", type=int, default=200, help="Блоки крупнее пропускаются (общий номер агентства и т.п.)")
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--reset", action="store_true", help="Удалить ранее найденные пары")
+
+    def handle(self, *args, **opts):
+        pairs = {}  # (меньший id, больший id) → (score, reasons)
+        skipped = 0
+        for key in BLOCK_KEYS:
+            # один проход по индексу ключа: строки идут блоками, блок — соседние строки
+            rows = (
+                Property.objects.exclude(**{key: ""}).exclude(status=Property.Status.ARCHIVED)
+                .order_by(key, "id").values(*SCORE_FIELDS)
+                .iterator(chunk_size=opts["batch_size"])
+            )
+            for _, block in groupby(rows, key=lambda r: r[key]):
+                block = list(block)
+                if len(block) < 2:
+                    continue
+                if len(block) > opts["max_block"]:
+                    skipped += 1
+                    continue
+                for a, b in combinations(block, 2):
+                    pair = (a["id"], b["id"])
+                    if pair in pairs:
+                        continue
+                    score, reasons = score_pair(a, b)
+                    if score >= opts["min_score"]:
+                        pairs[pair] = (score, reasons)
+
+        objs = [
+            DuplicateCandidate(property_id=a, duplicate_id=b, score=score, reasons=reasons)
+            for (a, b), (score, reasons) in pairs.items()
+        ]
+        with transaction.atomic():
+            if opts["reset"]:
+                DuplicateCandidate.objects.all().delete()
+            DuplicateCandidate.objects.bulk_create(
+                objs, batch_size=opts["batch_size"],
+                update_conflicts=True, unique_fields=["property", "duplicate"],
+                update_fields=["score", "reasons"],
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Пар: {len(objs)}, пропущено крупных блоков: {skipped}"
+        ))
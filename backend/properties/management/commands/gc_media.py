@@ -0,0 +1,155 @@
+# properties/management/commands/gc_media.py
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from properties.models import ImageBlob, PropertyImage
+from properties.storage import content_addressed_storage, lock_blob
+
+SCAN_ROOTS = ("properties", "blobs", "uploads")
+
+# все пути, на которые ссылается БД: оригиналы, их превью и заготовки кусочных загрузок.
+# ORDER BY ... COLLATE "C" — побайтовый порядок, тот же, что у обхода диска ниже.
+REFERENCED_SQL = """
+SELECT DISTINCT name COLLATE "C" AS name FROM (
+    SELECT image AS name FROM properties_propertyimage
+    UNION ALL
+    SELECT v.value ->> e.ext
+    FROM properties_propertyimage i
+    CROSS JOIN LATERAL jsonb_each(i.variants) v
+    CROSS JOIN (VALUES ('webp'), ('jpeg')) e(ext)
+    WHERE jsonb_typeof(v.value) = 'object' AND v.value ? e.ext
+    UNION ALL
+    SELECT 'uploads/' || id::text || '.part' FROM properties_imageupload
+) refs
+WHERE name IS NOT NULL AND name <> ''
+ORDER BY 1
+"""
+
+
+def walk_sorted(root, rel=""):
+    """
+    Файлы под root в побайтовом порядке полных путей, без загрузки всего дерева в память:
+    в каждом каталоге записи сортируются так, будто у подкаталогов на конце «/».
+    """
+    base = os.path.join(root, rel) if rel else root
+    try:
+        entries = list(os.scandir(base))
+    except FileNotFoundError:
+        return
+    keyed = []
+    for entry in entries:
+        is_dir = entry.is_dir(follow_symlinks=False)
+        keyed.append(((entry.name + ("/" if is_dir else "")).encode(), entry, is_dir))
+    keyed.sort(key=lambda x: x[0])
+    for _, entry, is_dir in keyed:
+        path = f"{rel}/{entry.name}" if rel else entry.name
+        if is_dir:
+            yield from walk_sorted(root, path)
+        else:
+            st = entry.stat(follow_symlinks=False)
+            yield path, st.st_size, st.st_mtime
+
+
+def iter_referenced(batch_size):
+    # серверный курсор: имена приходят пачками, а не всей таблицей
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(REFERENCED_SQL)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for (name,) in rows:
+                yield name
+
+
+class Command(BaseCommand):
+    help = (
+        "Ищет в MEDIA_ROOT файлы фото без записей в БД (сироты) и записи без файлов. "
+        "По умолчанию только отчёт (dry-run); --delete удаляет сирот пачками."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--delete", action="store_true", help="Удалить найденные файлы-сироты")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--min-age", type=int, default=60,
+            help="Не трогать файлы моложе N минут (идущие загрузки ещё не закоммичены)",
+        )
+        parser.add_argument("--verbose-list", action="store_true", help="Печатать каждый путь")
+
+    def handle(self, *args, **opts):
+        media_root = str(settings.MEDIA_ROOT)
+        cutoff = time.time() - opts["min_age"] * 60
+        batch_size = opts["batch_size"]
+
+        def files():
+            for top in sorted(SCAN_ROOTS):
+                yield from walk_sorted(media_root, top)
+
+        orphans = orphan_bytes = missing = young = reacquired = 0
+        pending = []
+
+        def flush():
+            nonlocal reacquired
+            # между обходом и удалением загрузка могла переиспользовать сироту (дедупликация
+            # не трогает mtime): как и storage._remove — под блокировкой строк ImageBlob
+            # перепроверяем ссылки и удаляем файл до коммита, пока блокировка держится
+            with transaction.atomic():
+                for path in pending:
+                    if path.startswith(f"{content_addressed_storage.prefix}/"):
+                        lock_blob(path)  # строки может не быть — заводим, чтобы ждать чужой lock_blob
+                blobs = dict(
+                    ImageBlob.objects.select_for_update().filter(name__in=pending).values_list("name", "ref_count")
+                )
+                used = set(PropertyImage.objects.filter(image__in=pending).values_list("image", flat=True))
+                removable = [path for path in pending if not blobs.get(path) and path not in used]
+                reacquired += len(pending) - len(removable)
+                for path in removable:
+                    try:
+                        os.remove(os.path.join(media_root, path))
+                    except FileNotFoundError:
+                        pass
+                # счётчики ссылок на удалённые файлы больше не нужны
+                ImageBlob.objects.filter(name__in=removable, ref_count=0).delete()
+            pending.clear()
+
+        # слияние двух отсортированных потоков: диск × БД
+        disk, db = files(), iter_referenced(batch_size)
+        f, ref = next(disk, None), next(db, None)
+        while f is not None or ref is not None:
+            f_key = f[0].encode() if f is not None else None
+            r_key = ref.encode() if ref is not None else None
+            if f is not None and (r_key is None or f_key < r_key):
+                path, size, mtime = f
+                if mtime > cutoff:
+                    young += 1
+                else:
+                    orphans += 1
+                    orphan_bytes += size
+                    if opts["verbose_list"]:
+                        self.stdout.write(f"orphan  {path} ({size} B)")
+                    if opts["delete"]:
+                        pending.append(path)
+                        if len(pending) >= batch_size:
+                            flush()
+                f = next(disk, None)
+            elif f is None or r_key < f_key:
+                # uploads/*.part появляется только после первого куска — это не «пропажа»
+                if not ref.startswith("uploads/"):
+                    missing += 1
+                    if opts["verbose_list"]:
+                        self.stdout.write(f"missing {ref}")
+                ref = next(db, None)
+            else:
+                f, ref = next(disk, None), next(db, None)
+        flush()
+
+        action = "удалено" if opts["delete"] else "найдено (dry-run)"
+        self.stdout.write(self.style.SUCCESS(
+            f"Сирот {action}: {orphans}, {orphan_bytes / 1024 / 1024:.1f} MB; "
+            f"пропущено свежих: {young}; снова используются: {reacquired}; записей без файла: {missing}"
+        ))
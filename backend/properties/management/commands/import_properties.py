@@ -0,0 +1,67 @@
+import csv
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from properties.importer import (
+    DEFAULT_SOURCE, IMPORT_BATCH_SIZE, IMPORT_FORMATS, ImportFormatError, import_properties, text_stream,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Импорт объектов из CSV/JSON (массив или JSON Lines): пачки проверяются по правилам "
+        "PropertySerializer, грузятся COPY и upsert'ом по (source, external_id). "
+        "Ошибки — по номерам строк (--errors пишет их в CSV)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл или - для stdin")
+        parser.add_argument("--user", required=True, help="username риелтора, от имени которого заводятся объекты")
+        parser.add_argument("--format", choices=IMPORT_FORMATS, help="По умолчанию — по расширению файла")
+        parser.add_argument("--source", default=DEFAULT_SOURCE, help="Имя внешней системы (ключ upsert)")
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument("--dry-run", action="store_true", help="Только проверка, без записи")
+        parser.add_argument("--errors", help="CSV-отчёт об ошибках: row, field, message")
+
+    def handle(self, *args, **opts):
+        user = get_user_model().objects.filter(username=opts["user"]).first()
+        if user is None:
+            raise CommandError(f"Пользователь {opts['user']} не найден")
+        path = opts["path"]
+        fmt = opts["format"] or path.rsplit(".", 1)[-1].lower()
+        fmt = "json" if fmt in ("jsonl", "ndjson") else fmt
+        if fmt not in IMPORT_FORMATS:
+            raise CommandError("Не удалось определить формат, укажите --format")
+
+        binary = sys.stdin.buffer if path == "-" else open(path, "rb")
+        try:
+            report = import_properties(
+                text_stream(binary), fmt, user, source=opts["source"],
+                batch_size=opts["batch_size"], dry_run=opts["dry_run"],
+            )
+        except ImportFormatError as e:
+            raise CommandError(str(e))
+        finally:
+            if binary is not sys.stdin.buffer:
+                binary.close()
+
+        if opts["errors"]:
+            with open(opts["errors"], "w", newline="", encoding="utf-8-sig") as fh:
+                writer = csv.writer(fh)
+                writer.writerow(["row", "field", "message"])
+                for item in report["errors"]:
+                    for field, messages in item["errors"].items():
+                        for message in messages:
+                            writer.writerow([item["row"], field, message])
+
+        for item in report["errors"][:20]:
+            self.stderr.write(f"строка {item['row']}: {item['errors']}")
+        if report["ignored_columns"]:
+            self.stdout.write(f"Пропущены колонки: {', '.join(report['ignored_columns'])}")
+        prefix = "Проверка (dry run): " if report["dry_run"] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}строк {report['rows']}, создано {report['created']}, обновлено {report['updated']}, "
+            f"ошибок {report['failed']}, пачек {report['batches']}"
+        ))
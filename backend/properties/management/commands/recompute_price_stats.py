@@ -0,0 +1,20 @@
+# properties/management/commands/recompute_price_stats.py
+from django.core.management.base import BaseCommand
+
+from properties.caching import bump_catalog_version
+from properties.stats import recompute
+
+
+class Command(BaseCommand):
+    help = (
+        "Точный пересчёт статистики цены за м² (PriceStat): квантили — percentile_cont в БД, "
+        "гистограммы для инкрементальных обновлений — потоково. Запускать периодически (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **opts):
+        groups = recompute(batch_size=opts["batch_size"])
+        bump_catalog_version()  # кэш /properties/stats/ завязан на версию каталога
+        self.stdout.write(self.style.SUCCESS(f"Групп: {groups}"))
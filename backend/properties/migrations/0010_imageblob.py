@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:17
+
+import properties.models
+import properties.storage
+from django.db import migrations, models
+
+
+def count_existing_images(apps, schema_editor):
+    # уже загруженные файлы лежат по старым путям — заводим для них blob-записи со счётчиком ссылок
+    PropertyImage = apps.get_model("properties", "PropertyImage")
+    ImageBlob = apps.get_model("properties", "ImageBlob")
+    rows = PropertyImage.objects.values("image").annotate(n=models.Count("id")).order_by()
+    ImageBlob.objects.bulk_create(
+        [ImageBlob(name=r["image"], ref_count=r["n"]) for r in rows.iterator()],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0009_imageupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='propertyimage',
+            name='image',
+            field=models.ImageField(storage=properties.storage.ContentAddressedStorage(), upload_to=properties.models.property_image_upload_to),
+        ),
+        migrations.RunPython(count_existing_images, migrations.RunPython.noop),
+    ]
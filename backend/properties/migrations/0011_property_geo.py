@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:25
+
+import django.contrib.postgres.indexes
+import properties.geo
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0010_imageblob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=django.contrib.postgres.indexes.GistIndex(properties.geo.GeoPoint(), condition=models.Q(('latitude__isnull', False), ('longitude__isnull', False)), name='property_geo_gist'),
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:26
+
+import django.db.models.deletion
+from django.conf import settings
+import re
+
+from django.db import migrations, models
+
+# замороженная копия properties.duplicates на момент миграции (код приложения дальше меняется)
+ADDRESS_STOP_WORDS = {
+    "г", "город", "ул", "улица", "пр", "пр-т", "проспект", "пер", "переулок", "бул", "бульвар",
+    "мкр", "мкрн", "микрорайон", "ж", "м", "жм", "д", "дом", "кв", "квартира", "корп", "корпус",
+}
+_TOKEN_RE = re.compile(r"[0-9a-zа-яё]+(?:-[0-9a-zа-яё]+)*")
+
+
+def fill_keys(prop):
+    digits = re.sub(r"\D", "", prop.phone or "")
+    prop.phone_key = digits[-9:] if len(digits) >= 9 else ""
+    tokens = _TOKEN_RE.findall((prop.address or "").lower().replace("ё", "е"))
+    prop.address_key = " ".join(sorted({t for t in tokens if t not in ADDRESS_STOP_WORDS}))[:255]
+    return prop
+
+
+def fill_duplicate_keys(apps, schema_editor):
+    Property = apps.get_model("properties", "Property")
+    batch = []
+    for prop in Property.objects.only("id", "phone", "address").iterator(chunk_size=1000):
+        batch.append(fill_keys(prop))
+        if len(batch) >= 1000:
+            Property.objects.bulk_update(batch, ["phone_key", "address_key"])
+            batch = []
+    if batch:
+        Property.objects.bulk_update(batch, ["phone_key", "address_key"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0011_property_geo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DuplicateCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('reasons', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='address_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='phone_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=9),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('phone_key', ''), _negated=True), fields=['phone_key'], name='property_phone_key'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('address_key', ''), _negated=True), fields=['address_key'], name='property_address_key'),
+        ),
+        migrations.AddField(
+            model_name='duplicatecandidate',
+            name='duplicate',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='properties.property'),
+        ),
+        migrations.AddField(
+            model_name='duplicatecandidate',
+            name='property',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='duplicate_candidates', to='properties.property'),
+        ),
+        migrations.AddIndex(
+            model_name='duplicatecandidate',
+            index=models.Index(fields=['duplicate'], name='properties__duplica_801d13_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='duplicatecandidate',
+            constraint=models.UniqueConstraint(fields=('property', 'duplicate'), name='duplicate_candidate_pair'),
+        ),
+        migrations.RunPython(fill_duplicate_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0012_duplicate_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('district', models.CharField(max_length=120)),
+                ('deal_type', models.CharField(choices=[('sale', 'Продажа'), ('rent', 'Аренда')], max_length=10)),
+                ('kind', models.CharField(blank=True, default='', max_length=20)),
+                ('rooms', models.PositiveIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('p25', models.FloatField(blank=True, null=True)),
+                ('median', models.FloatField(blank=True, null=True)),
+                ('p75', models.FloatField(blank=True, null=True)),
+                ('histogram', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('district', 'deal_type', 'kind', 'rooms'), name='price_stat_group')],
+            },
+        ),
+    ]
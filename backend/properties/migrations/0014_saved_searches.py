@@ -0,0 +1,70 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0013_pricestat'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, max_length=120)),
+                ('district', models.CharField(blank=True, max_length=120, null=True)),
+                ('rooms', models.PositiveIntegerField(blank=True, null=True)),
+                ('deal_type', models.CharField(blank=True, choices=[('sale', 'Продажа'), ('rent', 'Аренда')], max_length=10, null=True)),
+                ('kind', models.CharField(blank=True, choices=[('elite', 'Элитка'), ('secondary', 'Вторичная'), ('commercial', 'Коммерческая'), ('house_land', 'Дом/участок'), ('club_house', 'Клубный дом'), ('parking', 'Парковка')], max_length=20, null=True)),
+                ('price_min', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('price_max', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('area_min', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('area_max', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('term_count', models.PositiveSmallIntegerField(default=0, editable=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_searches', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SavedSearchMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seen', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_matches', to='properties.property')),
+                ('search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='properties.savedsearch')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_matches', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SavedSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=160)),
+                ('search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='index_terms', to='properties.savedsearch')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='savedsearch',
+            index=models.Index(condition=models.Q(('term_count', 0)), fields=['is_active'], name='saved_search_no_terms'),
+        ),
+        migrations.AddIndex(
+            model_name='savedsearchmatch',
+            index=models.Index(fields=['user', '-created_at'], name='properties__user_id_d4888a_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='savedsearchmatch',
+            constraint=models.UniqueConstraint(fields=('search', 'property'), name='saved_search_match_once'),
+        ),
+        migrations.AddIndex(
+            model_name='savedsearchterm',
+            index=models.Index(fields=['key', 'search'], name='properties__key_72b89e_idx'),
+        ),
+    ]
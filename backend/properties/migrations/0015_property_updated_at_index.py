@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0014_saved_searches'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['updated_at', 'id'], name='properties__updated_3f149a_idx'),
+        ),
+    ]
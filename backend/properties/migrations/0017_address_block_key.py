@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-19 10:05
+
+import re
+
+from django.db import migrations
+
+# замороженная копия properties.duplicates.address_key: ключ блока «улица дом»
+ADDRESS_STOP_WORDS = {
+    "г", "город", "ул", "улица", "пр", "пр-т", "проспект", "пер", "переулок", "бул", "бульвар",
+    "мкр", "мкрн", "микрорайон", "ж", "м", "жм", "д", "дом", "кв", "квартира", "корп", "корпус",
+}
+_TOKEN_RE = re.compile(r"[0-9a-zа-яё]+(?:-[0-9a-zа-яё]+)*")
+
+
+def address_key(address):
+    tokens = [
+        t for t in _TOKEN_RE.findall((address or "").lower().replace("ё", "е"))
+        if t not in ADDRESS_STOP_WORDS
+    ]
+    words = [t for t in tokens if not any(c.isdigit() for c in t)]
+    numbers = [t for t in tokens if any(c.isdigit() for c in t)]
+    if words and numbers:
+        return f"{words[0]} {numbers[0]}"[:255]
+    if len(numbers) >= 2:
+        return f"{numbers[0]} {numbers[1]}"[:255]
+    return ""
+
+
+def refill_address_keys(apps, schema_editor):
+    Property = apps.get_model("properties", "Property")
+    batch = []
+    for prop in Property.objects.only("id", "address").iterator(chunk_size=1000):
+        prop.address_key = address_key(prop.address)
+        batch.append(prop)
+        if len(batch) >= 1000:
+            Property.objects.bulk_update(batch, ["address_key"])
+            batch = []
+    if batch:
+        Property.objects.bulk_update(batch, ["address_key"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0016_property_external_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(refill_address_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+import logging
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import migrations
+from django.utils import timezone
+
+from properties.images import render_variants, variant_name
+
+logger = logging.getLogger(__name__)
+
+
+def build_missing_variants(apps, schema_editor):
+    """
+    Превью для фото, загруженных до 0008 (и тех, чья задача фоновой очереди потерялась
+    при перезапуске): то же, что build_image_variants, но на каждом деплое, без ручного шага.
+    Битые файлы пропускаются — для них API отдаёт исходник (PropertyImage.display_url).
+    """
+    PropertyImage = apps.get_model("properties", "PropertyImage")
+    Property = apps.get_model("properties", "Property")
+
+    done = {}  # один blob у нескольких объектов — рендерим один раз
+    for image in PropertyImage.objects.filter(variants={}).order_by("id").iterator(chunk_size=200):
+        name = image.image.name
+        if name not in done:
+            try:
+                with image.image.storage.open(name, "rb") as fh:
+                    width, height, rendered, sizes = render_variants(fh)
+            except Exception:
+                logger.exception("Failed to build variants for PropertyImage<%s>", image.pk)
+                continue
+            variants = {}
+            for variant, files in rendered.items():
+                w, h = sizes[variant]
+                variants[variant] = {"width": w, "height": h}
+                for ext, data in files.items():
+                    path = variant_name(name, variant, ext)
+                    if default_storage.exists(path):
+                        default_storage.delete(path)
+                    variants[variant][ext] = default_storage.save(path, ContentFile(data))
+            done[name] = (width, height, variants)
+        width, height, variants = done[name]
+        PropertyImage.objects.filter(pk=image.pk).update(width=width, height=height, variants=variants)
+        # URL фото сменился — ETag/дельта объекта тоже (как Property.touch)
+        Property.objects.filter(pk=image.property_id).update(updated_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+    # без общей транзакции: готовые превью не откатываются из-за сбоя на середине каталога
+    atomic = False
+
+    dependencies = [
+        ('properties', '0017_address_block_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_missing_variants, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,15 @@
-from django.db import models
+import uuid
+
+from django.db import models, transaction
 from django.conf import settings
+from django.utils import timezone
+from django.core.files.storage import default_storage
+from django.contrib.postgres.indexes import GinIndex, GistIndex
+from django.contrib.postgres.search import SearchVectorField
+
+from .geo import GeoPoint
+from .search import property_search_vector
+from .storage import content_addressed_storage
 
 def property_image_upload_to(instance, filename):
     return f"properties/{instance.property_id}/{filename}"
@@ -73,28 +83,226 @@ class Property(models.Model):
     offer_type = models.CharField(max_length=20, choices=OfferType.choices, blank=True, null=True)
     offer_category = models.CharField(max_length=20, choices=OfferCategory.choices, blank=True, null=True)
 
+    # блокирующие ключи поиска дублей (duplicates.fill_keys, signals.fill_duplicate_keys)
+    phone_key = models.CharField(max_length=9, blank=True, default="", editable=False)
+    address_key = models.CharField(max_length=255, blank=True, default="", editable=False)
+
+    # импорт из внешних CRM (importer.py): (external_source, external_id) — ключ upsert
+    external_source = models.CharField(max_length=50, blank=True, default="", editable=False)
+    external_id = models.CharField(max_length=100, blank=True, default="", editable=False)
+
+    # координаты для карты (WGS84); индекс — GiST по point(longitude, latitude), см. geo.py
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
+
     realtor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name="properties")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # полнотекстовый поиск: tsvector (russian + simple) считает сама БД
+    search_vector = models.GeneratedField(
+        expression=property_search_vector(),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"]),
+            GinIndex(name="property_address_trgm", fields=["address"], opclasses=["gin_trgm_ops"]),
+            # keyset-пагинация каталога: status = ... ORDER BY <поле>, id
+            models.Index(fields=["status", "created_at", "id"]),
+            models.Index(fields=["status", "price", "id"]),
+            models.Index(fields=["status", "area", "id"]),
+            models.Index(fields=["status", "rooms", "id"]),
+            # ?updated_since= — дельта-синхронизация
+            models.Index(fields=["updated_at", "id"]),
+            # фильтры каталога
+            models.Index(fields=["status", "district"]),
+            models.Index(fields=["status", "floor"]),
+            GinIndex(name="property_documents_gin", fields=["documents"], opclasses=["jsonb_path_ops"]),
+            GinIndex(name="property_communications_gin", fields=["communications"], opclasses=["jsonb_path_ops"]),
+            # дубли: кандидаты ищутся только внутри блока с тем же ключом
+            models.Index(fields=["phone_key"], name="property_phone_key", condition=~models.Q(phone_key="")),
+            models.Index(fields=["address_key"], name="property_address_key", condition=~models.Q(address_key="")),
+            # карта: point <@ box(...) по окну просмотра
+            GistIndex(
+                GeoPoint(), name="property_geo_gist",
+                condition=models.Q(latitude__isnull=False, longitude__isnull=False),
+            ),
+        ]
+        constraints = [
+            # ON CONFLICT (external_source, external_id) WHERE external_id <> '' — повторный импорт обновляет
+            models.UniqueConstraint(
+                fields=["external_source", "external_id"], name="property_external_key",
+                condition=~models.Q(external_id=""),
+            ),
+        ]
+
     def __str__(self):
         return f"{self.title} · {self.deal_type} · {self.status}"
 
+    @classmethod
+    def touch(cls, pk):
+        """Сдвинуть updated_at без save() (фото изменились — меняется и ETag/дельта объекта)."""
+        cls.objects.filter(pk=pk).update(updated_at=timezone.now())
+
+class ImageBlob(models.Model):
+    """Уникальный файл фото в контентно-адресуемом хранилище + число PropertyImage, ссылающихся на него."""
+    name = models.CharField(max_length=255, unique=True)  # blobs/ab/cd/<sha256>.jpg
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self): return f"ImageBlob<{self.name}> x{self.ref_count}"
+
 class PropertyImage(models.Model):
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name="images")
-    image = models.ImageField(upload_to=property_image_upload_to)
+    # одинаковые фото (перевыставленные объекты) хранятся один раз; файл удаляется
+    # вместе с последней ссылкой — см. signals.release_image_blob
+    image = models.ImageField(upload_to=property_image_upload_to, storage=content_addressed_storage)
     created_at = models.DateTimeField(auto_now_add=True)
-    def delete(self, *args, **kwargs):
-        storage = self.image.storage
-        path = self.image.path
-        super().delete(*args, **kwargs)
-        try:
-            if storage.exists(path):
-                storage.delete(path)
-        except Exception:
-            pass
+
+    # заполняются фоновой обработкой (properties/images.py)
+    width = models.PositiveIntegerField(blank=True, null=True)
+    height = models.PositiveIntegerField(blank=True, null=True)
+    variants = models.JSONField(blank=True, default=dict)  # {"thumb": {"webp": path, "jpeg": path, "width", "height"}, ...}
+
+    def save(self, *args, **kwargs):
+        # запись файла (lock_blob) и acquire_blob в post_save — одна транзакция,
+        # иначе между ними последняя ссылка из другого запроса удалит файл
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def variant_url(self, variant, ext="webp"):
+        name = (self.variants or {}).get(variant, {}).get(ext)
+        return default_storage.url(name) if name else None
+
+    def display_url(self, variant):
+        """Вариант, а пока его нет (фото до превью, потерянная задача очереди) — исходник."""
+        return self.variant_url(variant) or (self.image.url if self.image else None)
+
     def __str__(self): return f"PropertyImage<{self.id}> for Property<{self.property_id}>"
 
+class ImageUpload(models.Model):
+    """Незавершённая кусочная загрузка фото (см. properties/uploads.py)."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name="uploads")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="image_uploads")
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def delete(self, *args, **kwargs):
+        from .uploads import discard
+        discard(self)
+        return super().delete(*args, **kwargs)
+
+    def __str__(self): return f"ImageUpload<{self.pk}> {self.received}/{self.size}"
+
+class DuplicateCandidate(models.Model):
+    """Пара вероятных дублей, найденная пакетной проверкой (manage.py find_duplicates); property_id < duplicate_id."""
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name="duplicate_candidates")
+    duplicate = models.ForeignKey(Property, on_delete=models.CASCADE, related_name="+")
+    score = models.FloatField()
+    reasons = models.JSONField(default=list)  # ["phone", "address", "rooms", ...]
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["property", "duplicate"], name="duplicate_candidate_pair"),
+        ]
+        indexes = [models.Index(fields=["duplicate"])]
+
+    def __str__(self): return f"{self.property_id} ~ {self.duplicate_id} ({self.score})"
+
+class PriceStat(models.Model):
+    """Цена за м² по группе объектов; ведётся инкрементально (properties/stats.py)."""
+    district = models.CharField(max_length=120)
+    deal_type = models.CharField(max_length=10, choices=Property.DealType.choices)
+    kind = models.CharField(max_length=20, blank=True, default="")  # "" — тип не указан
+    rooms = models.PositiveIntegerField()
+
+    count = models.PositiveIntegerField(default=0)
+    p25 = models.FloatField(blank=True, null=True)
+    median = models.FloatField(blank=True, null=True)
+    p75 = models.FloatField(blank=True, null=True)
+    histogram = models.JSONField(default=dict)  # {корзина: count}, корзины — шаг 5% (stats.bucket)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["district", "deal_type", "kind", "rooms"], name="price_stat_group"),
+        ]
+
+    def __str__(self): return f"{self.district}/{self.deal_type}/{self.kind or '-'}/{self.rooms}: {self.median}"
+
+class SavedSearch(models.Model):
+    """
+    Сохранённый фильтр каталога. Пустое поле — «любое значение».
+    Равенства (district/rooms/deal_type/kind) дублируются в SavedSearchTerm —
+    обратный индекс, по которому новый объект находит свои поиски (saved_searches.py).
+    """
+    TERM_FIELDS = ("district", "rooms", "deal_type", "kind")
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="saved_searches")
+    name = models.CharField(max_length=120, blank=True)
+    district = models.CharField(max_length=120, blank=True, null=True)
+    rooms = models.PositiveIntegerField(blank=True, null=True)
+    deal_type = models.CharField(max_length=10, choices=Property.DealType.choices, blank=True, null=True)
+    kind = models.CharField(max_length=20, choices=Property.Kind.choices, blank=True, null=True)
+    price_min = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True)
+    price_max = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True)
+    area_min = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    area_max = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    is_active = models.BooleanField(default=True)
+    term_count = models.PositiveSmallIntegerField(default=0, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # поиски без равенств («всё дешевле N») проверяются отдельно, по диапазонам
+            models.Index(fields=["is_active"], name="saved_search_no_terms", condition=models.Q(term_count=0)),
+        ]
+
+    def terms(self):
+        return [f"{f}={getattr(self, f)}" for f in self.TERM_FIELDS if getattr(self, f) not in (None, "")]
+
+    def save(self, *args, **kwargs):
+        terms = self.terms()
+        self.term_count = len(terms)
+        # строка и термы — вместе: поиск без термов MATCH_MANY_SQL молча пропустит
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # обратный индекс пересобираем целиком: у поиска не больше 4 термов
+            self.index_terms.all().delete()
+            SavedSearchTerm.objects.bulk_create([SavedSearchTerm(search=self, key=t) for t in terms])
+
+    def __str__(self): return f"SavedSearch<{self.pk}> {self.name or ' & '.join(self.terms())}"
+
+class SavedSearchTerm(models.Model):
+    """Терм обратного индекса: "district=Центр", "rooms=2", ... → сохранённый поиск."""
+    search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name="index_terms")
+    key = models.CharField(max_length=160)
+
+    class Meta:
+        indexes = [models.Index(fields=["key", "search"])]
+
+class SavedSearchMatch(models.Model):
+    """Лента пользователя: объект, подошедший под его сохранённый поиск."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="search_matches")
+    search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name="matches")
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name="search_matches")
+    seen = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["search", "property"], name="saved_search_match_once"),
+        ]
+        indexes = [models.Index(fields=["user", "-created_at"])]
+
 class Favorite(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="favorites")
     property = models.ForeignKey("properties.Property", on_delete=models.CASCADE, related_name="fav_by")
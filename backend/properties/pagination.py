@@ -0,0 +1,160 @@
+# properties/pagination.py
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset-пагинация каталога: позиция = (значение поля сортировки, id).
+    Следующая страница выбирается условием
+        field <= v AND (field < v OR id < last_id)       (для убывания)
+    — первое слагаемое идёт в индекс (status, field, id), второе отсекает только «ничьи»,
+    поэтому страница N стоит как страница 1 и без COUNT(*).
+    """
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    default_ordering = "-created_at"
+    invalid_cursor_message = "Некорректный курсор."
+
+    def __init__(self, page_size, allowed_fields):
+        self.page_size = page_size
+        self.allowed_fields = set(allowed_fields)
+
+    # --- курсор ---
+    def encode_cursor(self, value, pk, reverse):
+        payload = {"v": None if value is None else str(value), "id": pk, "r": int(reverse)}
+        raw = json.dumps(payload, separators=(",", ":")).encode()
+        encoded = base64.urlsafe_b64encode(raw).decode().rstrip("=")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+            payload = json.loads(raw)
+            return payload["v"], int(payload["id"]), bool(payload.get("r"))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    # --- сортировка ---
+    def get_ordering(self, request, queryset, view):
+        ordering = None
+        for backend in getattr(view, "filter_backends", []):
+            if issubclass(backend, OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        field = (ordering or [self.default_ordering])[0]
+        if field.lstrip("-") not in self.allowed_fields:
+            field = self.default_ordering
+        return field.lstrip("-"), field.startswith("-")
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.field, descending = self.get_ordering(request, queryset, view)
+        page_size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor[2])
+        # при движении назад меняем направление, а страницу потом разворачиваем
+        desc = descending != reverse
+        prefix = "-" if desc else ""
+        queryset = queryset.order_by(f"{prefix}{self.field}", f"{prefix}id")
+
+        if cursor:
+            raw_value, last_id, _ = cursor
+            try:
+                value = queryset.model._meta.get_field(self.field).to_python(raw_value)
+            except Exception:
+                raise NotFound(self.invalid_cursor_message)
+            op = "lt" if desc else "gt"
+            queryset = queryset.filter(
+                Q(**{f"{self.field}__{op}e": value}),
+                Q(**{f"{self.field}__{op}": value}) | Q(**{f"id__{op}": last_id}),
+            )
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        # «дальше» в исходном направлении есть, если пришли назад или если выбрали лишнюю строку
+        self.has_next = has_more if not reverse else bool(cursor)
+        self.has_previous = bool(cursor) if not reverse else has_more
+        return rows
+
+    @staticmethod
+    def _position(row, field):
+        # строки — модели или словари из .values() (быстрый путь списка)
+        if isinstance(row, dict):
+            return row[field], row["id"]
+        return getattr(row, field), row.pk
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        value, pk = self._position(self.page[-1], self.field)
+        return self.encode_cursor(value, pk, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        value, pk = self._position(self.page[0], self.field)
+        return self.encode_cursor(value, pk, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+
+class CatalogPagination(PageNumberPagination):
+    """
+    Обычная постраничная пагинация (?page=N) + keyset-режим по запросу:
+    ?pagination=cursor или ?cursor=<...> (ссылки next/previous уже содержат cursor).
+    """
+    cursor_mode_param = "pagination"
+    keyset_class = KeysetPagination
+
+    def is_cursor_mode(self, request):
+        return (
+            request.query_params.get(self.cursor_mode_param) == "cursor"
+            or self.keyset_class.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.is_cursor_mode(request):
+            self.keyset = self.keyset_class(
+                page_size=self.page_size,
+                allowed_fields=getattr(view, "ordering_fields", None) or [],
+            )
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
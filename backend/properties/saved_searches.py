@@ -0,0 +1,73 @@
+# properties/saved_searches.py
+"""
+Сопоставление нового активного объекта с сохранёнными поисками без перебора всех фильтров.
+У объекта ровно один терм на поле ("district=Центр", "rooms=2", ...); поиск подходит,
+если все его термы среди термов объекта — то есть число попаданий по обратному индексу
+(SavedSearchTerm.key) равно term_count поиска. Поиски без термов берутся по частичному
+индексу. Диапазоны цены/площади проверяются уже на этих кандидатах, в том же запросе.
+"""
+from django.db import connection, transaction
+
+from .models import Property, SavedSearch, SavedSearchMatch, SavedSearchTerm
+
+SEARCH = SavedSearch._meta.db_table
+TERM = SavedSearchTerm._meta.db_table
+MATCH = SavedSearchMatch._meta.db_table
+
+# одним запросом для пачки объектов: кандидаты по индексу термов + поиски без термов,
+# затем диапазоны цены/площади и владелец; новые записи лент — INSERT ... ON CONFLICT DO NOTHING
+MATCH_MANY_SQL = f"""
+WITH props AS (
+    SELECT * FROM unnest(%(ids)s::bigint[], %(prices)s::numeric[], %(areas)s::numeric[], %(owners)s::bigint[])
+        AS p(id, price, area, owner)
+), hits AS (
+    SELECT t.id AS property_id, st.search_id
+    FROM unnest(%(term_ids)s::bigint[], %(term_keys)s::text[]) AS t(id, key)
+    JOIN {TERM} st ON st.key = t.key
+    GROUP BY 1, 2
+    HAVING count(*) = (SELECT term_count FROM {SEARCH} WHERE id = st.search_id)
+), candidates AS (
+    SELECT property_id, search_id FROM hits
+    UNION ALL
+    SELECT p.id, s.id FROM props p CROSS JOIN {SEARCH} s WHERE s.term_count = 0 AND s.is_active
+)
+INSERT INTO {MATCH} (search_id, user_id, property_id, seen, created_at)
+SELECT s.id, s.user_id, p.id, false, now()
+FROM candidates c JOIN props p ON p.id = c.property_id JOIN {SEARCH} s ON s.id = c.search_id
+WHERE s.is_active AND s.user_id <> p.owner
+  AND (s.price_min IS NULL OR s.price_min <= p.price) AND (s.price_max IS NULL OR s.price_max >= p.price)
+  AND (s.area_min IS NULL OR s.area_min <= p.area) AND (s.area_max IS NULL OR s.area_max >= p.area)
+ON CONFLICT DO NOTHING
+"""
+
+
+def property_terms(prop):
+    return [
+        f"{f}={getattr(prop, f)}" for f in SavedSearch.TERM_FIELDS
+        if getattr(prop, f) not in (None, "")
+    ]
+
+
+def match_properties(props):
+    """Сопоставление пачки активных объектов одним запросом; число новых записей в лентах."""
+    props = [p for p in props if p.status == Property.Status.ACTIVE]
+    if not props:
+        return 0
+    terms = [(p.pk, key) for p in props for key in property_terms(p)]
+    with connection.cursor() as cursor:
+        cursor.execute(MATCH_MANY_SQL, {
+            "ids": [p.pk for p in props],
+            "prices": [p.price for p in props],
+            "areas": [p.area for p in props],
+            "owners": [p.realtor_id for p in props],
+            "term_ids": [pk for pk, _ in terms],
+            "term_keys": [key for _, key in terms],
+        })
+        return cursor.rowcount
+
+
+def schedule_match(props):
+    """Сопоставление — после коммита: ленты ссылаются только на реально сохранённые объекты."""
+    props = [p for p in props if p.status == Property.Status.ACTIVE]
+    if props:
+        transaction.on_commit(lambda: match_properties(props))
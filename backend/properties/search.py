@@ -0,0 +1,65 @@
+# properties/search.py
+import re
+
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, TrigramSimilarity,
+)
+from django.db.models import F, Q
+from rest_framework.filters import SearchFilter
+
+# русская морфология для текста + simple для адресов, номеров и не-русских слов
+SEARCH_CONFIGS = ("russian", "simple")
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def property_search_vector():
+    """
+    Выражение для Property.search_vector (GENERATED-колонка, её поддерживает сама БД).
+    Веса: A — заголовок, B — адрес/район/перекрёсток, C — описание.
+    """
+    return (
+        SearchVector("title", config="russian", weight="A")
+        + SearchVector("title", config="simple", weight="A")
+        + SearchVector("address", "district", "cross_streets", config="simple", weight="B")
+        + SearchVector("description", config="russian", weight="C")
+    )
+
+
+def build_search_query(text):
+    """
+    Префиксный tsquery по словам запроса («кие 12» → кие:* & 12:*) —
+    чтобы поиск работал на каждое нажатие клавиши. Спецсимволы tsquery отбрасываются.
+    """
+    words = WORD_RE.findall(text.lower())
+    if not words:
+        return None
+    raw = " & ".join(f"{w}:*" for w in words)
+    query = None
+    for config in SEARCH_CONFIGS:
+        part = SearchQuery(raw, config=config, search_type="raw")
+        query = part if query is None else query | part
+    return query
+
+
+class PropertySearchFilter(SearchFilter):
+    """
+    ?search= через полнотекстовый индекс (GIN по search_vector)
+    + опечатки в адресе через pg_trgm (GIN gin_trgm_ops, оператор %).
+    Без явного ?ordering= результаты сортируются по релевантности.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        text = " ".join(self.get_search_terms(request))
+        query = build_search_query(text) if text else None
+        if query is None:
+            return queryset
+
+        queryset = queryset.filter(
+            Q(search_vector=query) | Q(address__trigram_similar=text)
+        ).annotate(
+            search_rank=SearchRank(F("search_vector"), query)
+            + TrigramSimilarity("address", text)
+        )
+        if not request.query_params.get("ordering"):
+            queryset = queryset.order_by("-search_rank", "-id")
+        return queryset
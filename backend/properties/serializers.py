@@ -1,21 +1,46 @@
 # properties/serializers.py
 from rest_framework import serializers
-from .models import Property, PropertyImage, Favorite
+from .models import Property, PropertyImage, Favorite, ImageUpload, SavedSearch, SavedSearchMatch
+from .uploads import MAX_IMAGE_SIZE
+from .fieldsets import SparseFieldsMixin
+from .duplicates import find_duplicates
+
+# правила PropertySerializer.validate (их же применяет импорт к пачке строк)
+NON_NEGATIVE_FIELDS = ("price", "area", "rooms", "floor")
+REQUIRED_TEXT_FIELDS = ("address", "district")
+STRING_LIST_FIELDS = ("documents", "communications")
+COORDS_TOGETHER = "latitude и longitude задаются вместе"
+
+
+def is_string_list(value):
+    return isinstance(value, list) and all(isinstance(x, str) for x in value)
+
 
 class PropertyImageSerializer(serializers.ModelSerializer):
     url = serializers.SerializerMethodField()
+    variants = serializers.SerializerMethodField()
 
     class Meta:
         model = PropertyImage
-        fields = ["id", "url", "created_at"]
+        fields = ["id", "url", "width", "height", "variants", "created_at"]
 
-    def get_url(self, obj):
+    def _abs(self, rel):
         request = self.context.get("request")
-        rel = obj.image.url if hasattr(obj.image, "url") else ""
-        return request.build_absolute_uri(rel) if request else rel
+        return request.build_absolute_uri(rel) if request and rel else rel
 
+    def get_url(self, obj):
+        # очищенные от EXIF варианты: в списках превью (context["image_variant"] = "thumb"),
+        # иначе full; пока их нет — исходник (миграция 0018 и build_image_variants их догоняют)
+        return self._abs(obj.display_url(self.context.get("image_variant") or "full"))
+
+    def get_variants(self, obj):
+        return {
+            name: {ext: self._abs(obj.variant_url(name, ext)) for ext in ("webp", "jpeg")}
+            for name in (obj.variants or {})
+        }
 
-class PropertySerializer(serializers.ModelSerializer):
+
+class PropertySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     realtor_name = serializers.CharField(source="realtor.username", read_only=True)
     images = PropertyImageSerializer(many=True, read_only=True)
     status_display = serializers.CharField(source="get_status_display", read_only=True)
@@ -24,7 +49,7 @@ class PropertySerializer(serializers.ModelSerializer):
     cover_url = serializers.SerializerMethodField()
     class Meta:
         model = Property
-        fields = "__all__"
+        exclude = ("search_vector", "phone_key", "address_key")
         read_only_fields = (
             "id","realtor","realtor_name","created_at","updated_at","images",
             "status_display","deal_type_display","is_favorite"
@@ -51,46 +76,153 @@ class PropertySerializer(serializers.ModelSerializer):
             "communications": {"required": False, "allow_null": True},
             "offer_type": {"required": False, "allow_null": True, "allow_blank": True},
             "offer_category": {"required": False, "allow_null": True, "allow_blank": True},
+            "latitude": {"required": False, "allow_null": True, "min_value": -90, "max_value": 90},
+            "longitude": {"required": False, "allow_null": True, "min_value": -180, "max_value": 180},
         }
 
     def validate(self, attrs):
-        # неотрицательные числовые
-        for k in ["price", "area", "rooms"]:
+        # те же правила построчно-векторно проверяет импорт (importer.validate_batch)
+        for k in NON_NEGATIVE_FIELDS:
             v = attrs.get(k)
             if v is not None and v < 0:
                 raise serializers.ValidationError({k: "Must be ≥ 0"})
 
-        floor = attrs.get("floor")
-        if floor is not None and floor < 0:
-            raise serializers.ValidationError({"floor": "Must be ≥ 0"})
-
-        for k in ["address", "district"]:
+        for k in REQUIRED_TEXT_FIELDS:
             if not attrs.get(k):
                 raise serializers.ValidationError({k: "Required"})
 
+        # координаты — либо обе, либо ни одной
+        lat = attrs.get("latitude", getattr(self.instance, "latitude", None))
+        lng = attrs.get("longitude", getattr(self.instance, "longitude", None))
+        if (lat is None) != (lng is None):
+            raise serializers.ValidationError({"latitude": COORDS_TOGETHER})
+
         # массивы — только списки строк
-        for k in ["documents", "communications"]:
+        for k in STRING_LIST_FIELDS:
             v = attrs.get(k)
-            if v is not None and not (isinstance(v, list) and all(isinstance(x, str) for x in v)):
+            if v is not None and not is_string_list(v):
                 raise serializers.ValidationError({k: "Must be a list of strings"})
         return attrs
 
+    def create(self, validated_data):
+        instance = super().create(validated_data)
+        # вероятные дубли (тот же телефон/адрес) — по индексам ключей, без обхода каталога
+        instance._possible_duplicates = find_duplicates(instance)
+        return instance
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        duplicates = getattr(instance, "_possible_duplicates", None)
+        if duplicates is not None:
+            data["possible_duplicates"] = duplicates
+        return data
+
     def get_is_favorite(self, obj) -> bool:
+        # PropertyViewSet аннотирует favorited — без отдельного запроса на каждую строку
+        annotated = getattr(obj, "favorited", None)
+        if annotated is not None:
+            return bool(annotated)
         request = self.context.get("request")
         if not request or not request.user.is_authenticated:
             return False
         return obj.fav_by.filter(user=request.user).exists()
 
     def get_cover_url(self, obj):
-        first = obj.images.order_by("id").first()
-        if not first or not hasattr(first.image, "url"):
+        # если images уже подгружены (Prefetch с order_by("id")) — берём первую из кэша
+        if "images" in getattr(obj, "_prefetched_objects_cache", {}):
+            imgs = obj.images.all()
+            first = imgs[0] if imgs else None
+        else:
+            first = obj.images.order_by("id").first()
+        rel = first.display_url(self.context.get("image_variant") or "card") if first else None
+        if not rel:
             return None
         request = self.context.get("request")
-        rel = first.image.url
         return request.build_absolute_uri(rel) if request else rel
     
+class PropertyCardSerializer(PropertySerializer):
+    """Компактная карточка каталога (?view=card): без описания, контактов, массивов и галереи."""
+
+    class Meta(PropertySerializer.Meta):
+        exclude = None
+        fields = [
+            "id", "title", "price", "area", "rooms", "floor",
+            "address", "district", "kind", "latitude", "longitude",
+            "deal_type", "deal_type_display", "status", "status_display",
+            "cover_url", "is_favorite",
+            "realtor", "realtor_name", "created_at", "updated_at",
+        ]
+
+
+class ImageUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImageUpload
+        fields = ("id", "filename", "size", "received", "created_at")
+        read_only_fields = ("id", "received", "created_at")
+
+    def validate_size(self, value):
+        if value <= 0 or value > MAX_IMAGE_SIZE:
+            raise serializers.ValidationError(f"Размер файла: от 1 до {MAX_IMAGE_SIZE} байт")
+        return value
+
+
 class FavoriteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Favorite
         fields = ("id", "property", "created_at")
-        read_only_fields = ("id", "created_at")
\ No newline at end of file
+        read_only_fields = ("id", "created_at")
+
+
+class FavoriteSyncSerializer(serializers.Serializer):
+    add = serializers.ListField(child=serializers.IntegerField(min_value=1), default=list, max_length=500)
+    remove = serializers.ListField(child=serializers.IntegerField(min_value=1), default=list, max_length=500)
+
+    def validate(self, attrs):
+        both = set(attrs["add"]) & set(attrs["remove"])
+        if both:
+            raise serializers.ValidationError({"add": f"id и в add, и в remove: {sorted(both)}"})
+        return attrs
+
+
+class FavoriteCardSerializer(FavoriteSerializer):
+    """Избранное со встроенной карточкой объекта (?embed=card)."""
+    property = PropertyCardSerializer(read_only=True)
+
+    def to_representation(self, instance):
+        instance.property.favorited = True  # это и есть избранное — без EXISTS на строку
+        return super().to_representation(instance)
+
+
+class SavedSearchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SavedSearch
+        fields = (
+            "id", "name", "district", "rooms", "deal_type", "kind",
+            "price_min", "price_max", "area_min", "area_max", "is_active", "created_at",
+        )
+        read_only_fields = ("id", "created_at")
+
+    def validate(self, attrs):
+        # пустая строка = «любой» — храним как NULL, чтобы не появился терм "district="
+        for k in ("district", "deal_type", "kind"):
+            if k in attrs:
+                attrs[k] = (attrs[k] or "").strip() or None
+        for k in ("price", "area"):
+            lo, hi = attrs.get(f"{k}_min"), attrs.get(f"{k}_max")
+            if lo is not None and hi is not None and lo > hi:
+                raise serializers.ValidationError({f"{k}_min": f"{k}_min > {k}_max"})
+        return attrs
+
+
+class SavedSearchMatchSerializer(serializers.ModelSerializer):
+    """Запись ленты сохранённых поисков с карточкой объекта."""
+    property = PropertyCardSerializer(read_only=True)
+
+    class Meta:
+        model = SavedSearchMatch
+        fields = ("id", "search", "property", "seen", "created_at")
+
+    def to_representation(self, instance):
+        # favorited посчитан EXISTS-подзапросом в queryset ленты
+        instance.property.favorited = getattr(instance, "property_favorited", None)
+        return super().to_representation(instance)
@@ -0,0 +1,71 @@
+# properties/signals.py
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from .caching import bump_catalog_version
+from .duplicates import fill_keys
+from .stats import STAT_FIELDS, apply_changes, snapshot
+from .saved_searches import schedule_match
+from .images import schedule_variants
+from .models import Property, PropertyImage
+from .storage import acquire_blob, release_blob
+
+
+@receiver(pre_save, sender=Property)
+def fill_duplicate_keys(sender, instance, **kwargs):
+    # блокирующие ключи поиска дублей — из phone/address (bulk-пути зовут fill_keys сами)
+    fill_keys(instance)
+
+
+@receiver(pre_save, sender=Property)
+def remember_stat_snapshot(sender, instance, **kwargs):
+    # старые значения нужны, чтобы вычесть объект из прежней группы статистики цен
+    row = None
+    if instance.pk:
+        row = Property.objects.filter(pk=instance.pk).values(*STAT_FIELDS).first()
+    instance._stat_before = snapshot(row) if row else None
+    instance._status_before = row["status"] if row else None
+
+
+@receiver(post_save, sender=Property)
+def update_price_stats(sender, instance, **kwargs):
+    apply_changes([(getattr(instance, "_stat_before", None), snapshot(instance))])
+
+
+@receiver(post_save, sender=Property)
+def match_saved_searches(sender, instance, **kwargs):
+    # в ленты сохранённых поисков объект попадает, когда становится активным
+    if getattr(instance, "_status_before", None) != Property.Status.ACTIVE:
+        schedule_match([instance])
+
+
+@receiver(post_delete, sender=Property)
+def remove_from_price_stats(sender, instance, **kwargs):
+    apply_changes([(snapshot(instance), None)])
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def invalidate_catalog_cache(sender, instance, **kwargs):
+    # кэш фасетов и т.п. завязан на версию каталога — новая версия = новые ключи
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=PropertyImage)
+def queue_image_variants(sender, instance, created, **kwargs):
+    # превью/карточка/full строятся в фоне, запрос загрузки их не ждёт
+    if created:
+        try:
+            size = instance.image.size
+        except (OSError, ValueError):
+            size = 0  # файла нет (запись создана вручную) — счётчик ссылок всё равно нужен
+        acquire_blob(instance.image.name, size)
+        Property.touch(instance.property_id)
+        schedule_variants(instance.pk)
+
+
+@receiver(post_delete, sender=PropertyImage)
+def release_image_blob(sender, instance, **kwargs):
+    # срабатывает и при каскадном удалении объекта; файл уходит с последней ссылкой
+    release_blob(instance.image.name, instance.variants)
+    Property.touch(instance.property_id)
@@ -0,0 +1,171 @@
+# properties/stats.py
+"""
+Статистика цены за м² по (district, deal_type, kind, rooms): count, p25, медиана, p75.
+Таблица PriceStat обновляется инкрементально из сигналов Property (и bulk-путей):
+в строке хранится гистограмма цены за м² в логарифмических корзинах (шаг 5%),
+квантили пересчитываются по ней (погрешность ≤ ~2.5%). Периодически
+manage.py recompute_price_stats пересчитывает всё точно (percentile_cont в БД).
+"""
+import math
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+STAT_STATUSES = ("active", "reserved", "sold")  # черновики и архив цену рынка не отражают
+STAT_FIELDS = ("district", "deal_type", "kind", "rooms", "status", "price", "area")
+BUCKET_RATIO = 1.05
+_LOG_RATIO = math.log(BUCKET_RATIO)
+
+
+def bucket(ppm):
+    return math.floor(math.log(ppm) / _LOG_RATIO)
+
+
+def bucket_value(idx):
+    """Середина корзины (геометрическая)."""
+    return BUCKET_RATIO ** (idx + 0.5)
+
+
+def snapshot(obj):
+    """(ключ группы, цена за м²) или None, если объект в статистику не входит."""
+    get = (lambda k: obj[k]) if isinstance(obj, dict) else (lambda k: getattr(obj, k))
+    if get("status") not in STAT_STATUSES:
+        return None
+    price, area = get("price"), get("area")
+    if not price or not area or price <= 0 or area <= 0:
+        return None
+    key = (get("district"), get("deal_type"), get("kind") or "", get("rooms"))
+    return key, float(Decimal(price) / Decimal(area))
+
+
+def quantiles(histogram, qs=(0.25, 0.5, 0.75)):
+    """Квантили по гистограмме {корзина: count}."""
+    items = sorted((int(k), n) for k, n in histogram.items() if n > 0)
+    total = sum(n for _, n in items)
+    if not total:
+        return [None] * len(qs)
+    out, acc, i = [], 0, 0
+    for q in qs:
+        target = q * total
+        while i < len(items) and acc + items[i][1] < target:
+            acc += items[i][1]
+            i += 1
+        out.append(round(bucket_value(items[min(i, len(items) - 1)][0]), 2))
+    return out
+
+
+def apply_changes(changes):
+    """
+    changes: [(было, стало), ...] — снимки из snapshot() (или None).
+    Дельты группируются по ключу; затронутые строки читаются одним запросом
+    (select_for_update) и пишутся bulk_update/bulk_create.
+    """
+    from .models import PriceStat
+
+    deltas = defaultdict(lambda: defaultdict(int))
+    for before, after in changes:
+        if before == after:
+            continue
+        if before:
+            deltas[before[0]][bucket(before[1])] -= 1
+        if after:
+            deltas[after[0]][bucket(after[1])] += 1
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        rows = {
+            (s.district, s.deal_type, s.kind, s.rooms): s
+            for s in PriceStat.objects.select_for_update().filter(
+                district__in={k[0] for k in deltas},
+                deal_type__in={k[1] for k in deltas},
+            )
+        }
+        now = timezone.now()
+        to_create, to_update, empty = [], [], []
+        for key, by_bucket in deltas.items():
+            stat = rows.get(key)
+            if stat is None and all(d < 0 for d in by_bucket.values()):
+                continue  # группы ещё нет (таблицу не пересчитывали) — вычитать не из чего
+            if stat is None:
+                stat = PriceStat(district=key[0], deal_type=key[1], kind=key[2], rooms=key[3], histogram={})
+                to_create.append(stat)
+            else:
+                to_update.append(stat)
+            hist = {k: n for k, n in stat.histogram.items()}
+            for b, d in by_bucket.items():
+                n = hist.get(str(b), 0) + d
+                if n > 0:
+                    hist[str(b)] = n
+                else:
+                    hist.pop(str(b), None)
+            stat.histogram = hist
+            stat.count = sum(hist.values())
+            stat.p25, stat.median, stat.p75 = quantiles(hist)
+            stat.updated_at = now
+            if not stat.count and stat.pk:
+                empty.append(stat.pk)
+        # гонку двух первых вставок одной группы (редкость) поправит следующий полный пересчёт
+        PriceStat.objects.bulk_create([s for s in to_create if s.count], ignore_conflicts=True)
+        to_update = [s for s in to_update if s.count]
+        if to_update:
+            PriceStat.objects.bulk_update(to_update, ["histogram", "count", "p25", "median", "p75", "updated_at"])
+        if empty:
+            PriceStat.objects.filter(pk__in=empty).delete()
+
+
+RECOMPUTE_SQL = """
+SELECT district, deal_type, COALESCE(kind, ''), rooms,
+       COUNT(*),
+       percentile_cont(ARRAY[0.25, 0.5, 0.75]) WITHIN GROUP (ORDER BY price / area)
+FROM properties_property
+WHERE status = ANY(%s) AND price > 0 AND area > 0
+GROUP BY 1, 2, 3, 4
+"""
+
+HISTOGRAM_SQL = """
+SELECT district, deal_type, COALESCE(kind, ''), rooms,
+       floor(ln((price / area)::float8) / ln(%s::float8))::int AS b, COUNT(*)
+FROM properties_property
+WHERE status = ANY(%s) AND price > 0 AND area > 0
+GROUP BY 1, 2, 3, 4, 5
+ORDER BY 1, 2, 3, 4
+"""
+
+
+def recompute(batch_size=2000):
+    """
+    Полный точный пересчёт: квантили считает БД (percentile_cont), гистограммы
+    читаются серверным курсором порциями. Оба запроса — в одном снимке
+    (REPEATABLE READ), таблица заменяется отдельной транзакцией.
+    """
+    from .models import PriceStat
+
+    stats = {}
+    outermost = not connection.in_atomic_block
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            if outermost:
+                # иначе группа, вставленная между двумя запросами, есть только во втором
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+            cursor.execute(RECOMPUTE_SQL, [list(STAT_STATUSES)])
+            for district, deal_type, kind, rooms, count, (p25, median, p75) in cursor.fetchall():
+                stats[(district, deal_type, kind, rooms)] = PriceStat(
+                    district=district, deal_type=deal_type, kind=kind, rooms=rooms, count=count,
+                    p25=round(p25, 2), median=round(median, 2), p75=round(p75, 2), histogram={},
+                )
+
+        with connection.chunked_cursor() as cursor:
+            cursor.execute(HISTOGRAM_SQL, [BUCKET_RATIO, list(STAT_STATUSES)])
+            while rows := cursor.fetchmany(batch_size):
+                for district, deal_type, kind, rooms, b, n in rows:
+                    stat = stats.get((district, deal_type, kind, rooms))
+                    if stat is not None:  # внутри чужой транзакции снимки запросов могут разойтись
+                        stat.histogram[str(b)] = n
+
+    with transaction.atomic():
+        PriceStat.objects.all().delete()
+        PriceStat.objects.bulk_create(stats.values(), batch_size=batch_size)
+    return len(stats)
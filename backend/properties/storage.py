@@ -0,0 +1,135 @@
+# properties/storage.py
+"""
+Контентно-адресуемое хранилище фото: имя файла = sha256 содержимого,
+одинаковые байты хранятся один раз. Учёт ссылок — ImageBlob (см. acquire_blob / release_blob).
+
+Гонка «файл уже есть → переиспользуем» против удаления последней ссылкой закрыта
+блокировкой строки ImageBlob: _save берёт её (lock_blob) до проверки файла и держит
+до конца транзакции, в которой post_save делает acquire_blob (PropertyImage.save
+атомарен); удаление файла (_remove) идёт под той же блокировкой и только при ref_count = 0.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import connection, transaction
+
+HASH_BLOCK = 64 * 1024
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    prefix = "blobs"
+
+    def blob_name(self, digest, ext):
+        return f"{self.prefix}/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+    def _store(self, tmp_path, name):
+        path = self.path(name)
+        if os.path.exists(path):
+            return False  # такие байты уже лежат — дедупликация
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        file_move_safe(tmp_path, path)
+        if self.file_permissions_mode is not None:
+            os.chmod(path, self.file_permissions_mode)
+        return True
+
+    def _save(self, name, content):
+        ext = os.path.splitext(name)[1].lower()
+        digest = hashlib.sha256()
+
+        if hasattr(content, "temporary_file_path"):
+            # файл уже на диске (большая загрузка / кусочная загрузка) — хэшируем и перемещаем
+            src = content.temporary_file_path()
+            with open(src, "rb") as fh:
+                for block in iter(lambda: fh.read(HASH_BLOCK), b""):
+                    digest.update(block)
+            final = self.blob_name(digest.hexdigest(), ext)
+            lock_blob(final, os.path.getsize(src))
+            self._store(src, final)
+            return final
+
+        # иначе — один проход: пишем во временный файл и тут же считаем хэш
+        tmp_dir = self.path(f"{self.prefix}/tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    fh.write(chunk)
+            final = self.blob_name(digest.hexdigest(), ext)
+            lock_blob(final, os.path.getsize(tmp))
+            self._store(tmp, final)
+            return final
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+
+def _upsert_blob(name, size, increment):
+    from .models import ImageBlob
+
+    table = ImageBlob._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (name, size, ref_count, created_at) VALUES (%s, %s, %s, now()) "
+            f"ON CONFLICT (name) DO UPDATE SET ref_count = {table}.ref_count + EXCLUDED.ref_count",
+            [name, size, increment],
+        )
+
+
+def lock_blob(name, size=0):
+    """
+    Строка ImageBlob (с ref_count=0, если её не было) под блокировкой до конца
+    текущей транзакции: пока она держится, _remove не удалит файл.
+    """
+    _upsert_blob(name, size, 0)
+
+
+def acquire_blob(name, size=0):
+    _upsert_blob(name, size, 1)
+
+
+def release_blob(name, variants=None):
+    """
+    Снимает одну ссылку; файл (и его превью) удаляются после коммита, если ссылок
+    так и не появилось (строка ImageBlob с ref_count=0 живёт до этой проверки).
+    """
+    from .models import ImageBlob
+
+    with transaction.atomic():
+        blob = ImageBlob.objects.select_for_update().filter(name=name).first()
+        if blob is None:
+            return
+        blob.ref_count = max(blob.ref_count - 1, 0)
+        blob.save(update_fields=["ref_count"])
+        if blob.ref_count:
+            return
+
+    derived = [
+        path for files in (variants or {}).values()
+        for key, path in files.items() if key not in ("width", "height")
+    ]
+
+    def _remove():
+        with transaction.atomic():
+            # ждём транзакции, которые прямо сейчас переиспользуют те же байты (lock_blob)
+            blob = ImageBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None or blob.ref_count:
+                return
+            for path, storage in [(name, content_addressed_storage)] + [(p, default_storage) for p in derived]:
+                try:
+                    if storage.exists(path):
+                        storage.delete(path)
+                except Exception:
+                    pass
+            blob.delete()
+
+    transaction.on_commit(_remove)
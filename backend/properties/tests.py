@@ -1,3 +1,1217 @@
-from django.test import TestCase
+import csv
+import hashlib
+import importlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from datetime import datetime, timedelta
+from unittest import mock
+from decimal import Decimal
+from io import BytesIO, StringIO
+from xml.etree import ElementTree
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, DataError, connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from audit.models import AuditLog
+from audit.threadlocal import set_current_request
+from core.db_routing import ReplicaRouter, _Route, _route
+from core.export import EXPORT_FORMATS
+from core.renderers import ORJSONRenderer
+from users.models import User
+from .bulk import BULK_MAX_ITEMS
+from .caching import cached
+from .checks import catalog_cache_check, replica_pin_check
+from .management.commands.gc_media import walk_sorted
+from .duplicates import LIKELY_SCORE, address_key, fill_keys, phone_key, score_pair
+from .geo import MAX_GRID_CELLS, grid_cells, grid_zoom
+from .images import FORMATS, VARIANTS, build_variants
+from .importer import DB_ROW_ERROR, import_properties
+from .models import (
+    DuplicateCandidate, Favorite, ImageBlob, ImageUpload, PriceStat, Property, PropertyImage,
+    SavedSearch, SavedSearchMatch, SavedSearchTerm,
+)
+from .saved_searches import match_properties
+from .search import build_search_query
+from .serializers import PropertyCardSerializer
+from .views import EXPORT_COLUMNS
+from .stats import bucket, quantiles, recompute
+from .storage import content_addressed_storage
+from .uploads import MAX_IMAGES_PER_PROPERTY, UPLOAD_TTL
+
+LIST_URL = "/api/v1/properties/"
+
+
+def make_user(email="realtor@example.kg", **kwargs):
+    return User.objects.create(email=email, username=email.split("@")[0], **kwargs)
+
+
+def make_property(realtor, **kwargs):
+    data = dict(
+        title="Квартира", price=100_000, area=50, rooms=2, address="ул. Киевская 1",
+        district="Центр", deal_type="sale", status="active", realtor=realtor,
+    )
+    data.update(kwargs)
+    return Property.objects.create(**data)
+
+
+class CatalogTestCase(TestCase):
+    def setUp(self):
+        set_current_request(None)  # запрос прошлого теста остаётся в thread-local аудита
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def ids(self, response):
+        return [row["id"] for row in response.json()["results"]]
+
+
+class CatalogSerializationTests(CatalogTestCase):
+    def add_images(self, prop, variants):
+        for name in variants:
+            PropertyImage.objects.create(
+                property=prop, image="properties/x.jpg", variants={"card": {"webp": f"v/{name}.webp"}},
+            )
+
+    def test_list_queries_do_not_grow_with_rows(self):
+        props = [make_property(self.user, title=f"p{i}") for i in range(3)]
+        self.add_images(props[0], ["a", "b"])
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(LIST_URL)
+        for i in range(10):
+            self.add_images(make_property(self.user, title=f"q{i}"), ["c"])
+        with CaptureQueriesContext(connection) as big:
+            response = self.client.get(LIST_URL)
+        self.assertEqual(response.json()["count"], 13)
+        self.assertEqual(len(big.captured_queries), len(small.captured_queries))
+
+    def test_is_favorite_is_annotated_per_user(self):
+        liked, other = make_property(self.user), make_property(self.user)
+        Favorite.objects.create(user=self.user, property=liked)
+        rows = {row["id"]: row["is_favorite"] for row in self.client.get(LIST_URL, {"fast": 0}).json()["results"]}
+        self.assertEqual(rows, {liked.pk: True, other.pk: False})
+
+        stranger = APIClient()
+        stranger.force_authenticate(make_user("other@example.kg"))
+        self.assertFalse(stranger.get(f"{LIST_URL}{liked.pk}/").json()["is_favorite"])
+
+    def test_cover_is_first_image_by_id(self):
+        prop = make_property(self.user)
+        self.add_images(prop, ["first", "second"])
+        cover = self.client.get(f"{LIST_URL}{prop.pk}/").json()["cover_url"]
+        self.assertTrue(cover.endswith("/media/v/first.webp"))
+
+
+class KeysetPaginationTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        # повторяющиеся цены — курсор должен разводить «ничьи» по id
+        for i in range(11):
+            make_property(self.user, title=f"p{i}", price=[300, 100, 200][i % 3])
+
+    def walk(self, url, key):
+        pages, ids = [], []
+        while url:
+            data = self.client.get(url).json()
+            pages.append(data)
+            ids += [row["id"] for row in data["results"]]
+            url = data[key]
+        return pages, ids
+
+    def test_forward_covers_all_rows_in_order(self):
+        for ordering, expected in [
+            ("price", Property.objects.order_by("price", "id")),
+            ("-price", Property.objects.order_by("-price", "-id")),
+            ("-created_at", Property.objects.order_by("-created_at", "-id")),
+        ]:
+            with self.subTest(ordering=ordering):
+                pages, ids = self.walk(f"{LIST_URL}?pagination=cursor&page_size=3&ordering={ordering}", "next")
+                self.assertEqual(ids, [p.pk for p in expected])
+                self.assertEqual(len(pages), 4)
+                self.assertIsNone(pages[0]["previous"])
+                self.assertNotIn("count", pages[0])
+
+    def test_previous_returns_same_pages(self):
+        pages, forward = self.walk(f"{LIST_URL}?pagination=cursor&page_size=3&ordering=price", "next")
+        back_pages, _ = self.walk(pages[-1]["previous"], "previous")
+        self.assertEqual(
+            [[row["id"] for row in page["results"]] for page in reversed(back_pages)],
+            [[row["id"] for row in page["results"]] for page in pages[:-1]],
+        )
+        self.assertIsNone(back_pages[-1]["previous"])
+
+    def test_bad_cursor_is_404(self):
+        self.assertEqual(self.client.get(LIST_URL, {"cursor": "not-a-cursor"}).status_code, 404)
+
+    def test_page_mode_is_default(self):
+        data = self.client.get(LIST_URL).json()
+        self.assertEqual(data["count"], 11)
+
+
+class SearchTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.flat = make_property(self.user, title="Квартира в центре", description="Светлая, с ремонтом")
+        self.house = make_property(
+            self.user, title="Дом у реки", description="Большой дом", address="ул. Токтогула 5", district="Восток-5",
+        )
+        self.office = make_property(self.user, title="Офис", description="Помещение рядом с квартирой", address="пр. Чуй 100")
+
+    def search(self, text, **params):
+        response = self.client.get(LIST_URL, {"search": text, **params})
+        self.assertEqual(response.status_code, 200)
+        return self.ids(response)
+
+    def test_build_search_query(self):
+        self.assertIsNone(build_search_query("'&|!:"))
+        self.assertIn("кие:* & 12:*", str(build_search_query("Кие 12")))
+
+    def test_morphology_and_prefixes(self):
+        self.assertEqual(self.search("квартиры")[0], self.flat.pk)
+        self.assertEqual(self.search("кие"), [self.flat.pk])
+        self.assertEqual(self.search("токтогула 5"), [self.house.pk])
+        self.assertEqual(self.search("восток"), [self.house.pk])
+        self.assertEqual(self.search("нет такого"), [])
+        self.assertEqual(self.search("'&|!:"), self.ids(self.client.get(LIST_URL)))
+
+    def test_title_ranks_above_description(self):
+        self.assertEqual(self.search("квартира"), [self.flat.pk, self.office.pk])
+
+    def test_explicit_ordering_wins(self):
+        self.office.price = 1
+        self.office.save()
+        self.assertEqual(self.search("квартира", ordering="price"), [self.office.pk, self.flat.pk])
+
+
+class FilterTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.a = make_property(
+            self.user, price=100, floor=3, rooms=1, kind="elite", furniture=True,
+            documents=["red_book", "tech_passport"], communications=["gas"],
+        )
+        self.b = make_property(self.user, price=300, floor=9, rooms=3, kind="secondary", furniture=False, documents=["red_book"])
+
+    def test_filters(self):
+        cases = [
+            ({"price_min": 200}, [self.b]),
+            ({"price_max": 200}, [self.a]),
+            ({"floor_min": 5}, [self.b]),
+            ({"floor_max": 5}, [self.a]),
+            ({"rooms_min": 2, "rooms_max": 3}, [self.b]),
+            ({"documents": "red_book"}, [self.a, self.b]),
+            ({"documents": "red_book, tech_passport"}, [self.a]),
+            ({"documents": ","}, [self.a, self.b]),
+            ({"communications": "gas"}, [self.a]),
+            ({"kind": "elite"}, [self.a]),
+            ({"furniture": "false"}, [self.b]),
+        ]
+        for params, expected in cases:
+            with self.subTest(params=params):
+                response = self.client.get(LIST_URL, {**params, "ordering": "price"})
+                self.assertEqual(self.ids(response), [p.pk for p in expected])
+
+    def test_contains_uses_jsonb_containment(self):
+        sql = str(Property.objects.filter(documents__contains=["red_book"]).query)
+        self.assertIn("@>", sql)
+
+
+class FacetTests(CatalogTestCase):
+    url = f"{LIST_URL}facets/"
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        make_property(self.user, price=500, kind="elite")
+        make_property(self.user, price=60_000, rooms=3, district="Восток")
+        make_property(self.user, price=999_999, deal_type="rent")
+        make_property(self.user, status="draft")
+
+    def test_counts_per_grouping_set(self):
+        data = self.client.get(self.url).json()
+        self.assertEqual(data["total"], 3)
+        self.assertEqual(data["district"], [{"value": "Центр", "count": 2}, {"value": "Восток", "count": 1}])
+        self.assertEqual(data["rooms"], [{"value": 2, "count": 2}, {"value": 3, "count": 1}])
+        self.assertEqual(data["deal_type"], [{"value": "sale", "count": 2}, {"value": "rent", "count": 1}])
+        # NULL в данных и NULL «не группировали» различает GROUPING()
+        self.assertEqual(data["kind"], [{"value": None, "count": 2}, {"value": "elite", "count": 1}])
+        self.assertEqual(data["condition"], [{"value": None, "count": 3}])
+        self.assertEqual(data["price"], [
+            {"min": 0, "max": 1_000, "count": 1},
+            {"min": 50_000, "max": 100_000, "count": 1},
+            {"min": 500_000, "max": None, "count": 1},
+        ])
+
+    def test_single_query_and_list_filters(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(self.url, {"district": "Восток"}).json()
+        self.assertEqual(len(queries.captured_queries), 1)
+        self.assertEqual(data["total"], 1)
+        self.assertEqual(data["rooms"], [{"value": 3, "count": 1}])
+
+    @override_settings(DEBUG=True)
+    def test_cached_until_catalog_changes(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(self.url).json()["total"], 3)
+        self.assertEqual(len(queries.captured_queries), 0)
+        make_property(self.user)
+        self.assertEqual(self.client.get(self.url).json()["total"], 4)
+
+    def test_locmem_cache_is_bypassed_outside_debug(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertEqual(len(queries.captured_queries), 1)
+        self.assertEqual([w.id for w in catalog_cache_check(None)], ["properties.W001"])
+
+
+class SummaryTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.other = make_user("other@example.kg")
+        make_property(self.user)
+        make_property(self.user, status="draft")
+        make_property(self.other)
+
+    def summary(self):
+        return self.client.get(LIST_URL, {"summary": 1}).json()
+
+    def test_counts_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.summary()
+        self.assertEqual(data, {"total_active": 2, "my_active": 1, "my_drafts": 1})
+        self.assertEqual(len(queries.captured_queries), 1)
+
+    @override_settings(DEBUG=True)
+    def test_cache_is_dropped_by_any_property_change(self):
+        self.summary()
+        with CaptureQueriesContext(connection) as queries:
+            self.summary()
+        self.assertEqual(len(queries.captured_queries), 0)
+        make_property(self.other)  # чужой объект меняет total_active
+        self.assertEqual(self.summary()["total_active"], 3)
+
+
+def jpeg_bytes(size=(40, 20), color="red", orientation=None):
+    exif = Image.Exif()
+    exif[0x010F] = "Camera"  # Make — метаданные, которых не должно быть в вариантах
+    if orientation:
+        exif[0x0112] = orientation
+    buf = BytesIO()
+    Image.new("RGB", size, color).save(buf, "JPEG", exif=exif)
+    return buf.getvalue()
+
+
+class MediaTestCase(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.prop = make_property(self.user)
+
+    def add_image(self, data=None, name="photo.jpg", prop=None):
+        return PropertyImage.objects.create(
+            property=prop or self.prop, image=SimpleUploadedFile(name, data or jpeg_bytes()),
+        )
+
+
+class ImageVariantTests(MediaTestCase):
+    def test_variants_are_resized_rotated_and_stripped(self):
+        image = self.add_image(jpeg_bytes(size=(2400, 1200), orientation=6))
+        variants = build_variants(image)
+        image.refresh_from_db()
+        # ориентация 6 — поворот на 90°: стороны меняются местами
+        self.assertEqual((image.width, image.height), (1200, 2400))
+        self.assertEqual(set(variants), set(VARIANTS))
+        for name, max_side in VARIANTS.items():
+            self.assertEqual(max(variants[name]["width"], variants[name]["height"]), max_side)
+            for ext in FORMATS:
+                with default_storage.open(variants[name][ext]) as fh, Image.open(fh) as img:
+                    self.assertEqual(len(img.getexif()), 0)
+
+    def test_same_content_reuses_variants(self):
+        data = jpeg_bytes()
+        first = self.add_image(data)
+        build_variants(first)
+        other = self.add_image(data, prop=make_property(self.user))
+        self.assertEqual(other.image.name, first.image.name)
+        self.assertEqual(build_variants(other), PropertyImage.objects.get(pk=first.pk).variants)
+
+    def test_upload_queues_variants_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(
+                f"{LIST_URL}{self.prop.pk}/upload_image/", {"file": SimpleUploadedFile("a.jpg", jpeg_bytes())},
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(callbacks)
+
+    def test_original_until_variants_are_built(self):
+        image = self.add_image()
+        original = default_storage.url(image.image.name)
+        detail = self.client.get(f"{LIST_URL}{self.prop.pk}/").json()
+        # фото без вариантов (до 0008, потерянная задача очереди) — исходник, а не null
+        self.assertTrue(detail["images"][0]["url"].endswith(original))
+        self.assertTrue(detail["cover_url"].endswith(original))
+        for fast in ("0", "1"):
+            with self.subTest(fast=fast):
+                row = self.client.get(LIST_URL, {"fast": fast}).json()["results"][0]
+                self.assertTrue(row["images"][0]["url"].endswith(original))
+
+        build_variants(image)
+        detail = self.client.get(f"{LIST_URL}{self.prop.pk}/").json()
+        self.assertTrue(detail["images"][0]["url"].endswith(image.variants["full"]["webp"]))
+        self.assertTrue(detail["cover_url"].endswith(image.variants["card"]["webp"]))
+        for fast in ("0", "1"):
+            with self.subTest(fast=fast):
+                row = self.client.get(LIST_URL, {"fast": fast}).json()["results"][0]
+                self.assertTrue(row["images"][0]["url"].endswith(image.variants["thumb"]["webp"]))
+                self.assertNotIn(image.image.name, str(row))
+        self.assertNotIn(image.image.name, str(detail))
+
+    def test_migration_backfills_missing_variants(self):
+        migration = importlib.import_module("properties.migrations.0018_backfill_image_variants")
+        data = jpeg_bytes()
+        first, same = self.add_image(data), self.add_image(data, prop=make_property(self.user))
+        broken = PropertyImage.objects.create(property=self.prop, image=SimpleUploadedFile("b.jpg", b"not a jpeg"))
+        with self.assertLogs(migration.__name__, "ERROR"):  # битый файл пропускается
+            migration.build_missing_variants(django_apps, None)
+        first.refresh_from_db()
+        same.refresh_from_db()
+        self.assertEqual(set(first.variants), set(VARIANTS))
+        self.assertEqual(same.variants, first.variants)
+        self.assertEqual(PropertyImage.objects.get(pk=broken.pk).variants, {})
+
+
+class UploadTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = f"{LIST_URL}{self.prop.pk}/"
+
+    def fill(self, count):
+        PropertyImage.objects.bulk_create(
+            PropertyImage(property=self.prop, image=f"blobs/{i}.jpg") for i in range(count)
+        )
+
+    def start(self, *sizes):
+        response = self.client.post(
+            f"{self.url}uploads/", {"files": [{"filename": "a.jpg", "size": s} for s in sizes]}, format="json",
+        )
+        return response
+
+    def put(self, upload_id, chunk, offset):
+        return self.client.generic(
+            "PUT", f"{self.url}uploads/{upload_id}/?offset={offset}", chunk, content_type="application/octet-stream",
+        )
+
+    def test_chunked_upload_resumes_by_offset(self):
+        data = jpeg_bytes()
+        upload_id = self.start(len(data)).json()[0]["id"]
+        self.assertEqual(self.put(upload_id, data[:100], 0).json()["received"], 100)
+
+        stale = self.put(upload_id, data[:100], 0)
+        self.assertEqual(stale.status_code, 409)
+        self.assertEqual(stale.json()["received"], 100)
+        self.assertEqual(self.client.get(f"{self.url}uploads/{upload_id}/").json()["received"], 100)
+
+        self.assertEqual(self.client.post(f"{self.url}uploads/{upload_id}/finalize/").status_code, 400)
+        self.put(upload_id, data[100:], 100)
+        response = self.client.post(f"{self.url}uploads/{upload_id}/finalize/")
+        self.assertEqual(response.status_code, 201)
+        image = PropertyImage.objects.get(pk=response.json()["id"])
+        with image.image.open("rb") as fh:
+            self.assertEqual(fh.read(), data)
+        self.assertFalse(ImageUpload.objects.exists())
+        self.assertFalse(os.path.exists(default_storage.path(f"uploads/{upload_id}.part")))
+
+    def test_chunk_over_declared_size_is_rejected(self):
+        upload_id = self.start(10).json()[0]["id"]
+        self.assertEqual(self.put(upload_id, b"x" * 11, 0).status_code, 409)
+        self.assertEqual(ImageUpload.objects.get().received, 0)
+
+    def test_non_image_is_rejected(self):
+        upload_id = self.start(4).json()[0]["id"]
+        self.put(upload_id, b"text", 0)
+        self.assertEqual(self.client.post(f"{self.url}uploads/{upload_id}/finalize/").status_code, 400)
+        self.assertFalse(PropertyImage.objects.exists())
+
+    def test_multi_file_upload(self):
+        files = [SimpleUploadedFile(f"{c}.jpg", jpeg_bytes(color=c)) for c in ("red", "blue")]
+        response = self.client.post(f"{self.url}upload_images/", {"files": files})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.prop.images.count(), 2)
+
+    def test_limit_counts_images_and_pending_uploads(self):
+        self.fill(MAX_IMAGES_PER_PROPERTY - 2)
+        self.assertEqual(self.start(10).status_code, 201)
+        files = [SimpleUploadedFile(f"{c}.jpg", jpeg_bytes(color=c)) for c in ("red", "blue")]
+        self.assertEqual(self.client.post(f"{self.url}upload_images/", {"files": files}).status_code, 400)
+        self.assertEqual(self.start(10).status_code, 201)
+        self.assertEqual(self.start(10).status_code, 400)
+        self.assertEqual(ImageUpload.objects.count(), 2)
+
+    def test_stale_uploads_free_slots_and_cannot_finish(self):
+        self.fill(MAX_IMAGES_PER_PROPERTY - 1)
+        upload_id = self.start(4).json()[0]["id"]
+        ImageUpload.objects.update(created_at=timezone.now() - UPLOAD_TTL - timedelta(minutes=1))
+        self.assertEqual(self.put(upload_id, b"data", 0).status_code, 409)
+        self.assertEqual(self.client.post(f"{self.url}uploads/{upload_id}/finalize/").status_code, 400)
+        self.assertFalse(ImageUpload.objects.exists())
+
+        upload_id = self.start(4).json()[0]["id"]
+        ImageUpload.objects.update(created_at=timezone.now() - UPLOAD_TTL - timedelta(minutes=1))
+        self.assertEqual(self.start(4).status_code, 201)
+        self.assertFalse(ImageUpload.objects.filter(pk=upload_id).exists())
+
+
+class ContentAddressedStorageTests(MediaTestCase):
+    def blob(self, name):
+        return ImageBlob.objects.get(name=name)
+
+    def test_same_bytes_stored_once(self):
+        data = jpeg_bytes()
+        first = self.add_image(data, name="a.JPG")
+        second = self.add_image(data, name="b.jpg", prop=make_property(self.user))
+        digest = hashlib.sha256(data).hexdigest()
+        self.assertEqual(first.image.name, f"blobs/{digest[:2]}/{digest[2:4]}/{digest}.jpg")
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(self.blob(first.image.name).ref_count, 2)
+        self.assertEqual(self.blob(first.image.name).size, len(data))
+        self.assertNotEqual(self.add_image(jpeg_bytes(color="blue")).image.name, first.image.name)
+
+    def test_file_removed_with_last_reference(self):
+        data = jpeg_bytes()
+        first, second = self.add_image(data), self.add_image(data)
+        build_variants(first)
+        build_variants(second)  # переиспользует варианты first
+        name, thumb = first.image.name, first.variants["thumb"]["webp"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(self.blob(name).ref_count, 1)
+        self.assertTrue(content_addressed_storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(ImageBlob.objects.filter(name=name).exists())
+        self.assertFalse(content_addressed_storage.exists(name))
+        self.assertFalse(default_storage.exists(thumb))
+
+    def test_reuse_before_removal_keeps_file(self):
+        data = jpeg_bytes()
+        image = self.add_image(data)
+        name = image.image.name
+        with self.captureOnCommitCallbacks() as callbacks:
+            image.delete()
+        self.assertEqual(self.blob(name).ref_count, 0)
+        # те же байты загрузили снова до того, как отработало удаление
+        self.add_image(data)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.blob(name).ref_count, 1)
+        self.assertTrue(content_addressed_storage.exists(name))
+
+    def test_missing_file_still_counts_reference(self):
+        image = PropertyImage.objects.create(property=self.prop, image="blobs/missing.jpg")
+        self.assertEqual(self.blob(image.image.name).ref_count, 1)
+
+
+class GcMediaTests(MediaTestCase):
+    def write(self, name, age_minutes=120):
+        path = default_storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as fh:
+            fh.write(b"orphan")
+        stamp = time.time() - age_minutes * 60
+        os.utime(path, (stamp, stamp))
+        return path
+
+    def gc(self, *args):
+        out = StringIO()
+        call_command("gc_media", *args, "--verbose-list", stdout=out)
+        return out.getvalue()
+
+    def setUp(self):
+        super().setUp()
+        self.image = self.add_image()
+        build_variants(self.image)
+        self.kept = [self.image.image.name, self.image.variants["thumb"]["webp"]]
+        self.orphans = [self.write("blobs/aa/bb/orphan.jpg"), self.write("properties/1/old.jpg")]
+        self.young = self.write("blobs/young.jpg", age_minutes=1)
+        PropertyImage.objects.bulk_create([PropertyImage(property=self.prop, image="blobs/gone.jpg")])
+
+    def test_dry_run_only_reports(self):
+        out = self.gc()
+        self.assertIn("orphan  blobs/aa/bb/orphan.jpg", out)
+        self.assertIn("orphan  properties/1/old.jpg", out)
+        self.assertIn("missing blobs/gone.jpg", out)
+        self.assertIn("Сирот найдено (dry-run): 2", out)
+        self.assertIn("пропущено свежих: 1", out)
+        self.assertTrue(all(os.path.exists(p) for p in self.orphans))
+
+    def test_delete_removes_only_old_orphans(self):
+        self.gc("--delete")
+        self.assertFalse(any(os.path.exists(p) for p in self.orphans))
+        self.assertTrue(os.path.exists(self.young))
+        self.assertTrue(all(default_storage.exists(name) for name in self.kept))
+
+    def test_reacquired_orphan_is_kept(self):
+        from properties.management.commands import gc_media
+
+        def walk_and_reuse(root, rel=""):
+            for entry in walk_sorted(root, rel):
+                yield entry
+                if entry[0] == "blobs/aa/bb/orphan.jpg" and rel == "blobs":  # рекурсия идёт через этот же патч
+                    # загрузка с теми же байтами после обхода: ref_count растёт, mtime — нет
+                    PropertyImage.objects.create(property=self.prop, image=entry[0])
+
+        with mock.patch.object(gc_media, "walk_sorted", walk_and_reuse):
+            out = self.gc("--delete")
+        self.assertIn("снова используются: 1", out)
+        self.assertTrue(os.path.exists(self.orphans[0]))
+        self.assertEqual(ImageBlob.objects.get(name="blobs/aa/bb/orphan.jpg").ref_count, 1)
+        self.assertFalse(os.path.exists(self.orphans[1]))
+
+    def test_walk_order_matches_collate_c(self):
+        for name in ("a/b.jpg", "a.jpg", "a-b.jpg", "aB.jpg"):
+            self.write(f"walk/{name}")
+        names = [path for path, _, _ in walk_sorted(settings.MEDIA_ROOT, "walk")]
+        self.assertEqual(names, sorted(names, key=str.encode))
+
+
+class ConditionalGetTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.prop = make_property(self.user)
+        self.url = f"{LIST_URL}{self.prop.pk}/"
+
+    def revalidate(self, url, response, **headers):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"], **headers)
+
+    def test_detail_304_until_changed(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first["Cache-Control"], "private, no-cache")
+        self.assertEqual(self.revalidate(self.url, first).status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]).status_code, 304)
+
+        self.prop.title = "Новое"
+        self.prop.save()
+        changed = self.revalidate(self.url, first)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], first["ETag"])
+
+    def test_detail_etag_follows_favorites_and_images(self):
+        first = self.client.get(self.url)
+        Favorite.objects.create(user=self.user, property=self.prop)
+        second = self.revalidate(self.url, first)
+        self.assertEqual(second.status_code, 200)
+        PropertyImage.objects.bulk_create([PropertyImage(property=self.prop, image="blobs/x.jpg")])
+        self.assertEqual(self.revalidate(self.url, second).status_code, 200)
+
+    def test_list_304_and_deletions(self):
+        make_property(self.user)  # MAX(updated_at) при удалении self.prop не меняется
+        first = self.client.get(LIST_URL)
+        self.assertEqual(self.revalidate(LIST_URL, first).status_code, 304)
+        self.assertEqual(self.client.get(LIST_URL, {"rooms": 2}, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 200)
+        self.prop.delete()
+        self.assertEqual(self.revalidate(LIST_URL, first).status_code, 200)
+
+    def test_list_etag_is_per_user(self):
+        first = self.client.get(LIST_URL)
+        stranger = APIClient()
+        stranger.force_authenticate(make_user("other@example.kg"))
+        self.assertEqual(stranger.get(LIST_URL, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 200)
+
+    def test_bad_pk_is_404(self):
+        self.assertEqual(self.client.get(f"{LIST_URL}abc/").status_code, 404)
+        self.assertEqual(self.client.get(f"{LIST_URL}{self.prop.pk + 100}/").status_code, 404)
+
+
+class SparseFieldsetTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.prop = make_property(self.user, description="Длинное описание")
+        PropertyImage.objects.bulk_create([PropertyImage(property=self.prop, image="blobs/x.jpg")])
+
+    def test_fields_narrow_response_and_sql(self):
+        for fast in ("0", "1"):
+            with self.subTest(fast=fast), CaptureQueriesContext(connection) as queries:
+                row = self.client.get(LIST_URL, {"fields": "id,title", "fast": fast}).json()["results"][0]
+            self.assertEqual(set(row), {"id", "title"})
+            sql = "\n".join(q["sql"] for q in queries.captured_queries)
+            self.assertNotIn('"description"', sql)
+            self.assertNotIn("properties_propertyimage", sql)
+            self.assertNotIn("users_user", sql)
+
+    def test_omit(self):
+        row = self.client.get(LIST_URL, {"omit": "images,description"}).json()["results"][0]
+        self.assertNotIn("images", row)
+        self.assertNotIn("description", row)
+        self.assertIn("cover_url", row)
+
+    def test_card_view(self):
+        row = self.client.get(LIST_URL, {"view": "card"}).json()["results"][0]
+        self.assertEqual(set(row), set(PropertyCardSerializer.Meta.fields))
+
+    def test_detail_and_cursor_with_fields(self):
+        detail = self.client.get(f"{LIST_URL}{self.prop.pk}/", {"fields": "id,realtor_name"}).json()
+        self.assertEqual(detail, {"id": self.prop.pk, "realtor_name": self.user.username})
+        page = self.client.get(LIST_URL, {"fields": "title", "pagination": "cursor", "ordering": "price"}).json()
+        self.assertEqual(page["results"], [{"title": self.prop.title}])
+
+
+class FastPathTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        build_variants(self.add_image())
+        liked = make_property(self.user, kind="elite", floor=3, documents=["red_book"], latitude=42.87, longitude=74.6)
+        Favorite.objects.create(user=self.user, property=liked)
+        make_property(make_user("other@example.kg"), price=Decimal("1234.50"))
+
+    def test_same_json_as_serializer(self):
+        for params in [{}, {"view": "card"}, {"fields": "id,realtor,status_display,images"}, {"pagination": "cursor"}]:
+            with self.subTest(params=params):
+                fast = self.client.get(LIST_URL, params)
+                slow = self.client.get(LIST_URL, {**params, "fast": "0"})
+                self.assertEqual(fast.content, slow.content)
+
+    def test_fewer_queries_than_serializer(self):
+        with CaptureQueriesContext(connection) as fast:
+            self.client.get(LIST_URL)
+        with CaptureQueriesContext(connection) as slow:
+            self.client.get(LIST_URL, {"fast": "0"})
+        self.assertLessEqual(len(fast.captured_queries), len(slow.captured_queries))
+
+
+class RendererTests(TestCase):
+    def assertSameAsDrf(self, data):
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_matches_drf_output(self):
+        self.assertSameAsDrf({
+            "price": Decimal("10.50"), "at": datetime(2024, 1, 2, 3, 4, 5, 678000),
+            "name": gettext_lazy("Квартира"), "js": "a\u2028b\u2029", "n": [1, None, True],
+        })
+
+    def test_falls_back_for_what_orjson_rejects(self):
+        self.assertSameAsDrf({1: "int key"})
+        self.assertSameAsDrf({"big": 2 ** 70})
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+
+class BulkOperationTests(CatalogTestCase):
+    url = f"{LIST_URL}bulk/"
+
+    def item(self, **kwargs):
+        data = dict(
+            title="Новый", price="100000", area="50", rooms=2, address="ул. Ленина 1",
+            district="Центр", deal_type="sale", status="active",
+        )
+        data.update(kwargs)
+        return data
+
+    def test_create_batch(self):
+        response = self.client.post(self.url, {"items": [self.item(), self.item(phone="+996 555 12 34 56")]}, format="json")
+        self.assertEqual(response.status_code, 201)
+        ids = response.json()["ids"]
+        self.assertEqual(Property.objects.filter(pk__in=ids, realtor=self.user).count(), 2)
+        self.assertEqual(Property.objects.get(pk=ids[1]).phone_key, "555123456")
+        self.assertEqual(AuditLog.objects.filter(action="created", message="bulk").count(), 2)
+        self.assertEqual(PriceStat.objects.get(district="Центр").count, 2)
+
+    def test_create_errors_by_position_write_nothing(self):
+        response = self.client.post(self.url, {"items": [self.item(), self.item(price="-1")]}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()[0], {})
+        self.assertIn("price", response.json()[1])
+        self.assertFalse(Property.objects.exists())
+        self.assertEqual(self.client.post(self.url, {"items": []}, format="json").status_code, 400)
+        too_many = {"items": [self.item()] * (BULK_MAX_ITEMS + 1)}
+        self.assertEqual(self.client.post(self.url, too_many, format="json").status_code, 400)
+
+    def test_patch_own_objects_only(self):
+        mine, foreign = make_property(self.user), make_property(make_user("other@example.kg"))
+        # PropertySerializer.validate требует address/district и при частичном изменении
+        where = {"address": mine.address, "district": mine.district}
+        response = self.client.patch(self.url, {"items": [{"id": mine.pk, "price": "5", **where}]}, format="json")
+        self.assertEqual(response.json(), {"updated": [mine.pk]})
+        mine.refresh_from_db()
+        self.assertEqual(mine.price, 5)
+
+        response = self.client.patch(
+            self.url, {"items": [{"id": mine.pk, "price": "7", **where}, {"id": foreign.pk, "price": "7", **where}]}, format="json",
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json()["ids"], [str(foreign.pk)])  # ErrorDetail DRF — строки
+        mine.refresh_from_db()
+        self.assertEqual(mine.price, 5)
+
+        missing = self.client.patch(self.url, {"items": [{"id": foreign.pk + 100}]}, format="json")
+        self.assertEqual(missing.status_code, 404)
+        twice = self.client.patch(self.url, {"items": [{"id": mine.pk}, {"id": mine.pk}]}, format="json")
+        self.assertEqual(twice.status_code, 400)
+
+    def test_status_transitions(self):
+        draft, active = make_property(self.user, status="draft"), make_property(self.user)
+        response = self.client.post(
+            f"{self.url}status/", {"ids": [draft.pk, active.pk], "status": "active"}, format="json",
+        )
+        self.assertEqual(response.json(), {"updated": [draft.pk], "unchanged": [active.pk]})
+        self.assertEqual(Property.objects.filter(status="active").count(), 2)
+        self.assertEqual(PriceStat.objects.get().count, 2)
+        bad = self.client.post(f"{self.url}status/", {"ids": [draft.pk], "status": "nope"}, format="json")
+        self.assertEqual(bad.status_code, 400)
+
+
+class GeoTests(CatalogTestCase):
+    url = f"{LIST_URL}map/"
+    bishkek = "74.4,42.7,74.8,43.0"
+
+    def setUp(self):
+        super().setUp()
+        self.a = make_property(self.user, price=100, latitude=42.8700, longitude=74.6000)
+        self.b = make_property(self.user, price=300, latitude=42.8705, longitude=74.6005)
+        self.far = make_property(self.user, latitude=40.5, longitude=72.8)  # Ош
+        make_property(self.user)  # без координат
+
+    def test_bbox_filter(self):
+        response = self.client.get(LIST_URL, {"bbox": self.bishkek, "ordering": "price"})
+        self.assertEqual(self.ids(response), [self.a.pk, self.b.pk])
+        self.assertEqual(self.client.get(LIST_URL, {"bbox": "1,2,3"}).status_code, 400)
+        self.assertEqual(self.client.get(LIST_URL, {"bbox": "10,0,5,1"}).status_code, 400)
+
+    def test_clusters_by_zoom(self):
+        low = self.client.get(self.url, {"bbox": self.bishkek, "zoom": 10}).json()
+        self.assertEqual(low["total"], 2)
+        self.assertEqual(len(low["clusters"]), 1)
+        cluster = low["clusters"][0]
+        self.assertEqual((cluster["count"], cluster["id"]), (2, None))
+        self.assertEqual((cluster["price_min"], cluster["price_max"]), (100, 300))
+
+        # на zoom 20 экран — сотни метров: окно вокруг двух соседних домов
+        high = self.client.get(self.url, {"bbox": "74.598,42.869,74.602,42.872", "zoom": 20}).json()
+        self.assertEqual(high["zoom"], 20)
+        self.assertEqual(sorted(c["id"] for c in high["clusters"]), [self.a.pk, self.b.pk])
+
+        world = self.client.get(self.url, {"bbox": "-180,-90,180,90", "zoom": 0}).json()
+        self.assertEqual(world["total"], 3)
+
+    def test_wide_viewport_coarsens_grid(self):
+        # весь мир на zoom 20 — не кластер на объект, а сетка в пределах MAX_GRID_CELLS
+        world = (-180, -90, 180, 90)
+        data = self.client.get(self.url, {"bbox": ",".join(map(str, world)), "zoom": 20}).json()
+        self.assertEqual(data["zoom"], grid_zoom(world, 20))
+        self.assertLessEqual(grid_cells(world, data["zoom"]), MAX_GRID_CELLS)
+        self.assertGreater(grid_cells(world, data["zoom"] + 1), MAX_GRID_CELLS)
+        self.assertEqual(data["total"], 3)
+        self.assertEqual([c["count"] for c in data["clusters"]][0], 2)
+        # окно города остаётся на запрошенном масштабе
+        self.assertEqual(grid_zoom((74.4, 42.7, 74.8, 43.0), 14), 14)
+
+    def test_viewport_validation(self):
+        self.assertEqual(self.client.get(self.url, {"bbox": self.bishkek}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"bbox": self.bishkek, "zoom": 21}).status_code, 400)
+
+    def test_coordinates_go_together(self):
+        data = dict(title="x", price=1, area=1, rooms=1, address="a", district="b", deal_type="sale", status="active")
+        response = self.client.post(LIST_URL, {**data, "latitude": 42.8}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("latitude", response.json())
+
+
+class DuplicateTests(CatalogTestCase):
+    def test_keys(self):
+        self.assertEqual(phone_key("+996 501 271 007"), phone_key("0501271007"))
+        self.assertEqual(phone_key("12-34"), "")
+        self.assertEqual(address_key("Киевская ул., д. 12, кв. 5"), "киевская 12")
+        self.assertEqual(address_key("ул. Киевская 12"), "киевская 12")
+        self.assertEqual(address_key("7 мкр, д. 15"), "7 15")
+        self.assertEqual(address_key("ул. Киевская"), "")
+
+    def test_score_pair(self):
+        a = fill_keys(Property(phone="0501271007", address="ул. Киевская 12, кв. 5", rooms=2, area=50, floor=3))
+        b = fill_keys(Property(phone="+996 501 271 007", address="Киевская 12 кв 5", rooms=2, area=51, floor=3))
+        self.assertEqual(score_pair(a, b), (1.0, ["phone", "address", "rooms", "area", "floor"]))
+        c = fill_keys(Property(phone="", address="ул. Киевская 12, кв. 40", rooms=3, area=80))
+        score, reasons = score_pair(a, c)
+        self.assertLess(score, LIKELY_SCORE)
+        self.assertEqual(reasons, ["address"])
+
+    def test_found_on_create_and_by_endpoint(self):
+        original = make_property(self.user, phone="0501271007", address="ул. Киевская 12, кв. 5", floor=3)
+        make_property(self.user, phone="0700000000", address="ул. Токтогула 1")
+        data = dict(
+            title="x", price=1, area=50, rooms=2, floor=3, address="Киевская 12, кв. 5", district="Центр",
+            deal_type="sale", status="active", phone="+996 501 271 007",
+        )
+        created = self.client.post(LIST_URL, data, format="json").json()
+        self.assertEqual([d["id"] for d in created["possible_duplicates"]], [original.pk])
+        found = self.client.get(f"{LIST_URL}{original.pk}/duplicates/").json()
+        self.assertEqual([d["id"] for d in found], [created["id"]])
+
+    def test_batch_command(self):
+        a = make_property(self.user, phone="0501271007", floor=3)
+        b = make_property(self.user, phone="0501271007", floor=3)
+        make_property(self.user, phone="0501271007", floor=3, status="archived")
+        make_property(self.user, phone="0555555555", address="пр. Чуй 1", rooms=5)
+        call_command("find_duplicates", stdout=StringIO())
+        self.assertEqual(list(DuplicateCandidate.objects.values_list("property", "duplicate")), [(a.pk, b.pk)])
+        call_command("find_duplicates", stdout=StringIO())  # повторный запуск обновляет пары
+        self.assertEqual(DuplicateCandidate.objects.count(), 1)
+
+
+class PriceStatTests(CatalogTestCase):
+    def stat(self, **key):
+        return PriceStat.objects.get(**{"district": "Центр", "deal_type": "sale", "kind": "", "rooms": 2, **key})
+
+    def test_incremental_updates_follow_saves(self):
+        props = [make_property(self.user, price=ppm * 50) for ppm in (1000, 1200, 1500, 2000, 2500)]
+        stat = self.stat()
+        self.assertEqual(stat.count, 5)
+        self.assertAlmostEqual(stat.median, 1500, delta=1500 * 0.025)  # точность корзины — 5%
+        self.assertEqual(sum(stat.histogram.values()), 5)
+
+        props[0].district = "Восток"
+        props[0].save()
+        props[1].status = "draft"
+        props[1].save()
+        self.assertEqual(self.stat().count, 3)
+        self.assertEqual(self.stat(district="Восток").count, 1)
+
+        props[0].delete()
+        self.assertFalse(PriceStat.objects.filter(district="Восток").exists())
+        make_property(self.user, price=0)  # цена не указана — в статистику не входит
+        self.assertEqual(self.stat().count, 3)
+
+    def test_recompute_is_exact(self):
+        for ppm in (1000, 1100, 1300, 1700, 2500):
+            make_property(self.user, price=ppm * 50, kind="elite")
+        make_property(self.user, price=10, status="archived")
+        PriceStat.objects.all().delete()
+        self.assertEqual(recompute(batch_size=2), 1)
+        stat = self.stat(kind="elite")
+        self.assertEqual((stat.count, stat.p25, stat.median, stat.p75), (5, 1100, 1300, 1700))
+        self.assertEqual(sum(stat.histogram.values()), 5)
+        # после пересчёта инкрементальные изменения продолжают ту же гистограмму
+        make_property(self.user, price=3000 * 50, kind="elite")
+        self.assertEqual(self.stat(kind="elite").count, 6)
+
+    def test_quantiles_from_histogram(self):
+        hist = {str(bucket(v)): 1 for v in (100, 200, 300, 400)}
+        p25, median, p75 = quantiles(hist)
+        self.assertAlmostEqual(p25, 100, delta=5)
+        self.assertAlmostEqual(median, 200, delta=10)
+        self.assertAlmostEqual(p75, 300, delta=15)
+        self.assertEqual(quantiles({}), [None, None, None])
+
+    def test_endpoint_filters(self):
+        make_property(self.user)
+        make_property(self.user, rooms=3, deal_type="rent")
+        rows = self.client.get(f"{LIST_URL}stats/", {"deal_type": "rent"}).json()
+        self.assertEqual([(r["rooms"], r["kind"], r["count"]) for r in rows], [(3, None, 1)])
+        self.assertEqual(len(self.client.get(f"{LIST_URL}stats/").json()), 2)
+
+
+class FavoriteTests(CatalogTestCase):
+    url = "/api/v1/favorites/"
+
+    def setUp(self):
+        super().setUp()
+        self.props = [make_property(self.user) for _ in range(3)]
+
+    def test_toggle_in_one_query(self):
+        pk = self.props[0].pk
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f"{self.url}toggle/", {"property_id": pk}, format="json")
+        self.assertEqual((response.status_code, response.json()), (201, {"is_favorite": True}))
+        self.assertEqual(len(queries.captured_queries), 1)
+        response = self.client.post(f"{self.url}toggle/", {"property_id": pk}, format="json")
+        self.assertEqual((response.status_code, response.json()), (200, {"is_favorite": False}))
+        self.assertFalse(Favorite.objects.exists())
+
+    def test_toggle_errors(self):
+        self.assertEqual(self.client.post(f"{self.url}toggle/", {}, format="json").status_code, 400)
+        self.assertEqual(self.client.post(f"{self.url}toggle/", {"property_id": "x"}, format="json").status_code, 400)
+        missing = self.client.post(f"{self.url}toggle/", {"property_id": self.props[-1].pk + 100}, format="json")
+        self.assertEqual(missing.status_code, 404)
+
+    def test_sync(self):
+        a, b, c = (p.pk for p in self.props)
+        Favorite.objects.create(user=self.user, property_id=a)
+        response = self.client.post(f"{self.url}sync/", {"add": [a, b, c + 100], "remove": [a, c]}, format="json")
+        self.assertEqual(response.status_code, 400)  # a и в add, и в remove
+        response = self.client.post(f"{self.url}sync/", {"add": [a, b, c + 100], "remove": [c]}, format="json")
+        self.assertEqual(response.json(), {"added": [b], "removed": [], "missing": [c + 100]})
+        response = self.client.post(f"{self.url}sync/", {"remove": [a, b]}, format="json")
+        self.assertEqual(response.json(), {"added": [], "removed": [a, b], "missing": []})
+
+    def test_embedded_cards_query_count(self):
+        Favorite.objects.create(user=self.user, property=self.props[0])
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.url, {"embed": "card"})
+        for prop in self.props[1:]:
+            Favorite.objects.create(user=self.user, property=prop)
+        with CaptureQueriesContext(connection) as big:
+            response = self.client.get(self.url, {"embed": "card"})
+        self.assertEqual(len(big.captured_queries), len(small.captured_queries))
+        self.assertTrue(all(row["property"]["is_favorite"] for row in response.json()["results"]))
+
+
+class SavedSearchTests(CatalogTestCase):
+    url = "/api/v1/saved-searches/"
+
+    def setUp(self):
+        super().setUp()
+        self.seller = make_user("seller@example.kg")
+
+    def save_search(self, **data):
+        response = self.client.post(self.url, data, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()["id"]
+
+    def publish(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return make_property(self.seller, **kwargs)
+
+    def feed(self, **params):
+        return [(row["search"], row["property"]["id"]) for row in self.client.get(f"{self.url}feed/", params).json()["results"]]
+
+    def test_failed_term_rebuild_keeps_search(self):
+        search = SavedSearch.objects.get(pk=self.save_search(district="Центр", rooms=2))
+        terms = sorted(search.index_terms.values_list("key", flat=True))
+        search.district = "Восток"
+        with mock.patch.object(SavedSearchTerm.objects, "bulk_create", side_effect=DatabaseError("boom")):
+            with self.assertRaises(DatabaseError):
+                search.save()
+        search.refresh_from_db()
+        self.assertEqual(search.district, "Центр")
+        self.assertEqual(sorted(search.index_terms.values_list("key", flat=True)), terms)
+
+    def test_matching_by_terms_and_ranges(self):
+        center = self.save_search(district="Центр", rooms=2, price_max="150000")
+        cheap = self.save_search(district="", price_max="50000")  # без термов — только диапазон
+        self.save_search(district="Центр", is_active=False)
+        self.assertEqual(SavedSearch.objects.get(pk=cheap).term_count, 0)
+
+        a = self.publish(price=100_000)
+        b = self.publish(price=40_000, district="Восток")
+        self.publish(price=200_000)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_property(self.user, price=1)  # свои объекты в ленту не попадают
+        self.assertEqual(sorted(self.feed()), sorted([(center, a.pk), (cheap, b.pk)]))
+        self.assertEqual(self.feed(search=cheap), [(cheap, b.pk)])
+
+    def test_match_once_when_becoming_active(self):
+        search = self.save_search(rooms=2)
+        prop = self.publish(status="draft")
+        self.assertEqual(self.feed(), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            prop.status = "active"
+            prop.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            prop.title = "Снова"
+            prop.save()
+        self.assertEqual(self.feed(), [(search, prop.pk)])
+
+    def test_bulk_paths_match_in_one_batch(self):
+        search = self.save_search(district="Центр")
+        props = [make_property(self.seller) for _ in range(3)]
+        self.assertEqual(match_properties(props), 3)
+        self.assertEqual(match_properties(props), 0)
+        self.assertEqual(len(self.feed(search=search)), 3)
+
+    def test_seen_and_validation(self):
+        self.save_search(rooms=2)
+        first, second = self.publish(), self.publish()
+        match = SavedSearchMatch.objects.get(property=first)
+        self.assertEqual(self.client.post(f"{self.url}feed/seen/", {"ids": [match.pk]}, format="json").json(), {"updated": 1})
+        self.assertEqual([p for _, p in self.feed(unseen=1)], [second.pk])
+        self.assertEqual(self.client.post(f"{self.url}feed/seen/", {"ids": "x"}, format="json").status_code, 400)
+        bad = self.client.post(self.url, {"price_min": "10", "price_max": "5"}, format="json")
+        self.assertEqual(bad.status_code, 400)
+
+
+class ExportTests(CatalogTestCase):
+    url = f"{LIST_URL}export/"
+
+    def setUp(self):
+        super().setUp()
+        make_property(self.user, title="=HYPERLINK(\"x\")", phone="+996 555 123 456", documents=["a"], price=Decimal("10.50"))
+        make_property(self.user, title="Дом", district="Восток", rooms=5)
+
+    def download(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content)
+
+    def test_csv(self):
+        response, body = self.download(ordering="price")
+        self.assertIn('filename="properties-', response["Content-Disposition"])
+        self.assertTrue(body.startswith("\ufeff".encode()))  # BOM для Excel
+        rows = list(csv.reader(StringIO(body.decode("utf-8-sig"))))
+        self.assertEqual(rows[0], [c[0] for c in EXPORT_COLUMNS])
+        self.assertEqual(len(rows), 3)
+        first = dict(zip(rows[0], rows[1]))
+        self.assertEqual(first["Заголовок"], "'=HYPERLINK(\"x\")")  # не формула
+        self.assertEqual(first["Телефон"], "+996 555 123 456")
+        self.assertEqual(first["Сделка"], "Продажа")
+        self.assertEqual(first["Цена"], "10.50")
+        self.assertEqual(first["Риелтор"], self.user.username)
+
+    def test_filters_apply(self):
+        _, body = self.download(district="Восток")
+        rows = list(csv.reader(StringIO(body.decode("utf-8-sig"))))
+        self.assertEqual([r[1] for r in rows[1:]], ["Дом"])
+
+    def test_xlsx(self):
+        response, body = self.download(**{"as": "xlsx", "ordering": "price"})
+        self.assertEqual(response["Content-Type"], EXPORT_FORMATS["xlsx"])
+        with zipfile.ZipFile(BytesIO(body)) as zf:
+            self.assertIsNone(zf.testzip())
+            sheet = ElementTree.fromstring(zf.read("xl/worksheets/sheet1.xml"))
+        ns = {"s": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+        rows = [[c.findtext(".//s:t", namespaces=ns) or c.findtext("s:v", namespaces=ns) for c in row]
+                for row in sheet.iterfind(".//s:row", ns)]
+        self.assertEqual(len(rows), 3)
+        # inline-строка формулой не бывает — текст как есть, без <f>
+        self.assertEqual(rows[1][1], "=HYPERLINK(\"x\")")
+        self.assertIsNone(sheet.find(".//s:f", ns))
+        self.assertEqual(rows[1][10], "10.50")
+
+    def test_unknown_format(self):
+        self.assertEqual(self.client.get(self.url, {"as": "pdf"}).status_code, 400)
+
+
+class ImportTests(CatalogTestCase):
+    url = f"{LIST_URL}import/"
+    header = "external_id;title;price;area;rooms;address;district;deal_type;status;documents\n"
+
+    def upload(self, content, name="crm.csv", **data):
+        file = SimpleUploadedFile(name, content.encode(), content_type="text/csv")
+        return self.client.post(self.url, {"file": file, **data}, format="multipart")
+
+    def run_import(self, content, name="crm.csv", **data):
+        response = self.upload(content, name, **data)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_rows_with_errors_reported_by_line(self):
+        report = self.run_import(
+            self.header
+            + "a1;Квартира;100000;50;2;ул. Киевская 1;Центр;sale;active;тех. паспорт, договор\n"
+            + "a2;Дом;-5;50;2;ул. Токтогула 2;Центр;sale;active;\n"
+            + "a3;Дом;100;50;2;;Центр;sale;active;\n"
+            + "a1;Повтор;100;50;2;ул. Абая 3;Центр;sale;active;\n"
+        )
+        self.assertEqual((report["rows"], report["created"], report["failed"]), (4, 1, 3))
+        errors = {item["row"]: set(item["errors"]) for item in report["errors"]}
+        # номера — строки файла, заголовок — первая
+        self.assertEqual(errors, {3: {"price"}, 4: {"address"}, 5: {"external_id"}})
+        prop = Property.objects.get()
+        self.assertEqual((prop.external_source, prop.external_id, prop.realtor), ("import", "a1", self.user))
+        self.assertEqual(prop.documents, ["тех. паспорт", "договор"])
+        self.assertTrue(prop.phone_key is not None and prop.address_key)
+
+    def test_reimport_updates_by_external_id(self):
+        row = "a1;Квартира;{price};50;2;ул. Киевская 1;Центр;sale;active;\n"
+        first = self.run_import(self.header + row.format(price=100000), source="crm")
+        self.assertEqual((first["created"], first["updated"]), (1, 0))
+        pk = Property.objects.get().pk
+
+        second = self.run_import(
+            self.header + row.format(price=90000) + "a2;Дом;5;50;2;ул. Абая 3;Центр;sale;active;\n", source="crm",
+        )
+        self.assertEqual((second["created"], second["updated"]), (1, 1))
+        self.assertEqual(Property.objects.get(pk=pk).price, 90000)
+        # другой source — другой ключ
+        self.assertEqual(self.run_import(self.header + row.format(price=1), source="other")["created"], 1)
+        self.assertEqual(Property.objects.count(), 3)
+        self.assertTrue(AuditLog.objects.filter(action="imported").exists())
+
+    def test_foreign_object_not_updated(self):
+        row = self.header + "a1;Квартира;100;50;2;ул. Киевская 1;Центр;sale;active;\n"
+        self.run_import(row)
+        self.client.force_authenticate(make_user("other@example.kg"))
+        report = self.run_import(row)
+        self.assertEqual((report["created"], report["updated"], report["failed"]), (0, 0, 1))
+        self.assertEqual(Property.objects.get().realtor, self.user)
+
+    def test_dry_run_writes_nothing(self):
+        report = self.run_import(self.header + "a1;Квартира;100;50;2;ул. Киевская 1;Центр;sale;active;\n", dry_run="1")
+        self.assertTrue(report["dry_run"])
+        self.assertEqual((report["rows"], report["failed"]), (1, 0))
+        self.assertFalse(Property.objects.exists())
+
+    def test_json_lines_and_array(self):
+        obj = dict(title="Квартира", price=100, area=50, rooms=2, address="ул. Киевская 1",
+                   district="Центр", deal_type="sale", status="active", documents=["договор"], color="red")
+        lines = "\n".join(json.dumps({**obj, "external_id": f"j{i}"}) for i in range(3))
+        report = self.run_import(lines, name="crm.jsonl")
+        self.assertEqual((report["created"], report["ignored_columns"]), (3, ["color"]))
+        report = self.run_import(json.dumps([{**obj, "external_id": "j0", "price": 7}, 5]), name="crm.json")
+        self.assertEqual((report["updated"], report["failed"]), (1, 1))
+        self.assertEqual(Property.objects.get(external_id="j0").price, 7)
+
+    def test_batches(self):
+        rows = "".join(f"a{i};Квартира;100;50;2;ул. Киевская {i};Центр;sale;active;\n" for i in range(5))
+        report = import_properties(StringIO(self.header + rows), "csv", self.user, batch_size=2)
+        self.assertEqual((report["batches"], report["created"]), (3, 5))
+
+    def test_database_error_text_not_exposed(self):
+        row = self.header + "a1;Квартира;100;50;2;ул. Киевская 1;Центр;sale;active;\n"
+        error = DataError('value too long for type character varying(255) in column "title"')
+        with mock.patch("properties.importer._copy", side_effect=error), \
+                self.assertLogs("properties.importer", "ERROR") as logs:
+            report = self.run_import(row)
+        self.assertEqual(report["errors"], [{"row": 2, "errors": {"non_field_errors": [DB_ROW_ERROR]}}])
+        self.assertIn("character varying", logs.output[0])  # подробности — в логе
+        self.assertFalse(Property.objects.exists())
+
+    def test_bad_input(self):
+        self.assertEqual(self.upload("x", name="crm.xml").status_code, 400)
+        self.assertEqual(self.client.post(self.url, {}, format="multipart").status_code, 400)
+        broken = self.upload('[{"title": 1}', name="crm.json")
+        self.assertEqual(broken.status_code, 400)
+        self.assertIn("file", broken.json())
+
+
+class ReplicaCacheTests(SimpleTestCase):
+    """Кэш каталога и check закрепления — поверх маршрутизации core.db_routing."""
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(DEBUG=True)
+    def test_cached_computes_on_primary(self):
+        route = _Route()
+        route.replica = "replica1"
+        token = _route.set(route)
+        self.addCleanup(_route.reset, token)
+        self.assertIsNone(cached("test", "x", lambda: ReplicaRouter().db_for_read(Property)))
+
+    def test_pin_check(self):
+        with mock.patch("properties.checks.replica_aliases", return_value=["replica1"]):
+            self.assertEqual([e.id for e in replica_pin_check(None)], ["properties.E001"])
+            with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}):
+                self.assertEqual(replica_pin_check(None), [])
+        self.assertEqual(replica_pin_check(None), [])
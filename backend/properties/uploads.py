@@ -0,0 +1,133 @@
+# properties/uploads.py
+"""
+Возобновляемая загрузка фото кусками: init → PUT chunk (offset) … → finalize.
+Куски дописываются прямо в файл-заготовку в MEDIA_ROOT/uploads/, без буферизации в памяти;
+при finalize заготовка перемещается (не копируется) на место PropertyImage.image.
+
+Лимит фото на объект проверяется под блокировкой строки Property (reserve_slots):
+готовые фото + живые (моложе UPLOAD_TTL) незавершённые загрузки; устаревшие
+загрузки места не занимают и завершить их нельзя.
+"""
+import os
+from datetime import timedelta
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+MAX_IMAGES_PER_PROPERTY = 20
+MAX_IMAGE_SIZE = 25 * 1024 * 1024
+STREAM_BLOCK = 64 * 1024
+UPLOAD_TTL = timedelta(days=1)
+LIMIT_MESSAGE = f"Max {MAX_IMAGES_PER_PROPERTY} images per property"
+
+
+class UploadError(Exception):
+    pass
+
+
+def part_path(upload):
+    return default_storage.path(f"uploads/{upload.pk}.part")
+
+
+def is_expired(upload):
+    return upload.created_at < timezone.now() - UPLOAD_TTL
+
+
+def reserve_slots(property_id, count, exclude_pending=False):
+    """
+    Хватает ли места под count новых фото. Вызывать внутри transaction.atomic():
+    строка Property блокируется до конца транзакции, параллельные загрузки ждут.
+    Устаревшие загрузки объекта по пути удаляются (вместе с заготовками).
+    """
+    from .models import ImageUpload, Property, PropertyImage
+
+    list(Property.objects.select_for_update().filter(pk=property_id).values_list("pk", flat=True))
+    cutoff = timezone.now() - UPLOAD_TTL
+    for stale in ImageUpload.objects.filter(property_id=property_id, created_at__lt=cutoff):
+        stale.delete()
+    used = PropertyImage.objects.filter(property_id=property_id).count()
+    if not exclude_pending:
+        used += ImageUpload.objects.filter(property_id=property_id).count()
+    if used + count > MAX_IMAGES_PER_PROPERTY:
+        raise UploadError(LIMIT_MESSAGE)
+
+
+def _lock(upload):
+    """Свежая копия загрузки под select_for_update (два PUT с одним offset не пишут вперемешку)."""
+    from .models import ImageUpload
+
+    locked = ImageUpload.objects.select_for_update().filter(pk=upload.pk).first()
+    if locked is None:
+        raise UploadError("Загрузка отменена или уже завершена")
+    upload.received = locked.received
+    if is_expired(locked):
+        raise UploadError("Загрузка устарела, начните заново")
+    return locked
+
+
+def append_chunk(upload, stream, offset):
+    """
+    Дописывает тело запроса в заготовку. offset должен совпадать с уже принятым
+    размером — иначе клиент должен спросить текущий offset и продолжить с него.
+    """
+    with transaction.atomic():
+        _lock(upload)
+        if offset != upload.received:
+            raise UploadError(f"Ожидался offset {upload.received}")
+        path = part_path(upload)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        received = upload.received
+        with open(path, "ab") as fh:
+            fh.truncate(received)  # отбрасываем хвост оборванного куска
+            while True:
+                block = stream.read(STREAM_BLOCK)
+                if not block:
+                    break
+                received += len(block)
+                if received > upload.size:
+                    raise UploadError("Превышен заявленный размер файла")
+                fh.write(block)
+        upload.received = received
+        upload.save(update_fields=["received"])
+    return received
+
+
+class _PartFile(File):
+    # FileSystemStorage перемещает файлы с temporary_file_path() вместо копирования
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def finalize(upload):
+    from .models import PropertyImage
+
+    if is_expired(upload):
+        upload.delete()
+        raise UploadError("Загрузка устарела, начните заново")
+    with transaction.atomic():
+        # порядок блокировок как у reserve_slots из start_uploads: сначала объект, потом загрузка
+        reserve_slots(upload.property_id, 1, exclude_pending=True)
+        _lock(upload)
+        if upload.received != upload.size:
+            raise UploadError(f"Загружено {upload.received} из {upload.size} байт")
+        with open(part_path(upload), "rb") as fh:
+            try:
+                Image.open(fh).verify()
+            except Exception:
+                raise UploadError("Файл не является изображением")
+            fh.seek(0)
+            img = PropertyImage(property_id=upload.property_id)
+            img.image.save(upload.filename, _PartFile(fh, name=upload.filename), save=False)
+        img.save()
+        upload.delete()
+    return img
+
+
+def discard(upload):
+    try:
+        os.remove(part_path(upload))
+    except FileNotFoundError:
+        pass
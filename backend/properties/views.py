@@ -3,58 +3,357 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters import rest_framework as dj_filters
 from django.shortcuts import get_object_or_404
+from django.db import transaction
+from io import BytesIO
+from django.db.models import Exists, OuterRef, Prefetch, Value, BooleanField, Count, Q
 
-from .models import Property, PropertyImage
-from .serializers import PropertySerializer, PropertyImageSerializer
+from .models import PriceStat, Property, PropertyImage
+from .serializers import PropertySerializer, PropertyCardSerializer, PropertyImageSerializer, ImageUploadSerializer
+from .fieldsets import only_columns, parse_fieldset
+from .fastpath import FastPropertyRows, Unsupported
 from .permissions import IsOwnerOrReadOnly  
+from .pagination import CatalogPagination
+from .search import PropertySearchFilter
+from .facets import compute_facets
+from .bulk import bulk_create, bulk_patch, bulk_set_status
+from .importer import IMPORT_FORMATS, ImportFormatError, import_properties, text_stream
+from .duplicates import find_duplicates
+from .geo import MIN_ZOOM, cluster_markers, grid_zoom, in_viewport, parse_viewport
+from .uploads import UploadError, append_chunk, finalize, reserve_slots
+from .conditional import detail_validators, list_validators, not_modified, set_validators
+from .caching import cached, filter_signature
+from core.db_routing import use_primary, use_replica
+from core.export import export_format, stream_export
 
 from rest_framework.permissions import IsAuthenticated
+from realtime.sync import DeltaSyncMixin
 
 from .models import Favorite, Property
-from .serializers import FavoriteSerializer
+from .serializers import FavoriteCardSerializer, FavoriteSerializer, FavoriteSyncSerializer
+from .serializers import SavedSearchMatchSerializer, SavedSearchSerializer
+from .models import SavedSearch, SavedSearchMatch
+from .favorites import sync_favorites, toggle_favorite
+
+EXPORT_COLUMNS = [
+    ("ID", "id"),
+    ("Заголовок", "title"),
+    ("Сделка", "deal_type", dict(Property.DealType.choices).get),
+    ("Статус", "status", dict(Property.Status.choices).get),
+    ("Тип", "kind", dict(Property.Kind.choices).get),
+    ("Район", "district"),
+    ("Адрес", "address"),
+    ("Комнат", "rooms"),
+    ("Площадь, м²", "area"),
+    ("Этаж", "floor"),
+    ("Цена", "price"),
+    ("Телефон", "phone"),
+    ("Собственник", "owner_name"),
+    ("Риелтор", "realtor__username"),
+    ("Создан", "created_at"),
+    ("Обновлён", "updated_at"),
+]
+
 
 class PropertyFilter(dj_filters.FilterSet):
+    # диапазоны — идут в индексы (status, <поле>, id)
+    price_min = dj_filters.NumberFilter(field_name="price", lookup_expr="gte")
+    price_max = dj_filters.NumberFilter(field_name="price", lookup_expr="lte")
+    area_min = dj_filters.NumberFilter(field_name="area", lookup_expr="gte")
+    area_max = dj_filters.NumberFilter(field_name="area", lookup_expr="lte")
+    floor_min = dj_filters.NumberFilter(field_name="floor", lookup_expr="gte")
+    floor_max = dj_filters.NumberFilter(field_name="floor", lookup_expr="lte")
+    rooms_min = dj_filters.NumberFilter(field_name="rooms", lookup_expr="gte")
+    rooms_max = dj_filters.NumberFilter(field_name="rooms", lookup_expr="lte")
+
+    # ?documents=red_book,tech_passport — объект содержит ВСЕ перечисленные коды (jsonb @>, GIN)
+    documents = dj_filters.CharFilter(method="filter_contains")
+    communications = dj_filters.CharFilter(method="filter_contains")
+    # ?bbox=west,south,east,north — только объекты в окне карты (GiST)
+    bbox = dj_filters.CharFilter(method="filter_bbox")
+
     class Meta:
         model = Property
-        fields = ["status", "district", "rooms", "deal_type", "realtor"]
+        fields = [
+            "status", "district", "rooms", "deal_type", "realtor",
+            "kind", "condition", "offer_type", "offer_category", "furniture",
+        ]
+
+    def filter_contains(self, queryset, name, value):
+        codes = [c.strip() for c in value.split(",") if c.strip()]
+        if not codes:
+            return queryset
+        return queryset.filter(**{f"{name}__contains": codes})
 
-class PropertyViewSet(viewsets.ModelViewSet):
-    queryset = Property.objects.all().select_related("realtor").prefetch_related("images")
+    def filter_bbox(self, queryset, name, value):
+        bbox, _ = parse_viewport({"bbox": value, "zoom": MIN_ZOOM})
+        return in_viewport(queryset, bbox)
+
+@use_replica  # каталог, сводки, фасеты, карта, выгрузка — чтения с реплики
+class PropertyViewSet(DeltaSyncMixin, viewsets.ModelViewSet):
+    queryset = Property.objects.all().select_related("realtor").defer("search_vector")
     serializer_class = PropertySerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
-    filter_backends = [dj_filters.DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # поиск идёт после сортировки: без явного ?ordering= сортирует по релевантности
+    filter_backends = [dj_filters.DjangoFilterBackend, filters.OrderingFilter, PropertySearchFilter]
     filterset_class = PropertyFilter
-    search_fields = ["title", "address", "district", "description"]
     ordering_fields = ["created_at", "price", "area", "rooms"]
     ordering = ["-created_at"]
+    pagination_class = CatalogPagination  # ?pagination=cursor — keyset-режим
+    sync_model = "property"  # ?updated_since= — дельта-синхронизация (realtime/sync.py)
 
     @action(detail=True, methods=["post"])
     def upload_image(self, request, pk=None):
         prop = self.get_object()
-        if prop.images.count() >= 20:
-            return Response({"detail": "Max 20 images per property"}, status=400)
         file = request.FILES.get("file")
         if not file:
             return Response({"detail": "file is required"}, status=400)
-        img = PropertyImage.objects.create(property=prop, image=file)
+        try:
+            with transaction.atomic():
+                reserve_slots(prop.pk, 1)
+                img = PropertyImage.objects.create(property=prop, image=file)
+        except UploadError as e:
+            return Response({"detail": str(e)}, status=400)
         return Response(PropertyImageSerializer(img).data, status=201)
 
+    @action(detail=True, methods=["post"])
+    def upload_images(self, request, pk=None):
+        """
+        POST multipart: files=<f1>&files=<f2>... — несколько фото одним запросом,
+        лимит 20 фото проверяется один раз на всю пачку.
+        """
+        prop = self.get_object()
+        files = request.FILES.getlist("files")
+        if not files:
+            return Response({"detail": "files is required"}, status=400)
+        try:
+            with transaction.atomic():
+                reserve_slots(prop.pk, len(files))
+                imgs = [PropertyImage.objects.create(property=prop, image=f) for f in files]
+        except UploadError as e:
+            return Response({"detail": str(e)}, status=400)
+        return Response(PropertyImageSerializer(imgs, many=True).data, status=201)
+
+    @action(detail=True, methods=["post"], url_path="uploads")
+    def start_uploads(self, request, pk=None):
+        """
+        Кусочная загрузка, шаг 1: {"files": [{"filename", "size"}, ...]} (или один объект).
+        Возвращает id загрузок; дальше PUT .../uploads/<id>/?offset=N с телом-куском и finalize.
+        """
+        prop = self.get_object()
+        files = request.data.get("files")
+        items = files if isinstance(files, list) else [request.data]
+        ser = ImageUploadSerializer(data=items, many=True)
+        ser.is_valid(raise_exception=True)
+
+        # незавершённые загрузки тоже занимают места (устаревшие reserve_slots удаляет)
+        try:
+            with transaction.atomic():
+                reserve_slots(prop.pk, len(items))
+                uploads = ser.save(property=prop, user=request.user)
+        except UploadError as e:
+            return Response({"detail": str(e)}, status=400)
+        return Response(ImageUploadSerializer(uploads, many=True).data, status=201)
+
+    @action(detail=True, methods=["get", "put", "delete"], url_path=r"uploads/(?P<upload_id>[0-9a-f-]+)")
+    @use_primary  # смещение докачки должно быть точным
+    def upload_chunk(self, request, pk=None, upload_id=None):
+        """
+        GET — сколько байт уже принято (для возобновления), PUT — дописать кусок
+        (сырое тело, ?offset=<принятые байты>), DELETE — отменить загрузку.
+        """
+        prop = self.get_object()
+        upload = get_object_or_404(prop.uploads, pk=upload_id, user=request.user)
+        if request.method == "DELETE":
+            upload.delete()
+            return Response(status=204)
+        if request.method == "PUT":
+            try:
+                offset = int(request.query_params.get("offset", upload.received))
+            except ValueError:
+                return Response({"detail": "offset must be an integer"}, status=400)
+            try:
+                append_chunk(upload, request.stream or BytesIO(), offset)
+            except UploadError as e:
+                return Response({"detail": str(e), "received": upload.received}, status=409)
+        return Response(ImageUploadSerializer(upload).data)
+
+    @action(detail=True, methods=["post"], url_path=r"uploads/(?P<upload_id>[0-9a-f-]+)/finalize")
+    def finalize_upload(self, request, pk=None, upload_id=None):
+        prop = self.get_object()
+        upload = get_object_or_404(prop.uploads, pk=upload_id, user=request.user)
+        try:
+            img = finalize(upload)
+        except UploadError as e:
+            return Response({"detail": str(e)}, status=400)
+        return Response(PropertyImageSerializer(img).data, status=201)
+
+    @action(detail=False, methods=["get"])
+    def facets(self, request):
+        """
+        GET /api/v1/properties/facets/?<те же фильтры, что и у списка>
+        Счётчики для боковой панели фильтров — один GROUPING SETS запрос, кэш по подписи фильтров.
+        """
+        return Response(cached(
+            "facets", filter_signature(request),
+            lambda: compute_facets(self.filter_queryset(self.get_queryset())),
+        ))
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """
+        GET /api/v1/properties/export/?as=csv|xlsx&<фильтры списка>
+        Вся выборка без пагинации, потоком (серверный курсор, чанки по EXPORT_CHUNK_SIZE).
+        """
+        return stream_export(
+            self.filter_queryset(self.get_queryset()), EXPORT_COLUMNS, export_format(request), "properties",
+        )
+
+    @action(detail=True, methods=["get"])
+    def duplicates(self, request, pk=None):
+        """GET /api/v1/properties/{id}/duplicates/ — вероятные дубли: [{"id", "score", "reasons"}, ...]"""
+        return Response(find_duplicates(self.get_object(), limit=20))
+
+    @action(detail=False, methods=["get"])
+    def stats(self, request):
+        """
+        GET /api/v1/properties/stats/?district=&deal_type=&kind=&rooms=
+        Цена за м² по группам: count, p25, median, p75 (таблица PriceStat, без обхода каталога).
+        """
+        def compute():
+            qs = PriceStat.objects.order_by("district", "deal_type", "kind", "rooms")
+            params = request.query_params
+            for name in ("district", "deal_type", "kind"):
+                if name in params:
+                    qs = qs.filter(**{name: params[name]})
+            if params.get("rooms", "").isdigit():
+                qs = qs.filter(rooms=int(params["rooms"]))
+            return [
+                {**row, "kind": row["kind"] or None}
+                for row in qs.values("district", "deal_type", "kind", "rooms", "count", "p25", "median", "p75", "updated_at")
+            ]
+
+        return Response(cached("stats", filter_signature(request), compute))
+
+    @action(detail=False, methods=["get"], url_path="map")
+    def map(self, request):
+        """
+        GET /api/v1/properties/map/?bbox=west,south,east,north&zoom=Z&<фильтры списка>
+        Кластеры по сетке (≈64px) в окне карты; одиночный кластер — с id объекта.
+        """
+        bbox, zoom = parse_viewport(request.query_params)  # bbox применяет PropertyFilter
+        zoom = grid_zoom(bbox, zoom)  # ответ — с фактическим zoom сетки
+        return Response(cached(
+            "map", filter_signature(request),
+            lambda: cluster_markers(self.filter_queryset(self.get_queryset()), zoom),
+        ))
+
+    @action(detail=False, methods=["post", "patch"], url_path="bulk")
+    def bulk(self, request):
+        """
+        POST  {"items": [{...}, ...]}           — создать пачку объектов (до 500)
+        PATCH {"items": [{"id": N, ...}, ...]}  — частично изменить свои объекты
+        Ошибки валидации — списком по позициям; запись всё-или-ничего.
+        """
+        ctx = self.get_serializer_context()
+        if request.method == "POST":
+            objs = bulk_create(self.get_serializer_class(), request.data, request.user, ctx)
+            return Response({"ids": [obj.pk for obj in objs]}, status=201)
+        objs = bulk_patch(self.get_serializer_class(), request.data, request.user, ctx)
+        return Response({"updated": [obj.pk for obj in objs]})
+
+    @action(detail=False, methods=["post"], url_path="import", url_name="import")
+    def import_file(self, request):
+        """
+        POST multipart: file=<.csv|.json|.jsonl>, as=csv|json (иначе по расширению),
+        source=<имя CRM> (ключ upsert вместе с колонкой external_id), dry_run=1 — только проверка.
+        Ответ — отчёт: счётчики и ошибки по номерам строк; валидные строки записываются.
+        """
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"file": "Нужен файл."}, status=400)
+        fmt = request.data.get("as") or upload.name.rsplit(".", 1)[-1].lower()
+        fmt = "json" if fmt in ("jsonl", "ndjson") else fmt
+        if fmt not in IMPORT_FORMATS:
+            return Response({"as": f"Допустимо: {', '.join(IMPORT_FORMATS)}."}, status=400)
+        try:
+            report = import_properties(
+                text_stream(upload.file), fmt, request.user,
+                source=request.data.get("source"),
+                dry_run=request.data.get("dry_run") in ("1", "true", "True"),
+            )
+        except ImportFormatError as e:
+            return Response({"file": str(e)}, status=400)
+        return Response(report)
+
+    @action(detail=False, methods=["post"], url_path="bulk/status")
+    def bulk_status(self, request):
+        """POST {"ids": [...], "status": "active"} — опубликовать/снять/архивировать пачку."""
+        changed, unchanged = bulk_set_status(request.data, request.user)
+        return Response({"updated": [obj.pk for obj in changed], "unchanged": unchanged})
+
     @action(detail=True, methods=["delete"], url_path=r"images/(?P<image_id>\d+)")
     def delete_image(self, request, pk=None, image_id=None):
         prop = self.get_object()
         img = get_object_or_404(prop.images, pk=image_id)
-        img.image.delete(save=False)
-        img.delete()
+        img.delete()  # файл удалит release_blob, если на него больше никто не ссылается
         return Response(status=204)
     
+    def include_hidden_tombstones(self):
+        # свои объекты (?mine=1) и staff видят все статусы — «скрытых» для них нет
+        mine = self.request.query_params.get("mine") in {"1", "true", "True"}
+        return not mine and not self.request.user.is_staff
+
+    def is_sparse_read(self):
+        return self.action in ("list", "retrieve") and self.request.method in permissions.SAFE_METHODS
+
+    def get_serializer_class(self):
+        if self.action == "list" and self.request.query_params.get("view") == "card":
+            return PropertyCardSerializer
+        return super().get_serializer_class()
+
     def get_serializer_context(self):
         ctx = super().get_serializer_context()
         ctx["request"] = self.request
+        if self.action == "list":
+            ctx["image_variant"] = "thumb"  # карточки каталога — только превью
+        if self.is_sparse_read():
+            ctx["fields"], ctx["omit"] = parse_fieldset(self.request)
         return ctx
+
+    def get_response_fields(self):
+        """Имена полей, которые реально попадут в ответ (после ?view / ?fields / ?omit)."""
+        if not self.is_sparse_read():
+            return None
+        fields, omit = parse_fieldset(self.request)
+        if fields is None and not omit and self.get_serializer_class() is PropertySerializer:
+            return None
+        return set(self.get_serializer().fields)
     
     def get_queryset(self):
         qs = super().get_queryset()
         request = self.request
+        names = self.get_response_fields()
+
+        # ?fields= / ?omit= / ?view=card: читаем только нужные колонки
+        if names is not None:
+            cols = only_columns(names)
+            if "realtor__username" not in cols:
+                qs = qs.select_related(None)
+            qs = qs.only(*cols)
+
+        # Избранное и обложка считаются на уровне queryset, а не по запросу на каждую строку:
+        # images отсортированы по id (первая — обложка), favorited — EXISTS-подзапрос.
+        if names is None or names & {"images", "cover_url"}:
+            qs = qs.prefetch_related(
+                Prefetch("images", queryset=PropertyImage.objects.order_by("id"))
+            )
+        if names is None or "is_favorite" in names:
+            if request.user.is_authenticated:
+                qs = qs.annotate(favorited=Exists(
+                    Favorite.objects.filter(user=request.user, property=OuterRef("pk"))
+                ))
+            else:
+                qs = qs.annotate(favorited=Value(False, output_field=BooleanField()))
 
         status_param = request.query_params.get('status')
         mine = request.query_params.get('mine') in {'1', 'true', 'True'}
@@ -80,25 +379,61 @@ class PropertyViewSet(viewsets.ModelViewSet):
     
     def list(self, request, *args, **kwargs):
         if request.query_params.get('summary') in {'1', 'true', 'True'}:
-            user = request.user
-            try:
-                from .models import Property
-                ACTIVE = Property.Status.ACTIVE
-                DRAFT = Property.Status.DRAFT
-            except Exception:
-                ACTIVE = 'active'
-                DRAFT = 'draft'
-
-            base_qs = self.queryset  # уже select_related/prefetch
-            data = {
-                'total_active': base_qs.filter(status=ACTIVE).count(),
-                'my_active':    base_qs.filter(status=ACTIVE, realtor=user).count(),
-                'my_drafts':    base_qs.filter(status=DRAFT,  realtor=user).count(),
-            }
-            return Response(data)
-
-        return super().list(request, *args, **kwargs)
+            return Response(self.get_summary(request.user))
+        if self.is_delta_request():
+            return self.delta_list(request)
+
+        # условный GET: 304 без сериализации, если выборка не менялась
+        etag, last_modified = list_validators(self.filter_queryset(self.get_queryset()), request)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+        response = self.fast_list(request) or super().list(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified)
+
+    def fast_list(self, request):
+        """
+        Список через .values() + FastPropertyRows (тот же JSON, без ModelSerializer на каждую строку).
+        None — если поле не поддерживается быстрым путём или передан ?fast=0.
+        """
+        if request.query_params.get("fast") == "0":
+            return None
+        try:
+            rows = FastPropertyRows(
+                self.get_serializer(), request,
+                image_variant=self.get_serializer_context().get("image_variant"),
+            )
+        except Unsupported:
+            return None
+        queryset = rows.prepare(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(rows.build(page))
+        return Response(rows.build(list(queryset)))
+
+    def retrieve(self, request, *args, **kwargs):
+        validators = detail_validators(self.get_queryset(), kwargs[self.lookup_field])
+        if validators is None:
+            return super().retrieve(request, *args, **kwargs)  # 404 как обычно
+        etag, last_modified = validators
+        cached = not_modified(request, etag, last_modified)
+        if cached is not None:
+            return cached
+        response = super().retrieve(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified)
     
+    def get_summary(self, user):
+        """
+        Счётчики дашборда одним запросом (условная агрегация) + кэш на пользователя.
+        Ключ включает версию каталога — любое изменение Property его сбрасывает.
+        """
+        ACTIVE, DRAFT = Property.Status.ACTIVE, Property.Status.DRAFT
+        return cached("summary", user.pk, lambda: Property.objects.aggregate(
+            total_active=Count("id", filter=Q(status=ACTIVE)),
+            my_active=Count("id", filter=Q(status=ACTIVE, realtor=user)),
+            my_drafts=Count("id", filter=Q(status=DRAFT, realtor=user)),
+        ))
+
     def destroy(self, request, *args, **kwargs):
         obj = self.get_object()
         status_val = getattr(obj, 'status', None)
@@ -119,14 +454,27 @@ class PropertyViewSet(viewsets.ModelViewSet):
 
 class FavoriteViewSet(viewsets.ReadOnlyModelViewSet):
     """
-    GET /api/v1/favorites/ — список моих избранных объектов (id избранного + property id)
-    POST /api/v1/favorites/toggle/ {"property_id": N} — переключить избранное
+    GET /api/v1/favorites/ — список моих избранных объектов (id избранного + property id);
+        ?embed=card — с карточкой объекта (один JOIN + prefetch обложек)
+    POST /api/v1/favorites/toggle/ {"property_id": N} — переключить избранное (один SQL)
+    POST /api/v1/favorites/sync/ {"add": [...], "remove": [...]} — пачкой
     """
     permission_classes = [IsAuthenticated]
     serializer_class = FavoriteSerializer
 
+    def embed_cards(self):
+        return self.action == "list" and self.request.query_params.get("embed") == "card"
+
+    def get_serializer_class(self):
+        return FavoriteCardSerializer if self.embed_cards() else super().get_serializer_class()
+
     def get_queryset(self):
-        return Favorite.objects.filter(user=self.request.user).select_related("property").order_by("-created_at")
+        qs = Favorite.objects.filter(user=self.request.user).order_by("-created_at")
+        if self.embed_cards():
+            return qs.select_related("property__realtor").defer("property__search_vector").prefetch_related(
+                Prefetch("property__images", queryset=PropertyImage.objects.order_by("id"))
+            )
+        return qs
 
     @action(detail=False, methods=["post"])
     def toggle(self, request):
@@ -134,13 +482,66 @@ class FavoriteViewSet(viewsets.ReadOnlyModelViewSet):
         if not prop_id:
             return Response({"detail": "property_id is required"}, status=400)
         try:
-            prop = Property.objects.get(pk=prop_id)
-        except Property.DoesNotExist:
-            return Response({"detail": "Property not found"}, status=404)
+            prop_id = int(prop_id)
+        except (TypeError, ValueError):
+            return Response({"detail": "property_id must be an integer"}, status=400)
 
-        fav, created = Favorite.objects.get_or_create(user=request.user, property=prop)
-        if created:
+        state = toggle_favorite(request.user, prop_id)
+        if state is None:
+            return Response({"detail": "Property not found"}, status=404)
+        if state:
             return Response({"is_favorite": True}, status=status.HTTP_201_CREATED)
-        # уже было — удаляем
-        fav.delete()
-        return Response({"is_favorite": False})
\ No newline at end of file
+        return Response({"is_favorite": False})
+
+    @action(detail=False, methods=["post"])
+    def sync(self, request):
+        ser = FavoriteSyncSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        return Response(sync_favorites(request.user, **ser.validated_data))
+
+
+class SavedSearchViewSet(viewsets.ModelViewSet):
+    """
+    /api/v1/saved-searches/ — мои сохранённые поиски (CRUD)
+    GET  /api/v1/saved-searches/feed/?unseen=1&search=<id> — новые объекты под мои поиски
+    POST /api/v1/saved-searches/feed/seen/ {"ids": [...]} — отметить просмотренными (без ids — все)
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = SavedSearchSerializer
+
+    def get_queryset(self):
+        return SavedSearch.objects.filter(user=self.request.user).order_by("-created_at")
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    @action(detail=False, methods=["get"])
+    def feed(self, request):
+        qs = (
+            SavedSearchMatch.objects.filter(user=request.user)
+            .select_related("property__realtor").defer("property__search_vector")
+            .prefetch_related(Prefetch("property__images", queryset=PropertyImage.objects.order_by("id")))
+            .annotate(property_favorited=Exists(
+                Favorite.objects.filter(user=request.user, property=OuterRef("property"))
+            ))
+            .order_by("-created_at", "-id")
+        )
+        if request.query_params.get("unseen") in {"1", "true", "True"}:
+            qs = qs.filter(seen=False)
+        if request.query_params.get("search", "").isdigit():
+            qs = qs.filter(search_id=int(request.query_params["search"]))
+        page = self.paginate_queryset(qs)
+        ctx = self.get_serializer_context()
+        if page is not None:
+            return self.get_paginated_response(SavedSearchMatchSerializer(page, many=True, context=ctx).data)
+        return Response(SavedSearchMatchSerializer(qs, many=True, context=ctx).data)
+
+    @action(detail=False, methods=["post"], url_path="feed/seen")
+    def feed_seen(self, request):
+        qs = SavedSearchMatch.objects.filter(user=request.user, seen=False)
+        ids = request.data.get("ids")
+        if ids is not None:
+            if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+                return Response({"detail": "ids must be a list of integers"}, status=400)
+            qs = qs.filter(pk__in=ids)
+        return Response({"updated": qs.update(seen=True)})
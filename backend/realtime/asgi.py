@@ -0,0 +1,43 @@
+# realtime/asgi.py
+"""WebSocket /ws/changes/?token=<access> — тот же поток событий, что и SSE /api/v1/changes/."""
+import asyncio
+import json
+
+from .auth import authenticate, token_from
+from .listener import broadcaster
+
+WS_PATH = "/ws/changes/"
+CLOSE_UNAUTHORIZED = 4401
+
+
+async def websocket_changes(scope, receive, send):
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+    if scope["path"] != WS_PATH:
+        await send({"type": "websocket.close", "code": 4404})
+        return
+    headers = {k.decode("latin1").lower(): v.decode("latin1") for k, v in scope.get("headers", [])}
+    user = await authenticate(token_from(headers, scope.get("query_string", b"").decode()))
+    if user is None:
+        await send({"type": "websocket.close", "code": CLOSE_UNAUTHORIZED})
+        return
+    await send({"type": "websocket.accept"})
+
+    sub = await broadcaster.subscribe(user)
+
+    async def pump():
+        while True:
+            event = await sub.queue.get()
+            await send({"type": "websocket.send", "text": json.dumps(event, ensure_ascii=False, default=str)})
+
+    task = asyncio.create_task(pump())
+    try:
+        while True:
+            message = await receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            # входящие сообщения (ping от клиента) не нужны — поток односторонний
+    finally:
+        task.cancel()
+        broadcaster.unsubscribe(sub)
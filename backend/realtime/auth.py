@@ -0,0 +1,35 @@
+# realtime/auth.py
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+
+def token_from(headers, query_string):
+    """Access-токен из "Authorization: Bearer ..." или ?token=... (EventSource/WebSocket заголовки не шлют)."""
+    auth = headers.get("authorization", "")
+    if auth.lower().startswith("bearer "):
+        return auth[7:].strip()
+    return (parse_qs(query_string).get("token") or [""])[0]
+
+
+def _user_for(raw_token):
+    jwt = JWTAuthentication()
+    try:
+        return jwt.get_user(jwt.get_validated_token(raw_token))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+    finally:
+        # поток/WebSocket живёт долго, а request_finished для WebSocket не приходит —
+        # соединение сразу возвращаем в пул, а не держим до отключения клиента
+        connection.close()
+
+
+async def authenticate(raw_token):
+    """Пользователь по JWT или None."""
+    if not raw_token:
+        return None
+    return await sync_to_async(_user_for)(raw_token)
@@ -0,0 +1,77 @@
+# realtime/events.py
+"""
+События изменений каталога/сделок/показов. Публикуются из сигналов через
+pg_notify: внутри транзакции PostgreSQL доставит их только после COMMIT (и не
+доставит при откате), так что слушатели не видят несохранённых изменений.
+
+Полезная нагрузка: {"model", "id", "action", ...поля для клиента, "aud": аудитория}.
+Аудитория ("aud") — кто может получить событие, клиенту не отдаётся:
+    {"public": true}                                   — все (активный объект)
+    {"users": [id, ...], "roles": [...], "staff": true} — адресно, как в get_queryset
+"""
+import json
+
+from django.db import connection
+
+CHANNEL = "homy_changes"
+PUBLIC = {"public": True}
+
+
+TOMBSTONE_ACTIONS = ("deleted", "hidden")
+
+
+def publish(*events):
+    """
+    События [(model, pk, action, audience, fields), ...] — одним запросом (и для bulk-путей).
+    Удаления/скрытия ещё и оставляют Tombstone для ?updated_since= синхронизации.
+    """
+    if not events:
+        return
+    tombstones = [(m, pk, a, aud) for m, pk, a, aud, _ in events if a in TOMBSTONE_ACTIONS]
+    if tombstones:
+        from .models import Tombstone
+        Tombstone.objects.bulk_create([
+            Tombstone(
+                model=m, object_id=pk, reason=a, public=bool(aud.get("public")),
+                users=aud.get("users", []), roles=aud.get("roles", []), staff=bool(aud.get("staff")),
+            )
+            for m, pk, a, aud in tombstones
+        ])
+    payloads = [
+        json.dumps({"model": m, "id": pk, "action": a, **fields, "aud": aud}, default=str)
+        for m, pk, a, aud, fields in events
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_notify(%s, p) FROM unnest(%s::text[]) AS p", [CHANNEL, payloads])
+
+
+def can_see(audience, user):
+    if audience.get("public"):
+        return True
+    if user.pk in audience.get("users", ()):
+        return True
+    if audience.get("staff") and user.is_staff:
+        return True
+    return getattr(user, "role", None) in audience.get("roles", ())
+
+
+# --- аудитории по моделям (повторяют фильтры get_queryset соответствующих ViewSet) ---
+
+def property_event(prop, action, was_active=False):
+    """Активный объект видят все; ставший неактивным — тоже все (чтобы убрать его из списков)."""
+    public = prop.status == "active" or was_active
+    audience = PUBLIC if public else {"users": [prop.realtor_id], "staff": True}
+    if public and prop.status != "active" and action == "updated":
+        action = "hidden"
+    return "property", prop.pk, action, audience, {"status": prop.status}
+
+
+def deal_event(deal, action):
+    audience = {"users": [u for u in (deal.created_by_id, deal.assigned_to_id) if u], "roles": ["admin", "manager"]}
+    return "deal", deal.pk, action, audience, {"stage": deal.stage, "property": deal.property_id}
+
+
+def showing_event(showing, action):
+    return "showing", showing.pk, action, {"users": [showing.agent_id]}, {
+        "status": showing.status, "property": showing.property_id,
+    }
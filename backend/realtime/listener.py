@@ -0,0 +1,105 @@
+# realtime/listener.py
+"""
+Один LISTEN на процесс-воркер: отдельное соединение psycopg 3 (AsyncConnection,
+autocommit, не из пула — оно занято всё время жизни воркера), уведомления
+читаются в event loop и раздаются очередям подключённых клиентов с учётом
+аудитории события.
+"""
+import asyncio
+import json
+import logging
+
+import psycopg
+from django.db import connections
+
+from .events import CHANNEL, can_see
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 256   # событий на клиента; медленному клиенту шлём "resync" вместо потока
+RECONNECT_DELAY = 2.0
+CONNECT_WAIT = 5.0  # сколько subscribe ждёт первого LISTEN
+
+
+class Subscriber:
+    def __init__(self, user):
+        self.user = user
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def offer(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # клиент не успевает — сбрасываем очередь, пусть дозапросит изменения (?updated_since)
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"action": "resync"})
+
+
+class Broadcaster:
+    def __init__(self, alias="default"):
+        self.alias = alias
+        self.subscribers = set()
+        self.task = None
+        self.listening = None
+
+    async def subscribe(self, user):
+        sub = Subscriber(user)
+        self.subscribers.add(sub)
+        loop = asyncio.get_running_loop()
+        if self.task is None or self.task.done() or self.task.get_loop() is not loop:
+            self.listening = asyncio.Event()
+            self.task = loop.create_task(self._listen())
+        try:
+            await asyncio.wait_for(self.listening.wait(), CONNECT_WAIT)
+        except asyncio.TimeoutError:
+            # БД недоступна — клиент подключён, события пойдут после переподключения
+            logger.warning("realtime: LISTEN not ready, client will get resync after reconnect")
+        return sub
+
+    def unsubscribe(self, sub):
+        self.subscribers.discard(sub)
+        if not self.subscribers:
+            self.close()  # нет клиентов — не держим соединение
+
+    def close(self):
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+        self.task = None
+
+    def _params(self):
+        params = connections[self.alias].get_connection_params()
+        params.pop("cursor_factory", None)  # синхронный класс курсора Django — не для AsyncConnection
+        return params
+
+    async def _listen(self):
+        reconnect = False
+        while self.subscribers:
+            try:
+                async with await psycopg.AsyncConnection.connect(**self._params(), autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {CHANNEL}")
+                    self.listening.set()
+                    if reconnect:
+                        # пропущенное за время разрыва клиенты дозапрашивают сами
+                        for sub in list(self.subscribers):
+                            sub.offer({"action": "resync"})
+                    async for notify in conn.notifies():
+                        self.dispatch(notify.payload)
+            except psycopg.Error:
+                logger.warning("realtime: listener connection lost, retrying in %ss", RECONNECT_DELAY)
+                self.listening.clear()
+                reconnect = True
+                await asyncio.sleep(RECONNECT_DELAY)
+
+    def dispatch(self, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+        audience = event.pop("aud", {})
+        for sub in list(self.subscribers):
+            if can_see(audience, sub.user):
+                sub.offer(event)
+
+
+broadcaster = Broadcaster()
@@ -0,0 +1,14 @@
+# realtime/management/commands/prune_tombstones.py
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from realtime.models import Tombstone
+from realtime.sync import TOMBSTONE_TTL
+
+
+class Command(BaseCommand):
+    help = "Удаляет tombstones старше TOMBSTONE_TTL (клиенты с таким курсором получат 410 и синхронизируются заново)."
+
+    def handle(self, *args, **opts):
+        deleted, _ = Tombstone.objects.filter(created_at__lt=timezone.now() - TOMBSTONE_TTL).delete()
+        self.stdout.write(self.style.SUCCESS(f"Удалено: {deleted}"))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('reason', models.CharField(max_length=10)),
+                ('public', models.BooleanField(default=False)),
+                ('users', models.JSONField(default=list)),
+                ('roles', models.JSONField(default=list)),
+                ('staff', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['model', 'created_at', 'id'], name='realtime_to_model_7d0a2d_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# realtime/models.py
+from django.db import models
+
+
+class Tombstone(models.Model):
+    """
+    След удалённой или скрытой от части пользователей строки — для дельта-синхронизации
+    (?updated_since=): клиент убирает её из локальной копии. Пишется вместе с событием
+    "deleted"/"hidden" (realtime/events.py); аудитория — та же, что у события.
+    """
+    model = models.CharField(max_length=20)  # property / deal / showing
+    object_id = models.BigIntegerField()
+    reason = models.CharField(max_length=10)  # deleted / hidden
+    public = models.BooleanField(default=False)
+    users = models.JSONField(default=list)  # [user_id, ...]
+    roles = models.JSONField(default=list)  # ["admin", "manager"]
+    staff = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["model", "created_at", "id"])]
+
+    def __str__(self): return f"Tombstone<{self.model}#{self.object_id} {self.reason}>"
@@ -0,0 +1,53 @@
+# realtime/signals.py
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from deals.models import Deal
+from properties.models import Property
+from showings.models import Showing
+
+from .events import deal_event, property_event, publish, showing_event
+
+
+@receiver(post_save, sender=Property)
+def property_saved(sender, instance, created, **kwargs):
+    # _status_before проставляет pre_save в properties/signals.py
+    was_active = getattr(instance, "_status_before", None) == Property.Status.ACTIVE
+    publish(property_event(instance, "created" if created else "updated", was_active))
+
+
+@receiver(post_delete, sender=Property)
+def property_deleted(sender, instance, **kwargs):
+    publish(property_event(instance, "deleted"))
+
+
+@receiver(pre_save, sender=Deal)
+def remember_deal_users(sender, instance, **kwargs):
+    row = Deal.objects.filter(pk=instance.pk).values("created_by_id", "assigned_to_id").first() if instance.pk else None
+    instance._users_before = set(row.values()) - {None} if row else set()
+
+
+@receiver(post_save, sender=Deal)
+def deal_saved(sender, instance, created, **kwargs):
+    events = [deal_event(instance, "created" if created else "updated")]
+    # переназначенная сделка пропадает из списка прежнего исполнителя
+    removed = getattr(instance, "_users_before", set()) - {instance.created_by_id, instance.assigned_to_id}
+    if removed:
+        model, pk, _, _, fields = deal_event(instance, "hidden")
+        events.append((model, pk, "hidden", {"users": sorted(removed)}, fields))
+    publish(*events)
+
+
+@receiver(post_delete, sender=Deal)
+def deal_deleted(sender, instance, **kwargs):
+    publish(deal_event(instance, "deleted"))
+
+
+@receiver(post_save, sender=Showing)
+def showing_saved(sender, instance, created, **kwargs):
+    publish(showing_event(instance, "created" if created else "updated"))
+
+
+@receiver(post_delete, sender=Showing)
+def showing_deleted(sender, instance, **kwargs):
+    publish(showing_event(instance, "deleted"))
@@ -0,0 +1,154 @@
+# realtime/sync.py
+"""
+Дельта-синхронизация списков: ?updated_since=<cursor> возвращает только строки,
+изменённые после курсора (индекс (updated_at, id)), и tombstones удалённых/скрытых.
+
+Курсор — непрозрачный base64 JSON {"t", "i", "d", "k"}: позиция (updated_at, id) строк
+и (created_at, id) tombstones. updated_at/created_at ставятся до коммита, поэтому
+транзакция может закоммитить строку «в прошлом» уже после выдачи курсора. Курсор не
+уходит дальше горизонта (sync_horizon): min(now() - SYNC_LAG, начало самой старой
+открытой транзакции в БД) — импорт ставит updated_at = now() (= начало транзакции),
+пачка может идти дольше SYNC_LAG. Строки после горизонта клиент получает повторно
+(применение идемпотентно).
+Порядок применения на клиенте: сначала tombstones, потом строки.
+"""
+import base64
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+from core.db_routing import primary
+
+from .models import Tombstone
+
+SYNC_LAG = timedelta(seconds=5)
+SYNC_PAGE_SIZE = 500
+TOMBSTONE_TTL = timedelta(days=30)  # старше — чистит prune_tombstones; такой курсор → полная пересинхронизация
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class CursorExpired(APIException):
+    status_code = 410
+    default_detail = "Курсор устарел, нужна полная синхронизация (updated_since=0)."
+    default_code = "cursor_expired"
+
+
+def encode_cursor(pos, tomb):
+    payload = {"t": pos[0].isoformat(), "i": pos[1], "d": tomb[0].isoformat(), "k": tomb[1]}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(value):
+    """"" / "0" — с начала (первичная загрузка)."""
+    if value in ("", "0"):
+        return (EPOCH, 0), (EPOCH, 0)
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)))
+        return (
+            (datetime.fromisoformat(raw["t"]), int(raw["i"])),
+            (datetime.fromisoformat(raw["d"]), int(raw["k"])),
+        )
+    except (TypeError, ValueError, KeyError):
+        raise ValidationError({"updated_since": "Некорректный курсор."})
+
+
+# xact_start чужих сессий виден тому же пользователю БД (или роли pg_read_all_stats);
+# pg_stat_activity снимается один раз на транзакцию — перед чтением снимок сбрасываем
+OLDEST_XACT_SQL = """
+SELECT min(xact_start) FROM pg_stat_activity
+WHERE datname = current_database() AND pid <> pg_backend_pid() AND xact_start IS NOT NULL
+"""
+
+
+def sync_horizon(now):
+    """Дальше этой точки курсор не сдвигается: всё, что ещё не закоммичено, лежит после неё."""
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.execute("SELECT pg_stat_clear_snapshot()")
+        cursor.execute(OLDEST_XACT_SQL)
+        oldest = cursor.fetchone()[0]
+    horizon = now - SYNC_LAG
+    return min(horizon, oldest) if oldest else horizon
+
+
+def _after(queryset, field, pos):
+    ts, pk = pos
+    return queryset.filter(Q(**{f"{field}__gt": ts}) | Q(**{field: ts, "id__gt": pk}))
+
+
+def _capped(pos, horizon):
+    return min(pos, (horizon, 0))
+
+
+class DeltaSyncMixin:
+    """
+    Для ViewSet: list с ?updated_since= отдаёт
+    {"results": [...], "tombstones": [{"id", "reason", "at"}], "cursor": "...", "has_more": bool}.
+    sync_model — имя модели в Tombstone/событиях ("property", "deal", "showing").
+    """
+    sync_model = None
+
+    def is_delta_request(self):
+        return self.action == "list" and "updated_since" in self.request.query_params
+
+    def list(self, request, *args, **kwargs):
+        if self.is_delta_request():
+            return self.delta_list(request)
+        return super().list(request, *args, **kwargs)
+
+    def include_hidden_tombstones(self):
+        """"hidden" нужен, только если выборка режет строки по статусу/владельцу."""
+        return True
+
+    def get_sync_queryset(self):
+        return self.filter_queryset(self.get_queryset())
+
+    def get_tombstones(self, request, after):
+        user = request.user
+        audience = Q(public=True) | Q(users__contains=[user.pk])
+        if getattr(user, "role", None):
+            audience |= Q(roles__contains=[user.role])
+        if user.is_staff:
+            audience |= Q(staff=True)
+        qs = _after(Tombstone.objects.filter(model=self.sync_model), "created_at", after).filter(audience)
+        if not self.include_hidden_tombstones():
+            qs = qs.filter(reason="deleted")
+        return qs.order_by("created_at", "id")
+
+    def delta_list(self, request):
+        # курсор сдвигается по часам primary: отставшая реплика пропустила бы строки навсегда
+        with primary():
+            return self._delta_list(request)
+
+    def _delta_list(self, request):
+        pos, tomb = decode_cursor(request.query_params.get("updated_since", ""))
+        now = timezone.now()
+        if tomb[0] != EPOCH and tomb[0] < now - TOMBSTONE_TTL:
+            raise CursorExpired()  # tombstones за этот период уже удалены
+        horizon = sync_horizon(now)
+
+        rows = list(
+            _after(self.get_sync_queryset(), "updated_at", pos)
+            .order_by("updated_at", "id")[:SYNC_PAGE_SIZE + 1]
+        )
+        has_more = len(rows) > SYNC_PAGE_SIZE
+        rows = rows[:SYNC_PAGE_SIZE]
+        tombstones = list(self.get_tombstones(request, tomb)[:SYNC_PAGE_SIZE + 1])
+        has_more = has_more or len(tombstones) > SYNC_PAGE_SIZE
+        tombstones = tombstones[:SYNC_PAGE_SIZE]
+
+        last_pos = (rows[-1].updated_at, rows[-1].pk) if rows else pos
+        last_tomb = (tombstones[-1].created_at, tombstones[-1].pk) if tombstones else tomb
+        next_pos, next_tomb = _capped(last_pos, horizon), _capped(last_tomb, horizon)
+        # упёрлись в горизонт — остальное ещё свежее, его заберёт следующий опрос
+        has_more = has_more and next_pos == last_pos and next_tomb == last_tomb
+        return Response({
+            "results": self.get_serializer(rows, many=True).data,
+            "tombstones": [{"id": t.object_id, "reason": t.reason, "at": t.created_at} for t in tombstones],
+            "cursor": encode_cursor(max(pos, next_pos), max(tomb, next_tomb)),
+            "has_more": has_more,
+        })
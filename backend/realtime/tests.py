@@ -0,0 +1,216 @@
+import asyncio
+import json
+from datetime import timedelta
+from unittest import mock
+
+import psycopg
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from audit.threadlocal import set_current_request
+from properties.models import Property
+from users.models import User
+
+from .auth import token_from
+from .events import CHANNEL, can_see, property_event
+from .listener import QUEUE_SIZE, Broadcaster, Subscriber
+from .models import Tombstone
+from .sync import SYNC_LAG, TOMBSTONE_TTL, decode_cursor, encode_cursor, sync_horizon
+
+
+def make_user(email="realtor@example.kg", **kwargs):
+    return User.objects.create(email=email, username=email.split("@")[0], **kwargs)
+
+
+def make_property(realtor, **kwargs):
+    data = dict(
+        title="Квартира", price=100_000, area=50, rooms=2, address="ул. Киевская 1",
+        district="Центр", deal_type="sale", status="active", realtor=realtor,
+    )
+    data.update(kwargs)
+    return Property.objects.create(**data)
+
+
+class AudienceTests(SimpleTestCase):
+    def test_property_audience(self):
+        prop = Property(pk=1, status="active", realtor_id=7)
+        self.assertEqual(property_event(prop, "updated")[2:4], ("updated", {"public": True}))
+        prop.status = "draft"
+        self.assertEqual(property_event(prop, "updated")[2:4], ("updated", {"users": [7], "staff": True}))
+        # был активным — все должны убрать его из списков
+        self.assertEqual(property_event(prop, "updated", was_active=True)[2:4], ("hidden", {"public": True}))
+
+    def test_can_see(self):
+        owner, staff, manager = User(pk=1), User(pk=2, is_staff=True), User(pk=3, role="manager")
+        self.assertTrue(can_see({"public": True}, owner))
+        self.assertTrue(can_see({"users": [1]}, owner))
+        self.assertFalse(can_see({"users": [1]}, manager))
+        self.assertTrue(can_see({"users": [1], "staff": True}, staff))
+        self.assertTrue(can_see({"roles": ["manager"]}, manager))
+
+    def test_token_from(self):
+        self.assertEqual(token_from({"authorization": "Bearer abc"}, "token=zzz"), "abc")
+        self.assertEqual(token_from({}, "a=1&token=zzz"), "zzz")
+        self.assertEqual(token_from({}, ""), "")
+
+
+class BroadcasterTests(SimpleTestCase):
+    def test_dispatch_by_audience_without_aud(self):
+        async def run():
+            broadcaster = Broadcaster()
+            owner, other = Subscriber(User(pk=1)), Subscriber(User(pk=2))
+            broadcaster.subscribers = {owner, other}
+            broadcaster.dispatch(json.dumps({"model": "property", "id": 5, "aud": {"users": [1]}}))
+            broadcaster.dispatch("not json")
+            return owner.queue.get_nowait(), other.queue.empty()
+
+        event, other_empty = asyncio.run(run())
+        self.assertEqual(event, {"model": "property", "id": 5})
+        self.assertTrue(other_empty)
+
+    def test_slow_client_gets_resync(self):
+        async def run():
+            sub = Subscriber(User(pk=1))
+            for i in range(QUEUE_SIZE + 1):
+                sub.offer({"id": i})
+            return [sub.queue.get_nowait() for _ in range(sub.queue.qsize())]
+
+        self.assertEqual(asyncio.run(run()), [{"action": "resync"}])
+
+
+class PublishTests(TestCase):
+    def setUp(self):
+        set_current_request(None)
+        self.user = make_user()
+
+    def test_hide_and_delete_leave_tombstones(self):
+        prop = make_property(self.user)
+        prop.status = "draft"
+        prop.save()
+        draft = make_property(self.user, status="draft")
+        draft_pk = draft.pk
+        draft.delete()
+        self.assertEqual(
+            list(Tombstone.objects.order_by("id").values_list("object_id", "reason", "public", "users")),
+            [(prop.pk, "hidden", True, []), (draft_pk, "deleted", False, [self.user.pk])],
+        )
+
+
+class NotifyTests(TransactionTestCase):
+    def setUp(self):
+        set_current_request(None)
+        params = connection.get_connection_params()
+        params.pop("cursor_factory", None)
+        self.listener = psycopg.connect(**params, autocommit=True)
+        self.addCleanup(self.listener.close)
+        self.listener.execute(f"LISTEN {CHANNEL}")
+
+    def events(self):
+        return [json.loads(n.payload) for n in self.listener.notifies(timeout=0.5)]
+
+    def test_notified_after_commit_only(self):
+        user = make_user()
+        prop = make_property(user)
+        events = [e for e in self.events() if e["model"] == "property"]
+        self.assertEqual(events, [
+            {"model": "property", "id": prop.pk, "action": "created", "status": "active", "aud": {"public": True}},
+        ])
+
+        try:
+            with transaction.atomic():
+                make_property(user)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual([e for e in self.events() if e["model"] == "property"], [])
+
+
+class DeltaSyncTests(TestCase):
+    url = "/api/v1/properties/"
+
+    def setUp(self):
+        set_current_request(None)
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.props = [make_property(self.user, title=f"p{i}") for i in range(3)]
+        self.age(self.props, minutes=10)
+
+    def age(self, props, **delta):
+        # строки «из прошлого»: курсор не уходит дальше now() - SYNC_LAG
+        for i, prop in enumerate(props):
+            Property.objects.filter(pk=prop.pk).update(updated_at=timezone.now() - timedelta(**delta) + timedelta(seconds=i))
+
+    def poll(self, cursor="0", client=None):
+        response = (client or self.client).get(self.url, {"updated_since": cursor})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_initial_load_then_only_changes(self):
+        first = self.poll()
+        self.assertEqual([r["id"] for r in first["results"]], [p.pk for p in self.props])
+        self.assertFalse(first["has_more"])
+        self.assertEqual(self.poll(first["cursor"])["results"], [])
+
+        self.age([self.props[1]], minutes=1)
+        changed = self.poll(first["cursor"])
+        self.assertEqual([r["id"] for r in changed["results"]], [self.props[1].pk])
+
+    def test_fresh_rows_are_repeated_until_past_horizon(self):
+        first = self.poll()
+        fresh = make_property(self.user)
+        again = self.poll(first["cursor"])
+        self.assertEqual([r["id"] for r in again["results"]], [fresh.pk])
+        # курсор дошёл до горизонта, но не до свежей строки — она может быть ещё не последней
+        self.assertLess(decode_cursor(again["cursor"])[0], (fresh.updated_at, fresh.pk))
+        self.assertEqual([r["id"] for r in self.poll(again["cursor"])["results"]], [fresh.pk])
+
+    def test_tombstones_by_audience(self):
+        cursor = self.poll()["cursor"]
+        Tombstone.objects.update(created_at=timezone.now() - timedelta(minutes=20))
+        hidden, removed = self.props[0], self.props[1]
+        hidden.status = "draft"
+        hidden.save()
+        removed_pk = removed.pk
+        removed.delete()
+        Tombstone.objects.update(created_at=timezone.now() - timedelta(minutes=1))
+
+        stranger = APIClient()
+        stranger.force_authenticate(make_user("other@example.kg"))
+        seen = self.poll(cursor, client=stranger)["tombstones"]
+        self.assertEqual(sorted((t["id"], t["reason"]) for t in seen), sorted([(hidden.pk, "hidden"), (removed_pk, "deleted")]))
+
+        # свои объекты (?mine=1) видны в любом статусе — «hidden» им не нужен
+        mine = self.client.get(self.url, {"updated_since": cursor, "mine": 1}).json()["tombstones"]
+        self.assertEqual([(t["id"], t["reason"]) for t in mine], [(removed_pk, "deleted")])
+
+    def test_pages(self):
+        with mock.patch("realtime.sync.SYNC_PAGE_SIZE", 2):
+            first = self.poll()
+            self.assertTrue(first["has_more"])
+            second = self.poll(first["cursor"])
+        self.assertEqual([r["id"] for r in first["results"] + second["results"]], [p.pk for p in self.props])
+        self.assertFalse(second["has_more"])
+
+    def test_bad_and_expired_cursors(self):
+        self.assertEqual(self.client.get(self.url, {"updated_since": "garbage"}).status_code, 400)
+        old = timezone.now() - TOMBSTONE_TTL - timedelta(days=1)
+        self.assertEqual(self.client.get(self.url, {"updated_since": encode_cursor((old, 0), (old, 0))}).status_code, 410)
+
+
+class SyncHorizonTests(TestCase):
+    def test_bounded_by_oldest_open_transaction(self):
+        now = timezone.now()
+        self.assertEqual(sync_horizon(now), now - SYNC_LAG)
+
+        params = connection.get_connection_params()
+        params.pop("cursor_factory", None)
+        with psycopg.connect(**params) as other:  # не autocommit: SELECT открывает транзакцию
+            other.execute("SELECT 1")
+            started = other.execute("SELECT xact_start FROM pg_stat_activity WHERE pid = pg_backend_pid()").fetchone()[0]
+            later = now + timedelta(hours=1)
+            self.assertEqual(sync_horizon(later), started)
+            other.rollback()
+        self.assertEqual(sync_horizon(later), later - SYNC_LAG)
@@ -0,0 +1,46 @@
+# realtime/views.py
+import asyncio
+import json
+
+from django.http import JsonResponse, StreamingHttpResponse
+
+from .auth import authenticate, token_from
+from .listener import broadcaster
+
+HEARTBEAT = 15  # сек; комментарий-пинг держит соединение через прокси
+
+
+def sse_message(event):
+    return f"event: change\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+
+
+async def event_stream(user):
+    sub = await broadcaster.subscribe(user)
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(sub.queue.get(), HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            yield sse_message(event)
+    finally:
+        # клиент отключился — Django отменяет генератор
+        broadcaster.unsubscribe(sub)
+
+
+async def changes(request):
+    """
+    GET /api/v1/changes/ (text/event-stream, только под ASGI)
+    Авторизация: Authorization: Bearer <access> или ?token=<access>.
+    События: {"model": "property|deal|showing", "id", "action": "created|updated|hidden|deleted|resync", ...}
+    """
+    raw = token_from({k.lower(): v for k, v in request.headers.items()}, request.META.get("QUERY_STRING", ""))
+    user = await authenticate(raw)
+    if user is None:
+        return JsonResponse({"detail": "Требуется аутентификация"}, status=401)
+    response = StreamingHttpResponse(event_stream(user), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx не должен буферизовать поток
+    return response
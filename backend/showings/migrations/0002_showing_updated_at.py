@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0015_property_updated_at_index'),
+        ('showings', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='showing',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='showing',
+            index=models.Index(fields=['updated_at', 'id'], name='showings_sh_updated_0a4f87_idx'),
+        ),
+    ]
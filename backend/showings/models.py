@@ -18,9 +18,13 @@ class Showing(models.Model):
         default='planned'
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        indexes = [models.Index(fields=['agent', 'starts_at'])]
+        indexes = [
+            models.Index(fields=['agent', 'starts_at']),
+            models.Index(fields=['updated_at', 'id']),  # ?updated_since=
+        ]
         ordering = ['starts_at']
 
     def overlaps(self) -> bool:
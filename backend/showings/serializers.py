@@ -4,8 +4,8 @@ from .models import Showing
 class ShowingSerializer(serializers.ModelSerializer):
     class Meta:
         model = Showing
-        fields = ('id','property','agent','client_name','client_phone','starts_at','status','created_at')
-        read_only_fields = ('agent','created_at')
+        fields = ('id','property','agent','client_name','client_phone','starts_at','status','created_at','updated_at')
+        read_only_fields = ('agent','created_at','updated_at')
 
     def validate(self, attrs):
         instance = self.instance or Showing()
@@ -5,11 +5,13 @@ from datetime import timedelta
 
 from .models import Showing
 from .serializers import ShowingSerializer
+from realtime.sync import DeltaSyncMixin
 
-class ShowingViewSet(viewsets.ModelViewSet):
+class ShowingViewSet(DeltaSyncMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     serializer_class = ShowingSerializer
     queryset = Showing.objects.all().select_related('property','agent')
+    sync_model = 'showing'  # ?updated_since=
 
     def get_queryset(self):
         qs = super().get_queryset().filter(agent=self.request.user)
@@ -17,7 +19,7 @@ class ShowingViewSet(viewsets.ModelViewSet):
         date_to = self.request.query_params.get('to')
         if date_from and date_to:
             qs = qs.filter(starts_at__date__range=[date_from, date_to])
-        else:
+        elif not self.is_delta_request():
             # по умолчанию ближайшие 14 дней
             today = timezone.localdate()
             qs = qs.filter(starts_at__date__range=[today, today + timedelta(days=14)])